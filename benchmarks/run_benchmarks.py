@@ -0,0 +1,181 @@
+"""
+Offline benchmark of every pipeline stage on synthetic long-form audio.
+
+    python -m benchmarks.run_benchmarks --durations 60 600 --output bench.json
+    python -m benchmarks.run_benchmarks --durations 60 --baseline bench.json
+
+Each stage runs in a fresh process so its peak RSS is its own. By default VAD and
+ASR use the stand-ins in benchmarks/stubs.py (no network, no model downloads);
+pass --real-models to time SileroVAD and FasterWhisperASR instead.
+"""
+import argparse
+import dataclasses
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+
+# benchmarks live next to modules/; make the project importable when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STAGES = ('convert', 'vad', 'export', 'asr', 'transcript_export')
+
+
+def _setup(workdir: str):
+    """
+    Point every configured path into the benchmark's scratch directory.
+    """
+    from modules.utils.config import load_config, set_config
+    cfg = load_config()
+    paths = {name: os.path.join(workdir, name) for name in cfg.paths.__dataclass_fields__}
+    for p in paths.values():
+        os.makedirs(p, exist_ok=True)
+    cfg = dataclasses.replace(
+        cfg,
+        paths=type(cfg.paths)(**paths),
+        cache=dataclasses.replace(cfg.cache, enabled=False)
+    )
+    set_config(cfg)
+    return cfg
+
+
+def _run_stage(stage: str, workdir: str, real_models: bool, data: dict) -> dict:
+    """
+    Run one stage in this (fresh) process and measure it.
+    Model loading happens before the timer starts.
+    """
+    from modules.utils.memory import peak_rss
+    cfg = _setup(workdir)
+    sr = cfg.pipeline.sample_rate
+
+    if stage == 'convert':
+        from modules.input.file_reader import FileReader
+        reader = FileReader()
+        run = lambda: os.path.join(cfg.paths.converted_wav_dir, reader.convert_to_wav(data['source']))
+    elif stage == 'vad':
+        if real_models:
+            from modules.utils.model_registry import load_segmenter
+            segmenter = load_segmenter(cfg)
+        else:
+            from benchmarks.stubs import EnergySegmenter
+            segmenter = EnergySegmenter(cfg)
+        run = lambda: segmenter.segment(data['wav_path'])
+    elif stage == 'export':
+        from modules.output.audio_exporter import AudioExporter
+        exporter = AudioExporter()
+        run = lambda: exporter.export(data['wav_path'], data['segments'])
+    elif stage == 'asr':
+        if real_models:
+            from modules.transcription.faster_whisper import FasterWhisperASR
+            asr = FasterWhisperASR(cfg)
+        else:
+            from benchmarks.stubs import StubASR
+            asr = StubASR(cfg)
+        run = lambda: [asr.transcribe(clip) for clip in data['clips']]
+    else:
+        from modules.output.transcript_exporter import TranscriptExporter
+        exporter = TranscriptExporter()
+        run = lambda: exporter.export(data['clips'], data['transcripts'])
+
+    wall0, cpu0 = time.perf_counter(), time.process_time()
+    output = run()
+    wall, cpu = time.perf_counter() - wall0, time.process_time() - cpu0
+    return {
+        'wall_sec': wall,
+        'cpu_sec': cpu,
+        'peak_rss_mb': peak_rss() / 2 ** 20,
+        'output': output,
+    }
+
+
+def run_duration(duration: float, workdir: str, real_models: bool, seed: int) -> dict:
+    """
+    Generate one synthetic source and benchmark every stage on it.
+    """
+    from benchmarks.synthetic import write_synthetic_wav
+    from modules.utils.config import load_config
+    source = os.path.join(workdir, 'source', f'synthetic_{int(duration)}s.wav')
+    print(f'Generating {duration:.0f}s of synthetic audio...')
+    bursts = write_synthetic_wav(source, duration, load_config().pipeline.sample_rate, seed)
+
+    ctx = multiprocessing.get_context('spawn')
+    data = {'source': source}
+    results = {'duration_sec': duration, 'reference_bursts': len(bursts), 'stages': {}}
+    for stage in STAGES:
+        with ctx.Pool(1) as pool:
+            measured = pool.apply(_run_stage, (stage, workdir, real_models, data))
+        output = measured.pop('output')
+        if stage == 'convert':
+            data['wav_path'] = output
+        elif stage == 'vad':
+            data['segments'] = output
+            measured['segments'] = len(output)
+        elif stage == 'export':
+            data['clips'] = output
+        elif stage == 'asr':
+            data['transcripts'] = output
+        # real-time factor: processing time per second of audio; below 1 is faster than real time
+        measured['audio_sec'] = duration
+        measured['rtf'] = measured['wall_sec'] / duration
+        measured['throughput_x'] = duration / measured['wall_sec'] if measured['wall_sec'] else float('inf')
+        results['stages'][stage] = measured
+        print(f"  {stage:<18} wall {measured['wall_sec']:8.2f}s  RTF {measured['rtf']:.4f}  "
+              f"peak RSS {measured['peak_rss_mb']:8.1f} MB")
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    List stages whose RTF grew by more than `tolerance` (relative) against the baseline.
+    """
+    old = {(r['duration_sec'], stage): m['rtf']
+           for r in baseline['runs'] for stage, m in r['stages'].items()}
+    regressions = []
+    for run in results['runs']:
+        for stage, m in run['stages'].items():
+            before = old.get((run['duration_sec'], stage))
+            if before and m['rtf'] > before * (1 + tolerance):
+                regressions.append(f"{stage} @ {run['duration_sec']:.0f}s: RTF {before:.4f} -> {m['rtf']:.4f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark pipeline stages on synthetic audio')
+    parser.add_argument('--durations', type=float, nargs='+', default=[60.0],
+                        help='Source durations in seconds (e.g. 60 3600 36000)')
+    parser.add_argument('--real-models', action='store_true', help='Use SileroVAD and FasterWhisperASR instead of stubs')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workdir', default=None, help='Scratch directory (default: a temp dir)')
+    parser.add_argument('--output', default='bench_results.json', help='JSON results file')
+    parser.add_argument('--baseline', default=None, help='Earlier results file to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='Allowed relative RTF increase against the baseline')
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='scc_bench_')
+    results = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'real_models': args.real_models,
+        'runs': [run_duration(d, os.path.join(workdir, f'{int(d)}s'), args.real_models, args.seed)
+                 for d in args.durations],
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f'Wrote {args.output}')
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f'REGRESSION {line}')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+import numpy as np
+
+# my module
+from modules.segmentation.base_segmenter import AbstractSegmenter
+from modules.transcription.base_asr import AbstractASR
+from modules.utils.audio import as_float32
+
+
+class EnergySegmenter(AbstractSegmenter):
+    """
+    Frame-energy VAD stand-in: no model download, no torch.
+    A frame is speech when its RMS exceeds `threshold` (scaled from the VAD config).
+    """
+    FRAME_SEC = 0.032
+
+    def segment(self, wav_path: Union[str, np.ndarray]) -> List[Tuple[float, float]]:
+        if isinstance(wav_path, str):
+            import soundfile as sf
+            chunks = (block for block in sf.blocks(wav_path, blocksize=30 * self.cfg.pipeline.sample_rate,
+                                                   dtype='float32'))
+        else:
+            block = 30 * self.cfg.pipeline.sample_rate
+            chunks = (as_float32(wav_path[start:start + block]) for start in range(0, len(wav_path), block))
+        return list(self.iter_segments(chunks))
+
+    def iter_segments(self, chunks: Iterable[np.ndarray]) -> Iterator[Tuple[float, float]]:
+        sr = self.cfg.pipeline.sample_rate
+        frame = int(self.FRAME_SEC * sr)
+        # map the Silero probability threshold onto an RMS level
+        level = 0.02 * self.cfg.pipeline.vad.threshold
+        min_silence = int(self.cfg.pipeline.vad.min_silence_len * sr)
+        pending = np.zeros(0, dtype=np.float32)
+        position = 0
+        start = None
+        last_speech = 0
+        for chunk in chunks:
+            pending = np.concatenate([pending, chunk])
+            usable = len(pending) - len(pending) % frame
+            frames = pending[:usable].reshape(-1, frame)
+            rms = np.sqrt(np.mean(frames ** 2, axis=1))
+            for i, is_speech in enumerate(rms > level):
+                at = position + i * frame
+                if is_speech:
+                    if start is None:
+                        start = at
+                    last_speech = at + frame
+                elif start is not None and at - last_speech >= min_silence:
+                    yield (start / sr, last_speech / sr)
+                    start = None
+            position += usable
+            pending = pending[usable:]
+        if start is not None:
+            yield (start / sr, last_speech / sr)
+
+
+class StubASR(AbstractASR):
+    """
+    ASR stand-in that returns a fixed-size transcript after touching every sample,
+    so benchmarks measure the pipeline around the model rather than the model.
+    """
+    def transcribe(self, audio: Union[str, np.ndarray], language: Optional[str] = None) -> str:
+        if isinstance(audio, str):
+            import soundfile as sf
+            audio, _ = sf.read(audio, dtype='float32')
+        audio = as_float32(audio)
+        energy = float(np.sqrt(np.mean(np.square(audio)))) if len(audio) else 0.0
+        return f'stub {len(audio)} {energy:.4f}'
@@ -1,74 +1,182 @@
 import argparse
 import os
+import sys
 
 # my module
 from modules.utils.config import load_config
-from modules.input.file_reader import FileReader
-from modules.input.youtube_reader import YouTubeReader
-from modules.segmentation.silero_vad import SileroVAD
-from modules.output.audio_exporter import AudioExporter
-from modules.transcription.faster_whisper import FasterWhisperASR
-from modules.output.transcript_exporter import TranscriptExporter
 
 
 def main():
     parser = argparse.ArgumentParser(description='Build speech-text corpus from media or URL')
     parser.add_argument('input', nargs='*', default=None, help='Path(s) to media file(s) or YouTube URL(s); if omitted, use files in data_storage_dir')
+    parser.add_argument('--no-clips', action='store_true', help='Do not write audio clips; only export transcripts')
+    parser.add_argument('--stream', action='store_true', help='Stream-decode media through an ffmpeg pipe instead of writing a temp WAV')
+    parser.add_argument('--keep-wav', action='store_true', help='With --stream, also keep the decoded WAV in converted_wav_dir')
+    parser.add_argument('--pipe-download', action='store_true', help='With --stream, pipe URL downloads straight into the decoder')
+    parser.add_argument('--playlist', action='store_true', help='Expand playlist/channel URLs into their videos')
+    parser.add_argument('--no-index', action='store_true', help='Without inputs, take every media file under raw_media_dir instead of only those the ingest index has not seen done')
+    parser.add_argument('--no-cache', action='store_true', help='Ignore and do not update the stage cache')
+    parser.add_argument('--resume', action='store_true', help='Skip inputs finished in an earlier run and continue unfinished ones from the manifest')
+    parser.add_argument('--manifest', default=None, help='Progress manifest (JSONL); defaults to <temp_dir>/manifest.jsonl')
+    parser.add_argument('--metrics', default=None, metavar='DIR', help='Write per-stage JSON metrics and a Prometheus textfile into DIR')
+    parser.add_argument('--profile', action='store_true', help='Print a per-stage timing summary at the end')
+    parser.add_argument('--preset', default=None, help='Decoding preset from the decoding section of the config, e.g. fast or accurate')
+    parser.add_argument('--server', default=None, metavar='URL', help='Submit to a running main_server.py instead of processing here (default: server.url); processing options are the server\'s')
+    parser.add_argument('--shard', default=None, metavar='I/N', help='Process only shard I of N (0-based) of the inputs; every host computes the same split')
+    parser.add_argument('--lease-dir', default=None, metavar='DIR', help='Share the inputs with other hosts dynamically by claiming lease files in DIR (shared storage)')
+    parser.add_argument('--lease-ttl', type=float, default=600, help='Seconds without heartbeat after which another host may take over a lease')
+    parser.add_argument('--workers', type=int, default=1, help='Number of worker processes, each with its own VAD and ASR models')
+    parser.add_argument('--duplicate-report', action='store_true', help='Print the near-duplicate rate of every source in the fingerprint index and exit')
     args = parser.parse_args()
 
     cfg = load_config()
-    # when no inputs specified, default to all media files in data_storage_dir
+    if args.duplicate_report:
+        _print_duplicate_report(cfg)
+        return
+    # when no inputs specified, default to the new media under raw_media_dir
+    index = None
     if not args.input:
         data_dir = cfg.paths.raw_media_dir
-        try:
-            files = [os.path.join(data_dir, f) for f in os.listdir(data_dir)
-                     if f.lower().endswith(('.mp4', '.mp3', '.wav'))]
-        except FileNotFoundError:
-            files = []
+        if args.no_index:
+            from modules.input.ingest_index import iter_media
+            files = sorted(path for path, _, _ in iter_media(data_dir, cfg.ingest.extensions))
+        else:
+            from modules.input.ingest_index import IngestIndex
+            index = IngestIndex(cfg.ingest.index_db or os.path.join(cfg.paths.temp_dir, 'ingest_index.sqlite'),
+                                hash_workers=cfg.ingest.hash_workers)
+            # incremental: only new or changed files are hashed; duplicates come back once
+            files = index.scan(data_dir, cfg.ingest.extensions)
         if not files:
-            parser.error(f'No input files found in {data_dir}')
+            parser.error(f'No new input files found in {data_dir}')
         args.input = files
+    if args.pipe_download and not args.stream:
+        parser.error('--pipe-download requires --stream')
+    if args.playlist:
+        from modules.input.youtube_reader import YouTubeReader
+        yt_reader = YouTubeReader()
+        args.input = [url for inp in args.input
+                      for url in (yt_reader.expand(inp) if inp.startswith('http') else [inp])]
 
-    # initialize components
-    file_reader = FileReader()
-    yt_reader = YouTubeReader()
-    segmenter = SileroVAD(cfg)
-    audio_exporter = AudioExporter()
-    asr = FasterWhisperASR(cfg)
-    transcript_exporter = TranscriptExporter()
+    if args.shard is not None:
+        from modules.pipeline.sharding import parse_shard, select_shard
+        try:
+            shard_index, shard_count = parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+        args.input = select_shard(args.input, shard_index, shard_count)
+        if not args.input:
+            print(f'Shard {args.shard} has no inputs.')
+            return
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
+    if args.preset is not None and args.preset not in cfg.decoding.presets:
+        parser.error(f'Unknown --preset {args.preset}; choose from {", ".join(cfg.decoding.presets)}')
+    # hosts sharing temp_dir keep separate manifests
+    manifest_name = 'manifest.jsonl'
+    if args.shard is not None or args.lease_dir:
+        from modules.utils.fileops import node_name
+        manifest_name = f'manifest-{node_name()}.jsonl'
+    options = dict(stream=args.stream, keep_wav=args.keep_wav, pipe_urls=args.pipe_download,
+                   export_clips=not args.no_clips,
+                   use_cache=not args.no_cache, resume=args.resume,
+                   manifest_path=args.manifest or os.path.join(cfg.paths.temp_dir, manifest_name),
+                   lease_dir=args.lease_dir, lease_ttl=args.lease_ttl)
+    server_url = args.server or cfg.server.url
+    if server_url:
+        results = _run_remote(server_url, args.input)
+    else:
+        results = [{'input': job.input, 'error': job.error, 'skipped': job.skipped,
+                    'claimed_elsewhere': job.claimed_elsewhere, 'rejected': job.rejected,
+                    'duplicates': job.duplicates}
+                   for job in _run_local(cfg, args, options)]
+    if index is not None:
+        # failed inputs stay pending and are handed out again next run
+        index.mark_done(r['input'] for r in results if not r['error'] and not r.get('claimed_elsewhere'))
+        index.close()
+    failed = [r for r in results if r['error']]
+    skipped = [r for r in results if r['skipped'] and not r.get('claimed_elsewhere')]
+    elsewhere = [r for r in results if r.get('claimed_elsewhere')]
+    print(f'Done: {len(results) - len(failed)}/{len(results)} inputs succeeded ({len(skipped)} already done'
+          f'{f", {len(elsewhere)} taken by other hosts" if elsewhere else ""}).')
+    rejected = sum(r.get('rejected') or 0 for r in results)
+    if rejected:
+        print(f'Quality filter: {rejected} segments {"dropped" if cfg.quality.action == "drop" else "flagged"}.')
+    with_duplicates = [r for r in results if r.get('duplicates')]
+    for r in with_duplicates:
+        print(f'Duplicates: {r["input"]}: {r["duplicates"]} near-duplicate segments')
+    for r in failed:
+        print(f'Failed: {r["input"]}: {r["error"]}')
+    if failed:
+        sys.exit(1)
 
-    for inp in args.input:
-        # get a local media path
-        if inp.startswith('http'):
-            media_path = yt_reader.download(inp)
-        else:
-            media_path = inp
 
-        # convert to wav
-        wav_name = file_reader.convert_to_wav(media_path)
-        wav_path = os.path.join(cfg.paths.converted_wav_dir, wav_name)
-        print(f'Converted to WAV: {wav_path}')
+def _print_duplicate_report(cfg):
+    """
+    Near-duplicate rates per source, as recorded in the fingerprint index by earlier runs.
+    """
+    from modules.pipeline.fingerprint_index import FingerprintIndex
+    index = FingerprintIndex.from_config(cfg)
+    rows = index.report()
+    index.close()
+    total_segments = sum(segments for _, segments, _ in rows)
+    total_duplicates = sum(duplicates for _, _, duplicates in rows)
+    for inp, segments, duplicates in rows:
+        print(f'{duplicates / max(segments, 1):6.1%}  {duplicates:5d}/{segments:<5d}  {inp}')
+    print(f'{len(rows)} sources, {total_duplicates}/{total_segments} segments near-duplicates '
+          f'({total_duplicates / max(total_segments, 1):.1%}).')
 
-        # segment speech
-        segments = segmenter.segment(wav_path)
-        print(f'Detected {len(segments)} speech segments.')
 
-        # export audio clips
-        clip_files = audio_exporter.export(wav_path, segments)
-        clip_paths = [os.path.join(cfg.paths.resulted_corpus_dir, f) for f in clip_files]
-        print(f'Exported {len(clip_paths)} clips.')
+def _run_local(cfg, args, options):
+    # heavy modules (torch, faster-whisper) are imported only once there is work to do
+    if args.workers > 1:
+        from modules.pipeline.worker_pool import WorkerPool
+        # one process per worker, files handed out largest first
+        pool = WorkerPool(args.workers, metrics_dir=args.metrics, preset=args.preset, profile=args.profile, **options)
+        jobs = pool.run(args.input)
+        if args.profile:
+            # stage totals summed over all workers
+            print(pool.metrics.summary())
+        return jobs
+    from modules.transcription.faster_whisper import FasterWhisperASR
+    from modules.pipeline.pipeline import Pipeline
+    from modules.pipeline.runner import PipelineRunner
+    from modules.utils.metrics import Metrics
+    from modules.utils.model_registry import load_segmenter
+    # initialize components
+    segmenter = load_segmenter(cfg)
+    asr = FasterWhisperASR(cfg, preset=args.preset)
+    metrics = Metrics(args.metrics) if args.metrics or args.profile else None
+    pipeline = Pipeline(cfg, segmenter, asr, metrics=metrics, **options)
+    # stages run concurrently: the next input downloads and segments while this one is in ASR
+    try:
+        jobs = PipelineRunner(pipeline, cfg.runner).run(args.input)
+    finally:
+        pipeline.close()
+    if args.profile:
+        print(pipeline.metrics.summary())
+    return jobs
 
-        # transcribe each clip
-        transcripts = []
-        for index, clip in enumerate(clip_paths):
-            text = asr.transcribe(clip)
-            transcripts.append(text)
-            print(f'Transcribed clip {index + 1}/{len(clip_paths)}: {text}')
-        print('Transcription done.')
 
-        # save transcripts
-        txt_files = transcript_exporter.export(clip_files, transcripts)
-        print(f'Wrote transcripts: {txt_files}')
+def _run_remote(url, inputs):
+    """
+    Submit inputs to the job server and print their progress until all are finished.
+    """
+    from modules.server.client import JobClient
+    client = JobClient(url)
+    # the server resolves paths itself, so send them absolute
+    ids = client.submit([inp if inp.startswith('http') else os.path.abspath(inp) for inp in inputs])
+    results = []
+    try:
+        for job_id, inp in zip(ids, inputs):
+            for event in client.events(job_id):
+                if event['event'] == 'log':
+                    print(f'[{inp}] {event["message"]}')
+            results.append(event)
+    except KeyboardInterrupt:
+        for job_id in ids:
+            client.cancel(job_id)
+        raise
+    return results
 
 
 if __name__ == '__main__':
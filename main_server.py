@@ -0,0 +1,48 @@
+import argparse
+import os
+
+# my module
+from modules.utils.config import load_config
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the local job server that keeps VAD/ASR models loaded')
+    parser.add_argument('--host', default=None, help='Interface to bind; defaults to server.host')
+    parser.add_argument('--port', type=int, default=None, help='Port to listen on; defaults to server.port')
+    parser.add_argument('--no-clips', action='store_true', help='Do not write audio clips; only export transcripts')
+    parser.add_argument('--stream', action='store_true', help='Stream-decode media through an ffmpeg pipe instead of writing a temp WAV')
+    parser.add_argument('--no-cache', action='store_true', help='Ignore and do not update the stage cache')
+    parser.add_argument('--resume', action='store_true', help='Skip inputs finished in an earlier run and continue unfinished ones from the manifest')
+    parser.add_argument('--manifest', default=None, help='Progress manifest (JSONL); defaults to <temp_dir>/manifest.jsonl')
+    parser.add_argument('--metrics', default=None, metavar='DIR', help='Write per-stage JSON metrics and a Prometheus textfile into DIR')
+    parser.add_argument('--preset', default=None, help='Decoding preset from the decoding section of the config')
+    args = parser.parse_args()
+
+    cfg = load_config()
+    if args.preset is not None and args.preset not in cfg.decoding.presets:
+        parser.error(f'Unknown --preset {args.preset}; choose from {", ".join(cfg.decoding.presets)}')
+    from modules.pipeline.pipeline import Pipeline
+    from modules.server.job_server import JobServer
+    from modules.utils.metrics import Metrics
+    from modules.utils.model_registry import get_registry
+    registry = get_registry()
+    if args.preset is None:
+        asr = registry.get_asr(cfg)
+    else:
+        from modules.transcription.faster_whisper import FasterWhisperASR
+        asr = FasterWhisperASR(cfg, preset=args.preset)
+    pipeline = Pipeline(cfg, registry.get_vad(cfg), asr, stream=args.stream, export_clips=not args.no_clips,
+                        use_cache=not args.no_cache, resume=args.resume,
+                        manifest_path=args.manifest or os.path.join(cfg.paths.temp_dir, 'manifest.jsonl'),
+                        metrics=Metrics(args.metrics) if args.metrics else None)
+    server = JobServer(pipeline, cfg.runner, host=args.host or cfg.server.host, port=args.port or cfg.server.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,9 @@
 from abc import ABC, abstractmethod
+from typing import List, Optional, Tuple
+import numpy as np
+
+from modules.pipeline.quality_filter import SegmentQualityFilter
+from modules.segmentation.normalizer import SegmentNormalizer
 from modules.utils.config import load_config
 
 
@@ -9,6 +14,22 @@ class BaseGUI(ABC):
     def __init__(self):
         self.cfg = load_config()
 
+    @staticmethod
+    def detect_segments(cfg, segmenter, waveform: np.ndarray) -> Tuple[List[Tuple[float, float]], Optional[List[dict]]]:
+        """
+        Segment a loaded waveform the way the pipeline does: VAD, then length normalization
+        if `pipeline.vad.normalize` is set, then the pre-ASR quality filter if enabled.
+        The segmenter may be local or the job server's RemoteSegmenter.
+        :return: (segments, quality filter reports, or None when the filter is off)
+        """
+        # segment the waveform already in memory instead of reading the wav again
+        segments = segmenter.segment(waveform)
+        if cfg.pipeline.vad.normalize:
+            segments = SegmentNormalizer(cfg).normalize(segments, waveform)
+        if not cfg.quality.enabled:
+            return segments, None
+        return SegmentQualityFilter(cfg).filter(segments, waveform)
+
     @abstractmethod
     def run(self):
         """Start the GUI application."""
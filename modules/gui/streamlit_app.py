@@ -1,15 +1,15 @@
 import streamlit as st
 import os
+import shutil
 import tempfile
 
 from .base_gui import BaseGUI
 from modules.input.file_reader import FileReader
 from modules.input.youtube_reader import YouTubeReader
-from modules.segmentation.silero_vad import SileroVAD
 from modules.output.audio_exporter import AudioExporter
-from modules.transcription.faster_whisper import FasterWhisperASR
 from modules.output.transcript_exporter import TranscriptExporter
 from modules.utils.config import load_config
+from modules.utils.model_registry import get_registry
 
 
 class StreamlitApp(BaseGUI):
@@ -18,10 +18,12 @@ class StreamlitApp(BaseGUI):
         cfg = load_config()
         file_reader = FileReader()
         yt_reader = YouTubeReader()
-        segmenter = SileroVAD(cfg)
         audio_exporter = AudioExporter()
-        asr = FasterWhisperASR(cfg)
         transcript_exporter = TranscriptExporter()
+        registry = get_registry()
+        # the registry outlives Streamlit reruns; warm-up is a no-op once models are loaded
+        if cfg.models.warmup and not cfg.server.url:
+            registry.warmup(cfg)
 
         st.subheader('Input')
         url = st.text_input('YouTube URL')
@@ -29,12 +31,16 @@ class StreamlitApp(BaseGUI):
 
         if st.button('Start'):
             st.write('Processing...')
+            if cfg.server.url and (url or upload is not None):
+                self._run_remote(cfg, url, upload)
+                return
             if url:
                 media_path = yt_reader.download(url)
             elif upload is not None:
                 fd, path = tempfile.mkstemp(suffix=os.path.splitext(upload.name)[1])
                 with os.fdopen(fd, 'wb') as f:
-                    f.write(upload.read())
+                    # copy in chunks instead of holding the whole upload in memory twice
+                    shutil.copyfileobj(upload, f, 1024 * 1024)
                 media_path = path
             else:
                 st.error('Please provide a URL or upload a file.')
@@ -45,16 +51,24 @@ class StreamlitApp(BaseGUI):
             wav_path = os.path.join(cfg.paths.converted_wav_dir, wav_name)
             st.write(f'Converted to WAV: {wav_path}')
 
-            segments = segmenter.segment(wav_path)
+            segmenter = registry.get_vad(cfg)
+            waveform = audio_exporter.load(wav_path)
+            segments, rejected = self.detect_segments(cfg, segmenter, waveform)
+            if rejected is not None:
+                st.write(f'Quality filter: {len(rejected)} segments rejected')
             st.write(f'Detected {len(segments)} speech segments')
 
             clips = audio_exporter.export(wav_path, segments)
             st.write(f'Exported {len(clips)} clips')
 
+            asr = registry.get_asr(cfg)
+            clip_paths = [os.path.join(cfg.paths.temp_dir, clip) for clip in clips]
+            # detect the language once for the whole source
+            language = asr.detect_language(clip_paths)
+            st.write(f'Language: {language}')
             transcripts = []
-            for clip in clips:
-                clip_path = os.path.join(cfg.paths.temp_dir, clip)
-                text = asr.transcribe(clip_path)
+            for clip_path in clip_paths:
+                text = asr.transcribe(clip_path, language)
                 transcripts.append(text)
             st.write('Transcription complete')
 
@@ -62,3 +76,22 @@ class StreamlitApp(BaseGUI):
             st.write('Generated transcripts:')
             for txt in txts:
                 st.write(txt)
+
+    def _run_remote(self, cfg, url, upload):
+        """
+        Hand the input to the job server and show its progress; the server's models do the work.
+        """
+        from modules.server.client import JobClient
+        client = JobClient(cfg.server.url)
+        # uploads are streamed to the server in chunks
+        inp = url or client.upload(upload, upload.name)
+        job_id = client.submit([inp])[0]
+        for event in client.events(job_id):
+            if event['event'] == 'log':
+                st.write(event['message'])
+        if event['error']:
+            st.error(event['error'])
+            return
+        st.write('Generated transcripts:')
+        for txt in event['txt_files'] or []:
+            st.write(txt)
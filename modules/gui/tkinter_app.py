@@ -3,17 +3,17 @@ from tkinter import filedialog, scrolledtext, messagebox
 import threading
 import os
 import winsound
-from concurrent.futures import ThreadPoolExecutor
-import shutil
+import io
 
 from .base_gui import BaseGUI
 from modules.input.file_reader import FileReader
 from modules.input.youtube_reader import YouTubeReader
-from modules.segmentation.silero_vad import SileroVAD
 from modules.output.audio_exporter import AudioExporter
-from modules.transcription.faster_whisper import FasterWhisperASR
 from modules.output.transcript_exporter import TranscriptExporter
+from modules.transcription.scheduler import TranscriptionScheduler
 from modules.utils.config import load_config
+from modules.utils.model_registry import get_models, get_registry
+from modules.utils.fileops import place_file
 
 
 class TkinterApp(BaseGUI):
@@ -33,6 +33,10 @@ class TkinterApp(BaseGUI):
         # Editor area for segment-by-segment review
         self.editor_frame = tk.Frame(self.root)
         self.editor_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.scheduler = None
+        # load models while the user picks an input
+        if self.cfg.models.warmup and not self.cfg.server.url:
+            get_registry().warmup(self.cfg)
 
     def browse_file(self):
         path = filedialog.askopenfilename(filetypes=[('Media files', '*.wav *.mp3 *.mp4'), ('All files', '*.*')])
@@ -52,9 +56,9 @@ class TkinterApp(BaseGUI):
         cfg = load_config()
         fr = FileReader()
         yt = YouTubeReader()
-        seg = SileroVAD(cfg)
+        # models are loaded once per process and reused across runs, or shared through the job server
+        seg, asr = get_models(cfg)
         exp_audio = AudioExporter()
-        asr = FasterWhisperASR(cfg)
         exp_txt = TranscriptExporter()
         # read or download
         self.log.insert(tk.END, f'Processing {inp}\n')
@@ -65,7 +69,10 @@ class TkinterApp(BaseGUI):
             wav = fr.convert_to_wav(media)
             wav_path = os.path.join(cfg.paths.converted_wav_dir, wav)
             self.log.insert(tk.END, f'WAV: {wav_path}\n')
-            segs = seg.segment(wav_path)
+            waveform = exp_audio.load(wav_path)
+            segs, rejected = self.detect_segments(cfg, seg, waveform)
+            if rejected is not None:
+                self.log.insert(tk.END, f'Rejected by quality filter: {len(rejected)}\n')
             self.log.insert(tk.END, f'Segments: {len(segs)}\n')
             # clear old segment files
             temp_dir = self.cfg.paths.temp_dir
@@ -78,15 +85,14 @@ class TkinterApp(BaseGUI):
                         pass
             clips = exp_audio.export(wav_path, segs)
             self.log.insert(tk.END, f'Clips: {len(clips)}\n')
-            # prepare for background transcription
+            # transcribe in review order: the segment on screen first, then a look-ahead window
             self.clips = clips
-            self.transcripts = [None] * len(clips)
-            # transcribe first clip synchronously for quick UI
-            self.transcripts[0] = asr.transcribe(clips[0])
-            # start background workers for remaining clips
-            self.executor = ThreadPoolExecutor(max_workers=min(4, len(clips)))
-            for i in range(1, len(clips)):
-                self.executor.submit(self._bg_transcribe, i, clips[i], asr)
+            if self.scheduler is not None:
+                self.scheduler.stop()
+            language = asr.detect_language(clips)
+            self.log.insert(tk.END, f'Language: {language}\n')
+            self.scheduler = TranscriptionScheduler(asr, clips, self._on_transcript,
+                                                    lookahead=cfg.gui.lookahead, language=language)
             self.current = 0
             # render first segment editor
             self.root.after(0, self._render_segment)
@@ -94,17 +100,26 @@ class TkinterApp(BaseGUI):
             self.log.insert(tk.END, f'Error: {e}\n')
         self.log.see(tk.END)
 
-    def _bg_transcribe(self, idx, clip_path, asr):
-        try:
-            text = asr.transcribe(clip_path)
-        except Exception as e:
-            text = f'[Error: {e}]'
-        self.transcripts[idx] = text
+    def _on_transcript(self, idx, text):
+        # called from a scheduler thread; hand the result over to the Tk event loop
+        self.root.after(0, self._show_transcript, idx)
+
+    def _show_transcript(self, idx):
+        if idx == self.current and self.scheduler is not None:
+            self._update_text_area()
 
     def _play_clip(self):
         # clip paths are full paths
         path = self.clips[self.current]
-        winsound.PlaySound(path, winsound.SND_FILENAME)
+        if path.lower().endswith('.wav'):
+            winsound.PlaySound(path, winsound.SND_FILENAME)
+            return
+        # winsound only plays wav; decode flac/opus clips to an in-memory wav
+        import soundfile as sf
+        data, sr = sf.read(path, dtype='int16')
+        buf = io.BytesIO()
+        sf.write(buf, data, sr, format='WAV', subtype='PCM_16')
+        winsound.PlaySound(buf.getvalue(), winsound.SND_MEMORY)
 
     def _save_next(self):
         # save edited transcript and corresponding wav to nested folder
@@ -119,8 +134,9 @@ class TkinterApp(BaseGUI):
         else:
             subdir = self.cfg.paths.resulted_corpus_dir
         os.makedirs(subdir, exist_ok=True)
-        # copy wav file into subdir
-        shutil.copy2(clip_path, subdir)
+        # link the clip into subdir; it must stay in place for replay, so never move it
+        placement = self.cfg.export.placement
+        place_file(clip_path, subdir, 'link' if placement == 'move' else placement)
         # write transcript
         base, _ = os.path.splitext(name)
         txt_path = os.path.join(subdir, f'{base}.txt')
@@ -156,20 +172,19 @@ class TkinterApp(BaseGUI):
         tk.Button(btn_frame, text='Previous', command=self._prev).pack(side=tk.LEFT, padx=5)
         self.save_btn = tk.Button(btn_frame, text='Save & Next', command=self._save_next)
         self.save_btn.pack(side=tk.LEFT, padx=5)
-        # start polling for transcript readiness now that save_btn exists
+        # move the scheduler's priority window to this segment; its result arrives via callback
+        self.scheduler.focus(idx)
         self._update_text_area()
 
     def _update_text_area(self):
-        # check if transcript available
+        # show the transcript if ready; otherwise _on_transcript calls back when it is
         idx = self.current
-        txt = self.transcripts[idx]
+        txt = self.scheduler.result(idx)
         self.text_widget.config(state='normal')
         self.text_widget.delete('1.0', tk.END)
         if txt is None:
             self.text_widget.insert('1.0', 'Transcribing...')
             self.save_btn.config(state='disabled')
-            # poll again after 500ms
-            self.root.after(500, self._update_text_area)
         else:
             self.text_widget.insert('1.0', txt)
             self.save_btn.config(state='normal')
@@ -1,13 +1,21 @@
 from uuid import uuid4
 from datetime import datetime
+from typing import Iterator, Optional
 import time
 import os
 import subprocess
-import torchaudio
+import numpy as np
 
 # my module
+from modules.utils.fileops import node_name
 from .base_reader import AbstractReader
 
+# raw PCM formats ffmpeg can write to stdout: sample dtype and scale to [-1, 1)
+PCM_FORMATS = {
+    'f32le': (np.dtype('<f4'), 1.0),
+    's16le': (np.dtype('<i2'), 1.0 / 32768),
+}
+
 
 class FileReader(AbstractReader):
     """
@@ -20,6 +28,16 @@ class FileReader(AbstractReader):
         super().__init__()
     
 
+    def make_wav_name(self) -> str:
+        """
+        Generate a unique wav filename using timestamp, host name and UUID,
+        so names from several hosts writing to shared storage never collide.
+        """
+        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+        short_id = f"{node_name()}-{uuid4()}"
+        return f"{timestamp}_{short_id}.wav"
+
+
     def convert_to_wav(self, file_path):
         """
         Convert a file to wav format at 16kHz.
@@ -29,9 +47,7 @@ class FileReader(AbstractReader):
         temp_file_path = self.cfg.paths.converted_wav_dir
 
         # Generate a unique filename using timestamp and UUID
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-        short_id = str(uuid4())
-        temp_file_name = f"{timestamp}_{short_id}.wav"
+        temp_file_name = self.make_wav_name()
 
         # Build output path and check collision
         output_path = os.path.join(temp_file_path, temp_file_name)
@@ -55,6 +71,7 @@ class FileReader(AbstractReader):
         except Exception:
             # fallback to torchaudio-based conversion
             try:
+                import torchaudio
                 wav, sr = torchaudio.load(file_path)
                 if wav.size(0) > 1:
                     wav = wav.mean(dim=0, keepdim=True)
@@ -65,3 +82,97 @@ class FileReader(AbstractReader):
                 raise RuntimeError(f"ffmpeg 轉檔失敗且 torchaudio 轉檔亦失敗：{e}")
 
         return temp_file_name
+
+
+    def iter_chunks(self, file_path: str, chunk_sec: Optional[float] = None,
+                    wav_path: Optional[str] = None, stdin=None) -> Iterator[np.ndarray]:
+        """
+        Stream-decode a file to mono float32 PCM at the pipeline sample rate,
+        without writing a temp wav first.
+        :param file_path: Path to the input file.
+        :param chunk_sec: Chunk length in seconds; defaults to pipeline.decode_chunk_sec.
+        :param wav_path: Optionally also write the decoded audio to this wav file.
+        :param stdin: Readable pipe to decode from, with file_path set to 'pipe:0'.
+        :return: Iterator of fixed-size 1-D float32 chunks; the last one may be shorter.
+        """
+        sr = self.cfg.pipeline.sample_rate
+        chunk_samples = max(1, int((chunk_sec or self.cfg.pipeline.decode_chunk_sec) * sr))
+        sink = None
+        if wav_path:
+            import soundfile as sf
+            sink = sf.SoundFile(wav_path, 'w', samplerate=sr, channels=1, subtype='PCM_16')
+        try:
+            decoded = False
+            try:
+                for chunk in self._ffmpeg_chunks(file_path, chunk_samples, stdin=stdin):
+                    decoded = True
+                    if sink is not None:
+                        sink.write(chunk)
+                    yield chunk
+            except FileNotFoundError:
+                raise FileNotFoundError(
+                    "ffmpeg 未安裝或不在 PATH，請先安裝 ffmpeg 並確認可執行。"
+                )
+            except subprocess.CalledProcessError:
+                # chunks already handed out cannot be taken back; only fall back before the first one
+                if decoded or stdin is not None:
+                    raise
+                for chunk in self._torchaudio_chunks(file_path, chunk_samples):
+                    if sink is not None:
+                        sink.write(chunk)
+                    yield chunk
+        finally:
+            if sink is not None:
+                sink.close()
+
+
+    def _ffmpeg_chunks(self, file_path: str, chunk_samples: int, stdin=None) -> Iterator[np.ndarray]:
+        """
+        Decode with ffmpeg writing raw PCM to stdout and yield it in fixed-size chunks.
+        """
+        dtype, scale = PCM_FORMATS[self.cfg.pipeline.decode_format]
+        cmd = [
+            'ffmpeg', '-hide_banner', '-loglevel', 'error',
+            '-i', file_path,
+            '-vn', '-ac', '1', '-ar', str(self.cfg.pipeline.sample_rate),
+            '-f', self.cfg.pipeline.decode_format, 'pipe:1'
+        ]
+        proc = subprocess.Popen(cmd, stdin=stdin, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        chunk_bytes = chunk_samples * dtype.itemsize
+        try:
+            while True:
+                # a buffered read blocks until a full chunk or EOF
+                buf = proc.stdout.read(chunk_bytes)
+                if not buf:
+                    break
+                samples = np.frombuffer(buf, dtype=dtype, count=len(buf) // dtype.itemsize)
+                if scale != 1.0:
+                    samples = samples * np.float32(scale)
+                yield samples.astype(np.float32, copy=False)
+            if proc.wait() != 0:
+                raise subprocess.CalledProcessError(proc.returncode, cmd)
+        finally:
+            proc.stdout.close()
+            if proc.poll() is None:
+                # the consumer stopped early
+                proc.kill()
+                proc.wait()
+
+
+    def _torchaudio_chunks(self, file_path: str, chunk_samples: int) -> Iterator[np.ndarray]:
+        """
+        Fallback decoder with the same chunked interface as `_ffmpeg_chunks`.
+        """
+        sr = self.cfg.pipeline.sample_rate
+        try:
+            import torchaudio
+            wav, orig_sr = torchaudio.load(file_path)
+            if wav.size(0) > 1:
+                wav = wav.mean(dim=0, keepdim=True)
+            if orig_sr != sr:
+                wav = torchaudio.transforms.Resample(orig_sr, sr)(wav)
+        except Exception as e:
+            raise RuntimeError(f"ffmpeg 轉檔失敗且 torchaudio 轉檔亦失敗：{e}")
+        samples = wav.squeeze(0).numpy().astype(np.float32, copy=False)
+        for start in range(0, len(samples), chunk_samples):
+            yield samples[start:start + chunk_samples]
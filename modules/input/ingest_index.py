@@ -0,0 +1,127 @@
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, List, Sequence, Tuple
+
+# my module
+from modules.utils.cache import hash_file
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    hash TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_hash ON files (hash);
+CREATE TABLE IF NOT EXISTS contents (
+    hash TEXT PRIMARY KEY,
+    status TEXT NOT NULL DEFAULT 'pending',  -- pending or done
+    done_at REAL
+);
+"""
+
+
+def iter_media(root: str, extensions: Sequence[str]) -> Iterator[Tuple[str, int, int]]:
+    """
+    Walk a directory tree and yield (path, size, mtime_ns) of every media file.
+    Uses scandir, so most platforms need no extra stat call per file.
+    """
+    extensions = tuple(ext.lower() for ext in extensions)
+    stack = [root]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name.lower().endswith(extensions) and entry.is_file():
+                        st = entry.stat()
+                        yield entry.path, st.st_size, st.st_mtime_ns
+                except OSError:
+                    # vanished or unreadable while scanning
+                    continue
+
+
+class IngestIndex:
+    """
+    SQLite index of the media under a drop folder. A scan is incremental: only files
+    whose (size, mtime) changed since the last scan are hashed, in parallel. Byte-identical
+    files share one content hash, and a content is handed out until it is marked done,
+    so each recording is processed once however many copies or names it has.
+    """
+    def __init__(self, db_path: str, hash_workers: int = 8):
+        """
+        :param db_path: SQLite database file, created on first use
+        :param hash_workers: threads hashing new or changed files
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript(SCHEMA)
+        self.hash_workers = max(1, hash_workers)
+
+    def scan(self, root: str, extensions: Sequence[str]) -> List[str]:
+        """
+        Update the index from the tree under root and return one path per content
+        that is not done yet, in path order.
+        :param root: directory to scan recursively
+        :param extensions: media file extensions to include, e.g. ('.mp4', '.wav')
+        """
+        root = os.path.abspath(root)
+        # every path under root sorts between these two bounds: SQLite compares UTF-8 bytes,
+        # and whatever follows the separator, the successor of the separator sorts after it
+        prefix = os.path.join(root, '')
+        bounds = (prefix, prefix[:-1] + chr(ord(os.sep) + 1))
+        known = {path: (size, mtime_ns) for path, size, mtime_ns in self.conn.execute(
+            'SELECT path, size, mtime_ns FROM files WHERE path >= ? AND path < ?', bounds)}
+        seen = set()
+        changed = []
+        for path, size, mtime_ns in iter_media(root, extensions):
+            seen.add(path)
+            if known.get(path) != (size, mtime_ns):
+                changed.append((path, size, mtime_ns))
+        hashed = self._hash(changed)
+        with self.conn:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO files (path, size, mtime_ns, hash) VALUES (?, ?, ?, ?)', hashed)
+            self.conn.executemany('INSERT OR IGNORE INTO contents (hash) VALUES (?)',
+                                  [(row[3],) for row in hashed])
+            self.conn.executemany('DELETE FROM files WHERE path = ?', [(p,) for p in known.keys() - seen])
+        rows = self.conn.execute(
+            "SELECT MIN(f.path) FROM files f JOIN contents c ON c.hash = f.hash "
+            "WHERE c.status != 'done' AND f.path >= ? AND f.path < ? GROUP BY f.hash ORDER BY 1",
+            bounds)
+        return [path for path, in rows]
+
+    def _hash(self, files: List[Tuple[str, int, int]]) -> List[Tuple[str, int, int, str]]:
+        """
+        Hash files in parallel; hashlib releases the GIL, so threads keep several disks busy.
+        Files that disappear before they are hashed are left out.
+        """
+        def one(item):
+            try:
+                return item + (hash_file(item[0]),)
+            except OSError:
+                return None
+
+        with ThreadPoolExecutor(max_workers=self.hash_workers) as executor:
+            return [row for row in executor.map(one, files) if row is not None]
+
+    def mark_done(self, paths: Iterable[str]):
+        """
+        Mark the contents of these indexed paths as processed, including every duplicate.
+        """
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE contents SET status = 'done', done_at = ? "
+                "WHERE hash = (SELECT hash FROM files WHERE path = ?)",
+                [(now, os.path.abspath(p)) for p in paths])
+
+    def close(self):
+        self.conn.close()
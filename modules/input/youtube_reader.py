@@ -1,7 +1,10 @@
+import json
 import os
 import subprocess
+from typing import Iterator, List, Optional
 from uuid import uuid4
 from datetime import datetime
+import numpy as np
 
 from .base_reader import AbstractReader
 from .file_reader import FileReader
@@ -9,16 +12,24 @@ from .file_reader import FileReader
 
 class YouTubeReader(AbstractReader):
     """
-    Reader that downloads a YouTube video to a local file.
+    Reader that downloads the audio stream of a YouTube video to a local file.
     """
     def __init__(self):
         super().__init__()
         # delegate WAV conversion to FileReader
         self._file_reader = FileReader()
 
+    def _yt_dlp(self, args: List[str], **kwargs) -> subprocess.CompletedProcess:
+        try:
+            return subprocess.run(['yt-dlp'] + args, check=True, **kwargs)
+        except FileNotFoundError:
+            raise FileNotFoundError(
+                "yt-dlp 執行檔未找到，請先透過 'pip install yt-dlp' 安裝並確認可執行於 PATH 中。"
+            )
+
     def _download_video(self, url: str) -> str:
         """
-        Download a YouTube video using yt-dlp and return the file path.
+        Download the audio of a video using yt-dlp and return the file path.
         """
         output_dir = self.cfg.paths.temp_dir
         os.makedirs(output_dir, exist_ok=True)
@@ -28,22 +39,20 @@ class YouTubeReader(AbstractReader):
         filename_tmpl = f"{timestamp}_{short_id}.%(ext)s"
         output_template = os.path.join(output_dir, filename_tmpl)
 
-        try:
-            subprocess.run([
-                'yt-dlp',
-                '-o', output_template,
-                url
-            ], check=True)
-        except FileNotFoundError:
-            raise FileNotFoundError(
-                "yt-dlp 執行檔未找到，請先透過 'pip install yt-dlp' 安裝並確認可執行於 PATH 中。"
-            )
-
-        # locate the actual downloaded file with correct extension
-        for fname in os.listdir(output_dir):
-            if fname.startswith(f"{timestamp}_{short_id}."):
-                return os.path.join(output_dir, fname)
-        raise RuntimeError(f"下載完成但找不到檔案: {timestamp}_{short_id}")
+        # prefer an audio-only format and have yt-dlp report the final path,
+        # so nothing has to be looked up in temp_dir afterwards
+        result = self._yt_dlp([
+            '-f', self.cfg.download.format,
+            '--no-playlist',
+            '-o', output_template,
+            '--print', 'after_move:filepath',
+            '--no-simulate',
+            url
+        ], stdout=subprocess.PIPE, text=True)
+        lines = [line for line in result.stdout.splitlines() if line.strip()]
+        if not lines or not os.path.exists(lines[-1]):
+            raise RuntimeError(f"下載完成但找不到檔案: {timestamp}_{short_id}")
+        return lines[-1]
 
     def _convert_video_to_wav(self, video_path: str) -> str:
         """
@@ -53,10 +62,46 @@ class YouTubeReader(AbstractReader):
 
     def download(self, url: str) -> str:
         """
-        Download a YouTube video and return the local file path.
+        Download a YouTube video's audio and return the local file path.
         """
         return self._download_video(url)
 
+    def expand(self, url: str) -> List[str]:
+        """
+        Expand a playlist or channel URL into its video URLs; a single video is returned as-is.
+        """
+        result = self._yt_dlp(['--flat-playlist', '-J', url], stdout=subprocess.PIPE, text=True)
+        info = json.loads(result.stdout)
+        if info.get('_type') != 'playlist':
+            return [url]
+        return [entry.get('webpage_url') or entry['url'] for entry in info.get('entries') or []]
+
+    def iter_chunks(self, url: str, chunk_sec: Optional[float] = None,
+                    wav_path: Optional[str] = None) -> Iterator[np.ndarray]:
+        """
+        Pipe yt-dlp's output straight into the ffmpeg decoder and yield float32 chunks,
+        so segmentation can start before the download finishes. Nothing is written to temp_dir.
+        """
+        try:
+            download = subprocess.Popen([
+                'yt-dlp', '-f', self.cfg.download.format, '--no-playlist',
+                '--quiet', '--no-warnings', '-o', '-', url
+            ], stdout=subprocess.PIPE)
+        except FileNotFoundError:
+            raise FileNotFoundError(
+                "yt-dlp 執行檔未找到，請先透過 'pip install yt-dlp' 安裝並確認可執行於 PATH 中。"
+            )
+        try:
+            yield from self._file_reader.iter_chunks('pipe:0', chunk_sec=chunk_sec,
+                                                     wav_path=wav_path, stdin=download.stdout)
+            if download.wait() != 0:
+                raise RuntimeError(f"yt-dlp 下載失敗: {url}")
+        finally:
+            download.stdout.close()
+            if download.poll() is None:
+                download.kill()
+                download.wait()
+
     def convert_to_wav(self, url: str) -> str:
         """
         Download a YouTube URL and convert it to wav, returning the wav filename.
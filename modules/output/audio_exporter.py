@@ -1,13 +1,16 @@
 import os
-from typing import List, Tuple
-import torchaudio
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+import numpy as np
 
 from modules.utils.config import load_config
+from modules.utils.audio import CODECS, load_waveform, segment_views, write_clip
 
 
 class AudioExporter:
     """
-    Export segments of a wav file into separate wav files.
+    Export segments of a wav file into separate clip files, encoded with
+    `export.codec` (wav, flac or opus) by a pool of `export.encoder_threads` threads.
     """
     def __init__(self):
         self.cfg = load_config()
@@ -15,32 +18,59 @@ class AudioExporter:
         # use chunked_wav_dir from config for VAD output
         self.output_dir = self.cfg.paths.chunked_wav_dir
         os.makedirs(self.output_dir, exist_ok=True)
+        self.codec = self.cfg.export.codec
+        if self.codec not in CODECS:
+            raise ValueError(f"Unsupported export codec: {self.codec}")
 
-    def export(self, wav_path: str, segments: List[Tuple[float, float]]) -> List[str]:
+    def load(self, wav_path: str) -> np.ndarray:
         """
-        Split wav at given time segments and save each as a separate wav file.
+        Decode the source wav once so segments can be sliced from memory.
         :param wav_path: Path to source wav
+        :return: 1-D float32 waveform at the pipeline sample rate
+        """
+        return load_waveform(wav_path, self.sample_rate)
+
+    def slice(self, waveform: np.ndarray, segments: List[Tuple[float, float]]) -> List[np.ndarray]:
+        """
+        Return in-memory views of each segment, ready to be passed to ASR.
+        :param waveform: Waveform returned by `load`
         :param segments: List of (start_sec, end_sec)
-        :return: List of output filenames
+        :return: List of float32 sample-range views
         """
-        waveform, sr = torchaudio.load(wav_path)
-        if sr != self.sample_rate:
-            # resample if needed
-            waveform = torchaudio.transforms.Resample(sr, self.sample_rate)(waveform)
-            sr = self.sample_rate
+        return segment_views(waveform, segments, self.sample_rate)
 
+    def clip_paths(self, wav_path: str, count: int) -> List[str]:
+        """
+        Compute the clip paths `export` would write, without writing anything.
+        :param wav_path: Path to source wav
+        :param count: Number of segments
+        :return: List of full clip paths
+        """
         base_name = os.path.splitext(os.path.basename(wav_path))[0]
-        # create a dedicated subfolder under temp for this source file
         subdir = os.path.join(self.output_dir, base_name)
-        os.makedirs(subdir, exist_ok=True)
-        out_paths = []  # list of full paths for each segment
-        for idx, (start, end) in enumerate(segments):
-            start_frame = int(start * sr)
-            end_frame = int(end * sr)
-            segment_wave = waveform[:, start_frame:end_frame]
-            out_filename = f"{base_name}_{idx:03d}.wav"
-            # save into the file-specific subfolder
-            out_path = os.path.join(subdir, out_filename)
-            torchaudio.save(out_path, segment_wave, sr)
-            out_paths.append(out_path)
+        ext = CODECS[self.codec][2]
+        return [os.path.join(subdir, f"{base_name}_{idx:03d}{ext}") for idx in range(count)]
+
+    def export(self, wav_path: str, segments: List[Tuple[float, float]],
+               waveform: Optional[np.ndarray] = None) -> List[str]:
+        """
+        Split wav at given time segments and save each as a separate clip file.
+        :param wav_path: Path to source wav
+        :param segments: List of (start_sec, end_sec)
+        :param waveform: Already decoded waveform of wav_path; loaded from disk if omitted
+        :return: List of output filenames
+        """
+        if waveform is None:
+            waveform = self.load(wav_path)
+
+        out_paths = self.clip_paths(wav_path, len(segments))
+        if out_paths:
+            # create a dedicated subfolder under temp for this source file
+            os.makedirs(os.path.dirname(out_paths[0]), exist_ok=True)
+        # libsndfile releases the GIL while encoding, so clips are encoded in parallel
+        with ThreadPoolExecutor(max_workers=max(1, self.cfg.export.encoder_threads)) as executor:
+            list(executor.map(
+                lambda item: write_clip(item[0], item[1], self.sample_rate, self.codec),
+                zip(out_paths, self.slice(waveform, segments))
+            ))
         return out_paths
@@ -0,0 +1,116 @@
+import io
+import json
+import os
+import tarfile
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional, Tuple
+from uuid import uuid4
+import numpy as np
+
+from modules.utils.config import load_config
+from modules.utils.audio import CODECS, write_clip
+from modules.utils.fileops import node_name
+
+
+class ShardExporter:
+    """
+    Stream (audio, transcript, metadata) samples into size-capped tar shards in
+    WebDataset layout (`<key>.<codec ext>`, `<key>.txt`, `<key>.json` per sample), with a
+    JSONL manifest recording the shard and byte offset of every sample.
+    Each sample is encoded in memory and written exactly once, sequentially.
+    """
+    def __init__(self):
+        self.cfg = load_config()
+        self.sample_rate = self.cfg.pipeline.sample_rate
+        self.output_dir = os.path.join(self.cfg.paths.resulted_corpus_dir, 'shards')
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.max_bytes = self.cfg.export.shard_max_mb * 1024 * 1024
+        # writer id keeps shards from concurrent processes or hosts apart
+        self.writer_id = f"{datetime.now().strftime('%Y%m%d%H%M%S')}_{node_name()}-{os.getpid()}-{uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._tar = None
+        self._shard_path = None
+        self._shard_index = -1
+        self._manifest = None
+
+    def _open_next_shard(self):
+        # caller holds self._lock
+        if self._tar is not None:
+            self._tar.close()
+        self._shard_index += 1
+        self._shard_path = os.path.join(self.output_dir, f'{self.writer_id}-{self._shard_index:06d}.tar')
+        # pax: keys carry the host name and a uuid, and may pass ustar's 100-character name limit
+        self._tar = tarfile.open(self._shard_path, 'w', format=tarfile.PAX_FORMAT, encoding='utf-8')
+        if self._manifest is None:
+            self._manifest = open(os.path.join(self.output_dir, f'{self.writer_id}.jsonl'), 'a', encoding='utf-8')
+
+    @staticmethod
+    def _member(name: str, data: bytes, mtime: int) -> Tuple[tarfile.TarInfo, bytes, int]:
+        """
+        :return: (header, data, bytes the member takes in the shard)
+        """
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        # a whole-second mtime; a float one would cost every member an extra pax header
+        info.mtime = mtime
+        # the header grows by a pax record when the name is long or not ASCII; data is padded to a block
+        header = info.tobuf(tarfile.PAX_FORMAT, 'utf-8', 'surrogateescape')
+        return info, data, len(header) + -(-len(data) // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+
+    def export(self, wav_path: str, segments: List[Tuple[float, float]], waveform: np.ndarray,
+               transcripts: List[str], source: Optional[str] = None) -> List[str]:
+        """
+        Append one source's segments to the current shard, starting a new shard
+        whenever the size cap would be exceeded.
+        :param wav_path: Path of the converted source wav; its name prefixes the sample keys
+        :param segments: List of (start_sec, end_sec)
+        :param waveform: Decoded source waveform
+        :param transcripts: Transcript of each segment
+        :param source: Original input (file path or URL), stored in the metadata
+        :return: List of sample keys written
+        """
+        ext = CODECS[self.cfg.export.codec][2]
+        base_name = os.path.splitext(os.path.basename(wav_path))[0]
+        keys = []
+        for idx, ((start, end), text) in enumerate(zip(segments, transcripts)):
+            key = f"{base_name}_{idx:03d}"
+            clip = waveform[int(start * self.sample_rate):int(end * self.sample_rate)]
+            buf = io.BytesIO()
+            write_clip(buf, clip, self.sample_rate, self.cfg.export.codec)
+            meta = {
+                'key': key, 'source': source, 'start': start, 'end': end,
+                'duration': len(clip) / self.sample_rate, 'sample_rate': self.sample_rate,
+            }
+            now = int(time.time())
+            members = [
+                self._member(f'{key}{ext}', buf.getvalue(), now),
+                self._member(f'{key}.txt', text.encode('utf-8'), now),
+                self._member(f'{key}.json', json.dumps(meta, ensure_ascii=False).encode('utf-8'), now),
+            ]
+            sample_bytes = sum(size for _, _, size in members)
+            with self._lock:
+                if self._tar is None or (self._tar.offset > 0 and self._tar.offset + sample_bytes > self.max_bytes):
+                    self._open_next_shard()
+                offset = self._tar.offset
+                for info, data, _ in members:
+                    self._tar.addfile(info, io.BytesIO(data))
+                self._tar.fileobj.flush()
+                record = dict(meta, text=text, shard=os.path.basename(self._shard_path), offset=offset)
+                self._manifest.write(json.dumps(record, ensure_ascii=False) + '\n')
+                self._manifest.flush()
+            keys.append(key)
+        return keys
+
+    def close(self):
+        """
+        Finish the current shard and the manifest.
+        """
+        with self._lock:
+            if self._tar is not None:
+                self._tar.close()
+                self._tar = None
+            if self._manifest is not None:
+                self._manifest.close()
+                self._manifest = None
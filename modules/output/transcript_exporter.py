@@ -1,7 +1,7 @@
 import os
-import shutil
 from typing import List
 from modules.utils.config import load_config
+from modules.utils.fileops import place_file
 
 
 class TranscriptExporter:
@@ -11,12 +11,15 @@ class TranscriptExporter:
     def __init__(self):
         cfg = load_config()
         self.output_dir = cfg.paths.resulted_corpus_dir
+        self.placement = cfg.export.placement
 
-    def export(self, segment_files: List[str], transcripts: List[str]) -> List[str]:
+    def export(self, segment_files: List[str], transcripts: List[str], copy_audio: bool = True) -> List[str]:
         """
-        Write each transcript to a .txt file named after the segment wav.
+        Write each transcript to a .txt file named after the segment clip.
+        The clip itself is hardlinked, moved or copied next to it per `export.placement`.
         :param segment_files: list of full wav file paths
         :param transcripts: list of corresponding transcript strings
+        :param copy_audio: copy each wav next to its transcript; disable when clips were not written
         :return: list of txt full paths
         """
         out_paths = []
@@ -30,8 +33,9 @@ class TranscriptExporter:
                 timestamp, uid = parts[0], parts[1]
                 subdir = os.path.join(self.output_dir, timestamp, uid)
                 os.makedirs(subdir, exist_ok=True)
-            # copy wav file
-            shutil.copy2(wav_path, subdir)
+            # place clip file without duplicating its bytes where possible
+            if copy_audio:
+                place_file(wav_path, subdir, self.placement)
             # write txt alongside
             base, _ = os.path.splitext(fname)
             txt_name = f"{base}.txt"
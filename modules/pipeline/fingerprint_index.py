@@ -0,0 +1,255 @@
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+import numpy as np
+
+# my module
+from modules.utils.audio import as_float32
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,  -- content hash and input path of the source, or only the path
+    input TEXT NOT NULL,
+    span TEXT NOT NULL,
+    duration REAL NOT NULL,
+    signature BLOB NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',  -- pending, done or rejected
+    transcript TEXT,
+    UNIQUE (source, span)
+);
+CREATE TABLE IF NOT EXISTS bands (
+    band INTEGER NOT NULL,
+    key INTEGER NOT NULL,
+    segment_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS bands_key ON bands (band, key);
+CREATE TABLE IF NOT EXISTS sources (
+    source TEXT PRIMARY KEY,
+    input TEXT NOT NULL,
+    segments INTEGER NOT NULL,
+    duplicates INTEGER NOT NULL,
+    updated REAL NOT NULL
+);
+"""
+
+# spectrogram for peak picking: 32 ms frames every 16 ms at 16 kHz
+N_FFT = 512
+HOP = 256
+# frequency bins kept for peaks (about 150 Hz - 4 kHz at 16 kHz); 7 bits each in a landmark
+LOW_BIN, HIGH_BIN = 5, 128
+# neighbourhood (frames, bins) a spectral peak must dominate
+PEAK_AREA = (9, 9)
+PEAKS_PER_SEC = 30
+# each peak is paired with this many later peaks at most 63 frames (~1 s) ahead
+FAN_OUT = 5
+MAX_DT = 63
+MIN_LANDMARKS = 20  # fewer landmarks (silence, a click) are too weak to call a duplicate
+# MinHash permutations (a * x + b) mod MERSENNE_PRIME; a fixed seed keeps stored signatures comparable
+MERSENNE_PRIME = (1 << 61) - 1
+SEED = 1
+# bumped when the meaning of stored rows changes, so an old index is not mixed with new keys
+INDEX_VERSION = 2
+
+
+def landmarks(clip: np.ndarray, sample_rate: int) -> np.ndarray:
+    """
+    Spectral-peak landmarks of a clip: pairs of prominent time-frequency peaks encoded as
+    (f1, f2, dt) integers. They depend only on relative timing, so they survive different
+    cut points, gain changes and lossy re-encoding of the same audio.
+    :param clip: Mono samples (float32, or int16 when memory-mapped).
+    :param sample_rate: Sample rate of the clip; other rates are scaled onto the 16 kHz bins.
+    :return: Sorted unique landmark hashes (int64).
+    """
+    x = as_float32(clip)
+    n_fft = max(64, int(N_FFT * sample_rate / 16000))
+    hop = n_fft * HOP // N_FFT
+    if len(x) < n_fft + hop * PEAK_AREA[0]:
+        return np.zeros(0, dtype=np.int64)
+    frames = np.lib.stride_tricks.sliding_window_view(x, n_fft)[::hop]
+    spec = np.abs(np.fft.rfft(frames * np.hanning(n_fft).astype(np.float32), axis=1))
+    spec = np.log(spec[:, LOW_BIN:HIGH_BIN] + 1e-6)
+
+    # a peak is the maximum of its neighbourhood and stands out from the clip's average level
+    # the 2-D maximum filter is separable: over time, then over frequency
+    local_max = spec
+    for axis, size in enumerate(PEAK_AREA):
+        pad = [(0, 0), (0, 0)]
+        pad[axis] = (size // 2, size // 2)
+        padded = np.pad(local_max, pad, constant_values=-np.inf)
+        local_max = np.lib.stride_tricks.sliding_window_view(padded, size, axis=axis).max(axis=-1)
+    t, f = np.nonzero((spec == local_max) & (spec > spec.mean() + spec.std()))
+    # keep the strongest peaks only
+    limit = max(1, int(PEAKS_PER_SEC * len(x) / sample_rate))
+    if len(t) > limit:
+        strongest = np.argsort(spec[t, f])[-limit:]
+        t, f = t[strongest], f[strongest]
+    order = np.lexsort((f, t))
+    t, f = t[order], f[order]
+
+    hashes = []
+    for step in range(1, FAN_OUT + 1):
+        gap = t[step:] - t[:-step]
+        valid = (gap > 0) & (gap <= MAX_DT)
+        hashes.append((f[:-step][valid].astype(np.int64) << 13) | (f[step:][valid].astype(np.int64) << 6) | gap[valid])
+    return np.unique(np.concatenate(hashes)) if hashes else np.zeros(0, dtype=np.int64)
+
+
+@dataclass
+class DuplicateMatch:
+    segment_id: int
+    input: str
+    span: str
+    similarity: float  # estimated Jaccard similarity of the landmark sets
+    status: str
+    transcript: Optional[str]
+
+
+class FingerprintIndex:
+    """
+    Persistent SQLite index of segment fingerprints for near-duplicate detection.
+    Each segment's landmark set is reduced to a MinHash signature, whose bands are indexed
+    (locality-sensitive hashing): a lookup only compares against segments sharing a band,
+    so the cost does not grow with the number of indexed segments.
+    Only first occurrences are added, and their transcripts are stored once known, so a
+    later copy in any source can reuse or suppress it.
+    """
+    def __init__(self, db_path: str, num_perm: int = 64, bands: int = 32,
+                 threshold: float = 0.4, max_duration_diff: float = 0.25):
+        """
+        :param db_path: SQLite database file, created on first use
+        :param num_perm: MinHash signature length
+        :param bands: LSH bands the signature is split into; more bands find weaker matches
+        :param threshold: minimum estimated Jaccard similarity of a duplicate
+        :param max_duration_diff: maximum duration difference of a duplicate, relative to the longer one
+        """
+        if num_perm % bands:
+            raise ValueError(f'num_perm ({num_perm}) must be a multiple of bands ({bands})')
+        self.num_perm = num_perm
+        self.bands = bands
+        self.threshold = threshold
+        self.max_duration_diff = max_duration_diff
+        rng = np.random.default_rng(SEED)
+        # a < 2^43 keeps a * x + b below 2^64 for the 20-bit landmarks
+        self._a = rng.integers(1, 1 << 43, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, MERSENNE_PRIME, num_perm, dtype=np.uint64)
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        # shared by the pipeline's threads; several processes coordinate through SQLite's file locks
+        self.conn = sqlite3.connect(db_path, timeout=60, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._check_meta()
+
+    @classmethod
+    def from_config(cls, cfg) -> 'FingerprintIndex':
+        d = cfg.dedup
+        return cls(d.index_db or os.path.join(cfg.paths.cache_dir, 'fingerprints.sqlite'),
+                   num_perm=d.num_perm, bands=d.bands, threshold=d.threshold,
+                   max_duration_diff=d.max_duration_diff)
+
+    def _check_meta(self):
+        params = f'v{INDEX_VERSION}:{self.num_perm}:{self.bands}:{SEED}:{N_FFT}:{HOP}:{LOW_BIN}:{HIGH_BIN}:{FAN_OUT}:{MAX_DT}'
+        with self._lock, self.conn:
+            self.conn.execute('INSERT OR IGNORE INTO meta (key, value) VALUES (?, ?)', ('params', params))
+            stored, = self.conn.execute("SELECT value FROM meta WHERE key = 'params'").fetchone()
+        if stored != params:
+            raise ValueError(f'Fingerprint index was built with other parameters ({stored}); '
+                             'use a new dedup.index_db')
+
+    def signature(self, clip: np.ndarray, sample_rate: int) -> Optional[np.ndarray]:
+        """
+        MinHash signature of a clip's landmarks, or None if the clip has too few of them.
+        """
+        hashes = landmarks(clip, sample_rate).astype(np.uint64)
+        if len(hashes) < MIN_LANDMARKS:
+            return None
+        # (a * x + b) mod p for all permutations at once
+        permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % np.uint64(MERSENNE_PRIME)
+        return permuted.min(axis=1)
+
+    def _band_keys(self, signature: np.ndarray) -> List[int]:
+        rows = signature.reshape(self.bands, -1)
+        # fold each band into a signed 63-bit key SQLite can store
+        keys = np.bitwise_xor.reduce(rows * np.uint64(0x9E3779B97F4A7C15)
+                                     + np.arange(rows.shape[1], dtype=np.uint64), axis=1)
+        return [int(key >> np.uint64(1)) for key in keys]
+
+    def lookup(self, signature: np.ndarray, duration: float, source: str, span: str) -> Optional[DuplicateMatch]:
+        """
+        Best indexed near-duplicate of a segment, other than the segment itself.
+        :param signature: from `signature`
+        :param duration: segment length in seconds
+        :param source: source key of the segment
+        :param span: 'start-end' of the segment within its source
+        """
+        keys = self._band_keys(signature)
+        with self._lock:
+            rows = self.conn.execute(
+                'SELECT DISTINCT s.id, s.source, s.input, s.span, s.duration, s.signature, s.status, s.transcript '
+                'FROM bands b JOIN segments s ON s.id = b.segment_id WHERE ' +
+                ' OR '.join(['(b.band = ? AND b.key = ?)'] * len(keys)),
+                [value for band, key in enumerate(keys) for value in (band, key)]).fetchall()
+        best = None
+        for seg_id, other_source, other_input, other_span, other_duration, blob, status, transcript in rows:
+            if (other_source, other_span) == (source, span):
+                continue
+            if abs(other_duration - duration) > self.max_duration_diff * max(other_duration, duration):
+                continue
+            similarity = float(np.mean(np.frombuffer(blob, dtype=np.uint64) == signature))
+            if similarity >= self.threshold and (best is None or similarity > best.similarity):
+                best = DuplicateMatch(seg_id, other_input, other_span, similarity, status, transcript)
+        return best
+
+    def add(self, signature: np.ndarray, duration: float, source: str, span: str, inp: str) -> int:
+        """
+        Index a first occurrence with its transcript still pending; adding a segment again
+        returns its existing id.
+        """
+        with self._lock, self.conn:
+            row = self.conn.execute('SELECT id FROM segments WHERE source = ? AND span = ?', (source, span)).fetchone()
+            if row is not None:
+                return row[0]
+            seg_id = self.conn.execute(
+                'INSERT INTO segments (source, input, span, duration, signature) VALUES (?, ?, ?, ?, ?)',
+                (source, inp, span, duration, signature.astype(np.uint64).tobytes())).lastrowid
+            self.conn.executemany('INSERT INTO bands (band, key, segment_id) VALUES (?, ?, ?)',
+                                  [(band, key, seg_id) for band, key in enumerate(self._band_keys(signature))])
+        return seg_id
+
+    def set_transcript(self, segment_id: int, transcript: Optional[str]):
+        """
+        Store the transcript of an indexed segment; None marks it rejected.
+        """
+        status = 'rejected' if transcript is None else 'done'
+        with self._lock, self.conn:
+            self.conn.execute('UPDATE segments SET status = ?, transcript = ? WHERE id = ?',
+                              (status, transcript, segment_id))
+
+    def record_source(self, source: str, inp: str, segments: int, duplicates: int):
+        """
+        Store the duplicate count of a source's latest run.
+        """
+        with self._lock, self.conn:
+            self.conn.execute('INSERT OR REPLACE INTO sources (source, input, segments, duplicates, updated) '
+                              'VALUES (?, ?, ?, ?, ?)', (source, inp, segments, duplicates, time.time()))
+
+    def report(self) -> List[Tuple[str, int, int]]:
+        """
+        (input, segments, duplicates) of every recorded source, highest duplicate rate first.
+        """
+        with self._lock:
+            return self.conn.execute(
+                'SELECT input, segments, duplicates FROM sources '
+                'ORDER BY CAST(duplicates AS REAL) / MAX(segments, 1) DESC, input').fetchall()
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,87 @@
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+
+@dataclass
+class InputState:
+    """
+    Progress of one input as replayed from the manifest.
+    """
+    wav_path: Optional[str] = None
+    segments: Optional[List[Tuple[float, float]]] = None
+    transcripts: Dict[int, Optional[str]] = field(default_factory=dict)  # None: rejected by the quality filter
+    done: bool = False
+    error: Optional[str] = None
+
+
+class JobManifest:
+    """
+    Append-only JSONL log of pipeline progress, one event per line:
+    start, decoded (wav path), segments, rejected (quality filter report), transcript
+    (one per segment), duplicate (near-duplicate report), done and error.
+    Every line is flushed and fsynced as soon as it is written, so a crashed or
+    preempted run loses at most the segment that was being transcribed.
+    """
+    def __init__(self, path: str):
+        """
+        :param path: manifest file; created if missing, appended to otherwise
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, 'a', encoding='utf-8')
+        # terminate a line cut short by a crash so the next record starts cleanly
+        if self._file.tell() > 0:
+            with open(path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    self._file.write('\n')
+                    self._file.flush()
+
+    def load(self) -> Dict[str, InputState]:
+        """
+        Replay the manifest into the latest state of each input.
+        A `start` event resets an input, so only its most recent run counts.
+        """
+        states: Dict[str, InputState] = {}
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # a line cut short by the crash
+                    continue
+                inp, event = record.get('input'), record.get('event')
+                if event == 'start':
+                    states[inp] = InputState()
+                    continue
+                state = states.setdefault(inp, InputState())
+                if event == 'decoded':
+                    state.wav_path = record['wav_path']
+                elif event == 'segments':
+                    state.segments = [tuple(seg) for seg in record['segments']]
+                    state.transcripts = {}
+                elif event == 'transcript':
+                    state.transcripts[record['index']] = record['text']
+                elif event == 'done':
+                    state.done = True
+                elif event == 'error':
+                    state.error = record['error']
+        return states
+
+    def record(self, inp: str, event: str, **data):
+        """
+        Append one event and force it to disk.
+        """
+        line = json.dumps({'input': inp, 'event': event, **data}, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        with self._lock:
+            self._file.close()
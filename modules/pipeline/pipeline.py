@@ -0,0 +1,489 @@
+import os
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+import numpy as np
+
+# my module
+from modules.input.file_reader import FileReader
+from modules.input.youtube_reader import YouTubeReader
+from modules.output.audio_exporter import AudioExporter
+from modules.output.transcript_exporter import TranscriptExporter
+from modules.segmentation.normalizer import SegmentNormalizer
+from modules.utils.cache import StageCache, hash_file, hash_params
+from modules.utils.metrics import NullMetrics
+from .fingerprint_index import FingerprintIndex
+from .manifest import InputState, JobManifest
+from .quality_filter import SegmentQualityFilter
+
+
+@dataclass
+class Job:
+    """
+    State of one input as it moves through the pipeline stages.
+    """
+    input: str
+    index: int = 0
+    media_path: Optional[str] = None
+    source_hash: Optional[str] = None  # content hash of the media, set when caching
+    wav_path: Optional[str] = None
+    waveform: Optional[np.ndarray] = None
+    audio_sec: Optional[float] = None  # decoded duration
+    segments: Optional[List[Tuple[float, float]]] = None
+    transcripts: Optional[List[str]] = None
+    rejected: int = 0  # segments dropped (or only flagged) by the quality filter
+    duplicates: int = 0  # segments found to be near-duplicates of earlier audio
+    txt_files: Optional[List[str]] = None
+    error: Optional[str] = None
+    resumed: Optional[InputState] = None  # progress of an interrupted earlier run
+    skipped: bool = False  # finished by an earlier run
+    cancelled: bool = False  # set from another thread; takes effect before the next stage
+    claimed_elsewhere: bool = False  # skipped because another node holds or finished its lease
+
+
+class Pipeline:
+    """
+    The per-input processing stages: acquire -> decode -> segment -> transcribe -> export.
+    Each stage takes a Job, fills in its own fields and returns nothing; runners decide
+    how the stages are scheduled.
+    """
+    STAGES = ('acquire', 'decode', 'segment', 'transcribe', 'export')
+
+    def __init__(self, cfg, segmenter, asr, stream: bool = False, keep_wav: bool = False, pipe_urls: bool = False,
+                 export_clips: bool = True, use_cache: bool = True, manifest_path: Optional[str] = None,
+                 resume: bool = False, metrics=None, log: Callable[[str], None] = print,
+                 lease_dir: Optional[str] = None, lease_ttl: float = 600.0):
+        """
+        :param cfg: AppConfig
+        :param segmenter: AbstractSegmenter instance
+        :param asr: AbstractASR instance
+        :param stream: decode through an ffmpeg pipe instead of a temp wav
+        :param keep_wav: with stream, also write the decoded wav
+        :param pipe_urls: with stream, pipe URL downloads straight into the decoder
+            instead of downloading to temp_dir first (such inputs are not cached)
+        :param export_clips: write audio clips next to the transcripts
+        :param use_cache: reuse cached conversion, VAD and ASR results (if enabled in config)
+        :param manifest_path: JSONL manifest recording progress of every input
+        :param resume: skip inputs the manifest marks done and continue unfinished ones
+        :param metrics: Metrics collecting per-stage timings; None disables instrumentation
+        :param log: progress callback
+        :param lease_dir: directory shared between nodes; inputs are only processed
+            after claiming a lease there, so several hosts can work through one input list
+        :param lease_ttl: seconds without heartbeat after which another node may take a lease
+        """
+        self.cfg = cfg
+        self.segmenter = segmenter
+        self.asr = asr
+        self.stream = stream
+        self.keep_wav = keep_wav
+        self.pipe_urls = pipe_urls and stream
+        self.export_clips = export_clips
+        self.log = log
+        self.metrics = metrics or NullMetrics()
+        self.file_reader = FileReader()
+        self.yt_reader = YouTubeReader()
+        self.audio_exporter = AudioExporter()
+        self.transcript_exporter = TranscriptExporter()
+        self.normalizer = SegmentNormalizer(cfg) if cfg.pipeline.vad.normalize else None
+        self.quality = SegmentQualityFilter(cfg) if cfg.quality.enabled else None
+        self.dedup = FingerprintIndex.from_config(cfg) if cfg.dedup.enabled else None
+        self.shard_exporter = None
+        if cfg.export.backend == 'tar':
+            from modules.output.shard_exporter import ShardExporter
+            self.shard_exporter = ShardExporter()
+        self.cache = StageCache.from_config(cfg) if use_cache and cfg.cache.enabled else None
+        self.manifest = JobManifest(manifest_path) if manifest_path else None
+        self.resumable = self.manifest.load() if self.manifest is not None and resume else {}
+        self.leases = None
+        if lease_dir:
+            from .sharding import LeaseManager
+            self.leases = LeaseManager(lease_dir, lease_ttl)
+
+    def process(self, job: Job) -> Job:
+        """
+        Run every stage on one job in order.
+        """
+        for stage in self.STAGES:
+            self.run_stage(stage, job)
+        return job
+
+    def run_stage(self, stage: str, job: Job) -> Job:
+        """
+        Run one stage, recording any exception on the job instead of raising.
+        Jobs that already failed, were skipped or were cancelled pass through untouched.
+        """
+        if job.cancelled and job.error is None:
+            job.error = 'cancelled'
+        if job.error is None and not job.skipped:
+            try:
+                with self.metrics.stage(stage, source=job.input) as measured:
+                    getattr(self, stage)(job)
+                    measured['audio_sec'] = job.audio_sec
+                    if stage == 'segment':
+                        measured['segments'] = len(job.segments)
+            except Exception as e:
+                job.error = f'{stage}: {e}'
+                self.log(f'[{job.input}] Error in {stage}: {e}')
+                self._record(job, 'error', error=job.error)
+        if job.error is not None and self.leases is not None:
+            # hand a failed input back; a later run or another node may retry it
+            self.leases.release(job.input, done=False)
+        return job
+
+    def _record(self, job: Job, event: str, **data):
+        if self.manifest is not None:
+            self.manifest.record(job.input, event, **data)
+
+    def acquire(self, job: Job):
+        """
+        Get a local media path, downloading URLs.
+        """
+        state = self.resumable.get(job.input)
+        if state is not None and state.done:
+            job.skipped = True
+            self.log(f'[{job.input}] Already done, skipping.')
+            return
+        if self.leases is not None and not self.leases.claim(job.input):
+            job.skipped = job.claimed_elsewhere = True
+            self.log(f'[{job.input}] Claimed or finished by another node, skipping.')
+            return
+        if state is not None and (state.wav_path or state.segments is not None):
+            job.resumed = state
+            self.log(f'[{job.input}] Resuming with {len(state.transcripts)} transcripts already done.')
+        else:
+            # a fresh start resets this input in the manifest
+            self._record(job, 'start')
+        if job.resumed is not None and job.resumed.wav_path and os.path.exists(job.resumed.wav_path):
+            # the converted wav survived, so the media is not needed again
+            return
+        if job.input.startswith('http') and not self.pipe_urls:
+            job.media_path = self.yt_reader.download(job.input)
+        else:
+            # local file, or a URL decoded straight from the download pipe
+            job.media_path = job.input
+
+    def _new_wav_path(self) -> str:
+        return os.path.join(self.cfg.paths.converted_wav_dir, self.file_reader.make_wav_name())
+
+    def _cache_for(self, job: Job) -> Optional[StageCache]:
+        """
+        The stage cache, if enabled and the job's content hash is known.
+        """
+        return self.cache if job.source_hash is not None else None
+
+    def _audio_key(self, job: Job) -> str:
+        return hash_params('audio', job.source_hash, self.cfg.pipeline.sample_rate)
+
+    def _segments_key(self, job: Job) -> str:
+        return hash_params('segments', job.source_hash, self.segmenter.cache_key())
+
+    def _transcripts_key(self, job: Job) -> str:
+        quality_key = self.quality.transcript_key() if self.quality is not None else ()
+        # transcripts of duplicates are dropped or copied, so they depend on the dedup settings
+        # and on the input path, since copies of one file under other names share the content hash
+        dedup_key = (('dedup', self.cfg.dedup.action, self.cfg.dedup.threshold, job.input)
+                     if self.dedup is not None and self.cfg.dedup.action != 'report' else ())
+        return hash_params('transcripts', job.source_hash, self.asr.cache_key(), *quality_key, *dedup_key)
+
+    def decode(self, job: Job):
+        """
+        Decode the media into an in-memory waveform. In stream mode VAD runs
+        while ffmpeg is still decoding, so segments are filled in here too.
+        A resumed job reloads its converted wav if it still exists and keeps its
+        earlier wav name, so clip names stay the same across runs.
+        """
+        resumed_wav = job.resumed.wav_path if job.resumed is not None else None
+        if job.resumed is not None and job.resumed.segments is not None:
+            job.segments = job.resumed.segments
+        if resumed_wav and os.path.exists(resumed_wav):
+            job.wav_path = resumed_wav
+            job.waveform = self.audio_exporter.load(resumed_wav)
+            self.log(f'[{job.input}] Reloaded WAV: {resumed_wav}')
+        else:
+            self._decode(job)
+            if resumed_wav:
+                job.wav_path = resumed_wav
+            else:
+                self._record(job, 'decoded', wav_path=job.wav_path)
+        job.audio_sec = len(job.waveform) / self.cfg.pipeline.sample_rate
+
+    def _decode(self, job: Job):
+        piped = self.pipe_urls and job.media_path.startswith('http')
+        if self.cache is not None and not piped:
+            job.source_hash = hash_file(job.media_path)
+            cached_wav = self.cache.get_file('audio', self._audio_key(job), '.wav')
+            if cached_wav is not None:
+                # the fresh wav name is only used to name clips; nothing is converted
+                job.wav_path = self._new_wav_path()
+                job.waveform = self.audio_exporter.load(cached_wav)
+                self.log(f'[{job.input}] Reused cached audio: {cached_wav}')
+                return
+            if job.segments is None:
+                # segments restored from the manifest index the saved transcripts; never replace them
+                job.segments = self._cached_segments(job)
+
+        if not self.stream:
+            # convert to wav
+            wav_name = self.file_reader.convert_to_wav(job.media_path)
+            job.wav_path = os.path.join(self.cfg.paths.converted_wav_dir, wav_name)
+            self.log(f'[{job.input}] Converted to WAV: {job.wav_path}')
+            if self.cache is not None:
+                self.cache.put_file('audio', self._audio_key(job), '.wav', job.wav_path)
+            # decode the source once and keep segments in memory for ASR
+            job.waveform = self.audio_exporter.load(job.wav_path)
+            return
+
+        # decode through a pipe; the temp wav is only written on request
+        job.wav_path = self._new_wav_path()
+        chunks = []
+
+        def decoded(stream):
+            # keep decoded chunks for ASR while VAD consumes them
+            for chunk in stream:
+                chunks.append(chunk)
+                yield chunk
+
+        reader = self.yt_reader if piped else self.file_reader
+        stream = decoded(reader.iter_chunks(job.media_path, wav_path=job.wav_path if self.keep_wav else None))
+        if job.segments is None:
+            job.segments = list(self.segmenter.iter_segments(stream))
+            if self._cache_for(job) is not None:
+                self.cache.put_json('segments', self._segments_key(job), job.segments)
+        else:
+            for _ in stream:
+                pass
+        job.waveform = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.float32)
+        self.log(f'[{job.input}] Decoded {len(job.waveform) / self.cfg.pipeline.sample_rate:.1f}s of audio.')
+        if self._cache_for(job) is not None:
+            self.cache.put_audio('audio', self._audio_key(job), job.waveform, self.cfg.pipeline.sample_rate)
+
+    def _cached_segments(self, job: Job) -> Optional[List[Tuple[float, float]]]:
+        segments = self.cache.get_json('segments', self._segments_key(job))
+        if segments is None:
+            return None
+        self.log(f'[{job.input}] Reused cached segments.')
+        return [tuple(seg) for seg in segments]
+
+    def segment(self, job: Job):
+        """
+        Detect speech segments, unless stream decoding or the cache already provided them,
+        then normalize their lengths and drop segments failing the quality checks.
+        The cache keeps the raw VAD output; resumed segments were normalized and filtered
+        by the earlier run and are kept as they are.
+        """
+        cache = self._cache_for(job)
+        probs = None
+        if job.segments is None and cache is not None:
+            job.segments = self._cached_segments(job)
+        if job.segments is None:
+            if self.quality is not None and self.quality.uses_probs:
+                # backends that score windows anyway hand their probabilities to the filter
+                job.segments, probs = self.segmenter.segment_with_probs(job.waveform)
+            else:
+                job.segments = self.segmenter.segment(job.waveform)
+            if cache is not None:
+                cache.put_json('segments', self._segments_key(job), job.segments)
+        if job.resumed is None or job.resumed.segments is None:
+            if self.normalizer is not None:
+                job.segments = self.normalizer.normalize(job.segments, job.waveform)
+            if self.quality is not None:
+                self._filter_segments(job, probs)
+            self._record(job, 'segments', segments=job.segments)
+        self.log(f'[{job.input}] Detected {len(job.segments)} speech segments.')
+
+    def _filter_segments(self, job: Job, probs: Optional[np.ndarray]):
+        """
+        Pre-ASR quality filter; every rejected segment is reported in the manifest.
+        """
+        job.segments, rejected = self.quality.filter(job.segments, job.waveform, probs,
+                                                     self.segmenter.prob_hop_sec)
+        if not rejected:
+            return
+        job.rejected += len(rejected)
+        self._record(job, 'rejected', stage='segment', action=self.cfg.quality.action, segments=rejected)
+        counts = {}
+        for report in rejected:
+            for reason in report['reasons']:
+                counts[reason] = counts.get(reason, 0) + 1
+        verb = 'Dropped' if self.quality.drops else 'Flagged'
+        self.log(f'[{job.input}] {verb} {len(rejected)} segments before ASR '
+                 f'({", ".join(f"{reason}: {n}" for reason, n in sorted(counts.items()))}).')
+
+    def transcribe(self, job: Job):
+        """
+        Transcribe the segments in batches, straight from memory, in the language detected
+        once for the source.
+        Cached transcripts are keyed by segment span, and the cache is updated after every batch.
+        Each new transcript is written to the manifest as soon as it is produced.
+        Transcripts rejected by the post-ASR quality check are stored as None, so cache and
+        manifest remember the decision, and their segments are dropped before export.
+        Segments that are near-duplicates of earlier audio are not transcribed; depending on
+        `dedup.action` they are dropped or take over the earlier transcript.
+        """
+        clips = self.audio_exporter.slice(job.waveform, job.segments)
+        spans = [f'{start:.3f}-{end:.3f}' for start, end in job.segments]
+        cache = self._cache_for(job)
+        done = {}
+        if cache is not None:
+            done = cache.get_json('transcripts', self._transcripts_key(job)) or {}
+        if job.resumed is not None and job.resumed.segments is not None:
+            done.update({spans[index]: text for index, text in job.resumed.transcripts.items()
+                         if index < len(spans)})
+        todo = [index for index, span in enumerate(spans) if span not in done]
+        if len(todo) < len(spans):
+            self.log(f'[{job.input}] Reused {len(spans) - len(todo)} cached transcripts.')
+        duplicates, indexed = {}, {}
+        # report mode changes no transcript, so segments with cached transcripts are checked too
+        reporting = self.cfg.dedup.action == 'report'
+        candidates = list(range(len(spans))) if reporting else todo
+        if self.dedup is not None and candidates:
+            remaining, duplicates, indexed = self._match_duplicates(job, clips, spans, candidates)
+            if not reporting:
+                todo = remaining
+            for index, segment_id in indexed.items():
+                if spans[index] in done:
+                    self.dedup.set_transcript(segment_id, done[spans[index]])
+
+        # one language for the whole source instead of detecting it on every clip
+        language = self.asr.detect_language(clips) if todo else None
+        if language is not None:
+            self.log(f'[{job.input}] Language: {language}')
+        batch_size = self.cfg.pipeline.asr_batch_size
+        for start in range(0, len(todo), batch_size):
+            batch = todo[start:start + batch_size]
+            results = self.asr.transcribe_batch_scored([clips[index] for index in batch], language)
+            for index, (text, score) in zip(batch, results):
+                reason = self.quality.check_transcript(text, score) if self.quality is not None else None
+                if reason is None:
+                    self._record(job, 'transcript', index=index, text=text)
+                    self.log(f'[{job.input}] Transcribed clip {index + 1}/{len(clips)}: {text}')
+                elif self.quality.drops:
+                    self._record(job, 'transcript', index=index, text=None, rejected=reason)
+                    self.log(f'[{job.input}] Rejected clip {index + 1}/{len(clips)} ({reason}): {text}')
+                    text = None
+                else:
+                    job.rejected += 1
+                    self._record(job, 'transcript', index=index, text=text, flagged=reason)
+                    self.log(f'[{job.input}] Flagged clip {index + 1}/{len(clips)} ({reason}): {text}')
+                done[spans[index]] = text
+                if index in indexed:
+                    self.dedup.set_transcript(indexed[index], text)
+            if cache is not None:
+                cache.put_json('transcripts', self._transcripts_key(job), done)
+        if duplicates:
+            self._resolve_duplicates(job, spans, done, duplicates)
+            if cache is not None and self.cfg.dedup.action != 'report':
+                cache.put_json('transcripts', self._transcripts_key(job), done)
+        kept = [index for index, span in enumerate(spans) if done[span] is not None]
+        if len(kept) < len(spans):
+            self.log(f'[{job.input}] Dropped {len(spans) - len(kept)} segments without a kept transcript.')
+            job.rejected += sum(1 for index, span in enumerate(spans)
+                                if done[span] is None and index not in duplicates)
+            job.segments = [job.segments[index] for index in kept]
+        job.transcripts = [done[spans[index]] for index in kept]
+
+    def _match_duplicates(self, job: Job, clips: List[np.ndarray], spans: List[str], todo: List[int]):
+        """
+        Fingerprint the given segments (those still to transcribe, or all of them in report
+        mode) and look each one up in the index.
+        First occurrences are added to the index; their transcripts are filled in once known.
+        :return: (segments to transcribe, {index: DuplicateMatch, or (index, similarity) of an
+            earlier segment of this source}, {index: id of the segment in the index})
+        """
+        sr = self.cfg.pipeline.sample_rate
+        # the input path is part of the key, so a copy of a source under another name is reported
+        source = f'{job.source_hash}:{job.input}' if job.source_hash else job.input
+        remaining, duplicates, indexed = [], {}, {}
+        first = {}  # index id -> segment index, for first occurrences within this source
+        for index in todo:
+            signature = self.dedup.signature(clips[index], sr)
+            if signature is None:
+                # too little structure to fingerprint reliably
+                remaining.append(index)
+                continue
+            duration = len(clips[index]) / sr
+            match = self.dedup.lookup(signature, duration, source, spans[index])
+            if match is not None and match.segment_id in first:
+                duplicates[index] = (first[match.segment_id], match.similarity)
+            elif match is not None and (match.status != 'pending' or self.cfg.dedup.action == 'report'):
+                # only drop and reuse need the earlier transcript to exist
+                duplicates[index] = match
+            else:
+                # new audio, or a copy of a segment another run has not transcribed yet
+                indexed[index] = self.dedup.add(signature, duration, source, spans[index], job.input)
+                first[indexed[index]] = index
+            if index not in duplicates or self.cfg.dedup.action == 'report':
+                remaining.append(index)
+
+        job.duplicates = len(duplicates)
+        self.dedup.record_source(source, job.input, len(spans), len(duplicates))
+        if duplicates:
+            self.log(f'[{job.input}] {len(duplicates)}/{len(spans)} segments '
+                     f'({len(duplicates) / len(spans):.0%}) are near-duplicates of earlier audio.')
+        return remaining, duplicates, indexed
+
+    def _resolve_duplicates(self, job: Job, spans: List[str], done: dict, duplicates: dict):
+        """
+        Drop duplicate segments, or give them the transcript of their first occurrence.
+        A duplicate of a rejected segment is dropped either way. With `dedup.action: report`
+        the duplicates keep their own transcripts and are only recorded.
+        """
+        for index, match in sorted(duplicates.items()):
+            if isinstance(match, tuple):
+                first, similarity = match
+                text, origin = done[spans[first]], f'{job.input} {spans[first]}'
+            else:
+                text = match.transcript if match.status == 'done' else None
+                origin, similarity = f'{match.input} {match.span}', match.similarity
+            similarity = round(similarity, 3)
+            if self.cfg.dedup.action == 'report':
+                self._record(job, 'duplicate', index=index, duplicate_of=origin, similarity=similarity)
+                continue
+            if self.cfg.dedup.action == 'drop':
+                text = None
+            done[spans[index]] = text
+            self._record(job, 'transcript', index=index, text=text, duplicate_of=origin, similarity=similarity)
+
+    def export(self, job: Job):
+        """
+        Write clips (optional) and transcripts, then release the waveform.
+        With the tar backend every sample goes once into the current shard instead.
+        """
+        if self.shard_exporter is not None:
+            keys = self.shard_exporter.export(job.wav_path, job.segments, job.waveform, job.transcripts,
+                                              source=job.input)
+            job.txt_files = keys
+            job.waveform = None
+            self._record(job, 'done', samples=keys)
+            if self.leases is not None:
+                self.leases.release(job.input, done=True)
+            self.log(f'[{job.input}] Wrote {len(keys)} samples to {self.shard_exporter.output_dir}.')
+            return
+        if self.export_clips:
+            with self.metrics.stage('clip_export', source=job.input) as measured:
+                clip_paths = self.audio_exporter.export(job.wav_path, job.segments, waveform=job.waveform)
+                measured.update(audio_sec=job.audio_sec, segments=len(clip_paths))
+            self.log(f'[{job.input}] Exported {len(clip_paths)} clips.')
+        else:
+            clip_paths = self.audio_exporter.clip_paths(job.wav_path, len(job.segments))
+        with self.metrics.stage('transcript_export', source=job.input) as measured:
+            job.txt_files = self.transcript_exporter.export(clip_paths, job.transcripts, copy_audio=self.export_clips)
+            measured.update(audio_sec=job.audio_sec, segments=len(job.txt_files))
+        job.waveform = None
+        self._record(job, 'done', txt_files=job.txt_files)
+        if self.leases is not None:
+            self.leases.release(job.input, done=True)
+        self.log(f'[{job.input}] Wrote {len(job.txt_files)} transcripts.')
+
+    def close(self):
+        """
+        Finish any open output shard, the manifest and the fingerprint index, and drop unfinished leases.
+        """
+        if self.leases is not None:
+            self.leases.close()
+        if self.shard_exporter is not None:
+            self.shard_exporter.close()
+        if self.manifest is not None:
+            self.manifest.close()
+        if self.dedup is not None:
+            self.dedup.close()
+        self.metrics.close()
@@ -0,0 +1,194 @@
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+# my module
+from modules.utils.audio import as_float32
+
+# frames the per-segment energy and clipping statistics are built from
+FRAME_SEC = 0.02
+# samples converted per block when scanning a (possibly memory-mapped) waveform
+BLOCK_SEC = 30
+# a sample at or above this magnitude counts as clipped (int16 full scale maps to ~0.99997)
+CLIP_LEVEL = 0.999
+# the noise floor is this percentile of the energies of frames outside every VAD segment
+NOISE_PERCENTILE = 50
+# with fewer non-speech frames than this (about 1 s), a low percentile of all frames is used instead
+MIN_NOISE_FRAMES = 50
+FALLBACK_NOISE_PERCENTILE = 10
+_EPS = 1e-10
+
+
+class SegmentQualityFilter:
+    """
+    Cheap checks that keep junk away from ASR and out of the corpus.
+    Before ASR, duration, RMS level, an SNR estimate, the clipped-sample ratio and the mean
+    VAD speech probability are computed for all segments of a source at once and compared
+    with the `quality` thresholds. After ASR, transcripts with a high no-speech probability,
+    a low average log-probability or no text are rejected.
+    With `quality.action: flag` rejections are only reported and nothing is dropped.
+    """
+    def __init__(self, cfg):
+        """Store configuration with sample rate and quality thresholds"""
+        self.cfg = cfg
+
+    @property
+    def drops(self) -> bool:
+        return self.cfg.quality.action == 'drop'
+
+    @property
+    def uses_probs(self) -> bool:
+        """
+        Whether the speech-probability check is enabled and needs VAD probabilities.
+        """
+        return self.cfg.quality.min_speech_prob > 0
+
+    def transcript_key(self) -> tuple:
+        """
+        Thresholds that decide which transcripts are dropped, for keying cached transcripts.
+        """
+        q = self.cfg.quality
+        if not (self.drops and q.post_asr):
+            return ()
+        return ('quality', q.max_no_speech_prob, q.min_avg_logprob, q.drop_empty)
+
+    def features(self, segments: List[Tuple[float, float]], waveform: np.ndarray,
+                 probs: Optional[np.ndarray] = None, prob_hop: float = 0.0) -> Dict[str, np.ndarray]:
+        """
+        Per-segment features, computed from one pass over the waveform in 20 ms frames.
+        :param segments: List of (start_sec, end_sec).
+        :param waveform: Source waveform (float32, or int16 when memory-mapped).
+        :param probs: Per-window VAD speech probabilities of the whole source, if available.
+        :param prob_hop: Seconds per entry of probs.
+        :return: dict of arrays with one value per segment: duration, rms_db, snr_db,
+            clip_ratio and speech_prob (NaN without probabilities).
+        """
+        sr = self.cfg.pipeline.sample_rate
+        frame = int(FRAME_SEC * sr)
+        energy, clipped = self._frame_stats(waveform, frame)
+        bounds = np.asarray(segments, dtype=np.float64).reshape(-1, 2)
+        first = np.clip((bounds[:, 0] * sr // frame).astype(np.int64), 0, len(energy))
+        last = np.clip(np.ceil(bounds[:, 1] * sr / frame).astype(np.int64), 0, len(energy))
+        last = np.maximum(last, first + 1).clip(max=len(energy))
+        frames = np.maximum(last - first, 1)
+
+        # prefix sums turn every per-segment mean into two lookups
+        energy_sum = np.concatenate(([0.0], np.cumsum(energy)))
+        clip_sum = np.concatenate(([0], np.cumsum(clipped)))
+        power = (energy_sum[last] - energy_sum[first]) / frames
+        noise = self._noise_floor(energy, first, last)
+        features = {
+            'duration': bounds[:, 1] - bounds[:, 0],
+            'rms_db': 10 * np.log10(power + _EPS),
+            'snr_db': 10 * np.log10((power + _EPS) / (noise + _EPS)),
+            'clip_ratio': (clip_sum[last] - clip_sum[first]) / (frames * frame),
+            'speech_prob': np.full(len(bounds), np.nan),
+        }
+        if probs is not None and len(probs) and prob_hop > 0:
+            prob_sum = np.concatenate(([0.0], np.cumsum(probs, dtype=np.float64)))
+            lo = np.clip((bounds[:, 0] / prob_hop).astype(np.int64), 0, len(probs) - 1)
+            hi = np.clip(np.ceil(bounds[:, 1] / prob_hop).astype(np.int64), lo + 1, len(probs))
+            features['speech_prob'] = (prob_sum[hi] - prob_sum[lo]) / (hi - lo)
+        return features
+
+    @staticmethod
+    def _noise_floor(energy: np.ndarray, first: np.ndarray, last: np.ndarray) -> float:
+        """
+        Noise floor of a source from the frames no segment covers, so speech never raises it.
+        :param energy: Mean energy of every frame.
+        :param first: First frame of every segment.
+        :param last: Frame after the last one of every segment.
+        """
+        if not len(energy):
+            return 0.0
+        # +1 where a segment starts and -1 after it ends; a positive running sum means covered
+        coverage = np.zeros(len(energy) + 1, dtype=np.int64)
+        np.add.at(coverage, first, 1)
+        np.add.at(coverage, last, -1)
+        gaps = energy[np.cumsum(coverage[:-1]) == 0]
+        if len(gaps) >= MIN_NOISE_FRAMES:
+            return float(np.percentile(gaps, NOISE_PERCENTILE))
+        return float(np.percentile(energy, FALLBACK_NOISE_PERCENTILE))
+
+    @staticmethod
+    def _frame_stats(waveform: np.ndarray, frame: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Mean energy and number of clipped samples of every frame, block by block,
+        so a memory-mapped 16-bit source is never converted whole.
+        """
+        block = frame * int(BLOCK_SEC / FRAME_SEC)
+        energies, clips = [], []
+        for start in range(0, len(waveform), block):
+            x = as_float32(waveform[start:start + block])
+            if len(x) % frame:
+                x = np.concatenate([x, np.zeros(frame - len(x) % frame, dtype=np.float32)])
+            x = x.reshape(-1, frame)
+            energies.append(np.einsum('ij,ij->i', x, x) / frame)
+            clips.append(np.count_nonzero(np.abs(x) >= CLIP_LEVEL, axis=1))
+        if not energies:
+            return np.zeros(0), np.zeros(0, dtype=np.int64)
+        return np.concatenate(energies).astype(np.float64), np.concatenate(clips)
+
+    def rejections(self, features: Dict[str, np.ndarray]) -> List[List[str]]:
+        """
+        Names of the failed checks for every segment; an empty list means the segment passes.
+        A max_clip_ratio or min_speech_prob of 0 disables that check; missing features never fail.
+        """
+        q = self.cfg.quality
+        checks = {
+            'too_short': features['duration'] < q.min_duration,
+            'too_quiet': features['rms_db'] < q.min_rms_db,
+            'low_snr': features['snr_db'] < q.min_snr_db,
+            'clipped': (features['clip_ratio'] > q.max_clip_ratio) if q.max_clip_ratio > 0 else None,
+            # NaN compares False, so sources without VAD probabilities pass
+            'not_speech': (features['speech_prob'] < q.min_speech_prob) if self.uses_probs else None,
+        }
+        failed = np.zeros(len(features['duration']), dtype=bool)
+        for mask in checks.values():
+            if mask is not None:
+                failed |= mask
+        return [[name for name, mask in checks.items() if mask is not None and mask[idx]] if failed[idx] else []
+                for idx in range(len(failed))]
+
+    def filter(self, segments: List[Tuple[float, float]], waveform: np.ndarray,
+               probs: Optional[np.ndarray] = None,
+               prob_hop: float = 0.0) -> Tuple[List[Tuple[float, float]], List[dict]]:
+        """
+        Apply the pre-ASR checks.
+        :return: (segments to transcribe, one report per rejected segment with its span,
+            failed checks and features). In flag mode every segment is returned.
+        """
+        if not segments:
+            return segments, []
+        features = self.features(segments, waveform, probs, prob_hop)
+        kept, rejected = [], []
+        for idx, (seg, reasons) in enumerate(zip(segments, self.rejections(features))):
+            if reasons:
+                rejected.append({
+                    'segment': seg,
+                    'reasons': reasons,
+                    **{name: round(float(values[idx]), 4) for name, values in features.items()
+                       if not np.isnan(values[idx])},
+                })
+            if not reasons or not self.drops:
+                kept.append(seg)
+        return kept, rejected
+
+    def check_transcript(self, text: str, score=None) -> Optional[str]:
+        """
+        Post-ASR check of one transcript.
+        :param text: Transcript text.
+        :param score: TranscriptScore of the decode, or None if the ASR does not report one.
+        :return: Reason for rejecting the transcript, or None to keep it.
+        """
+        q = self.cfg.quality
+        if not q.post_asr:
+            return None
+        if q.drop_empty and not text.strip():
+            return 'empty'
+        if score is None:
+            return None
+        if score.no_speech_prob > q.max_no_speech_prob:
+            return 'no_speech'
+        if score.avg_logprob < q.min_avg_logprob:
+            return 'low_logprob'
+        return None
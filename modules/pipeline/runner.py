@@ -0,0 +1,95 @@
+import queue
+import threading
+from typing import Callable, Iterable, List, Optional, Union
+
+# my module
+from .pipeline import Job, Pipeline
+
+# placed on a queue once per downstream worker when a stage has drained
+_DONE = object()
+
+
+class PipelineRunner:
+    """
+    Run pipeline stages concurrently with worker threads connected by bounded queues,
+    so input N+1 can be downloading and segmented while input N is in ASR.
+    A full queue blocks the upstream stage, which bounds how many decoded sources are
+    held in memory at once.
+    """
+    def __init__(self, pipeline: Pipeline, runner_cfg):
+        """
+        :param pipeline: Pipeline providing the stage functions
+        :param runner_cfg: RunnerConfig with queue_size and per-stage worker counts
+        """
+        self.pipeline = pipeline
+        self.runner_cfg = runner_cfg
+
+    def _workers(self, stage: str) -> int:
+        return max(1, getattr(self.runner_cfg, f'{stage}_workers'))
+
+    def run(self, inputs: Iterable[Union[str, Job]], on_stage: Optional[Callable[[str, Job], None]] = None,
+            on_done: Optional[Callable[[Job], None]] = None) -> List[Job]:
+        """
+        Process all inputs and return their jobs in input order.
+        Failed jobs carry their error message in `Job.error`.
+        `inputs` is consumed lazily, so it may be a generator that blocks waiting for work.
+        :param inputs: input paths/URLs, or prepared Jobs
+        :param on_stage: called with (stage, job) after every stage of every job
+        :param on_done: called with each finished job; jobs handed to it are not
+            collected, so a long-running caller does not accumulate them
+        """
+        stages = Pipeline.STAGES
+        # queues[i] feeds stage i; the last queue collects finished jobs
+        queues = [queue.Queue(maxsize=max(1, self.runner_cfg.queue_size)) for _ in stages]
+        queues.append(queue.Queue())
+        threads = []
+
+        def feed():
+            for index, inp in enumerate(inputs):
+                queues[0].put(inp if isinstance(inp, Job) else Job(input=inp, index=index))
+            for _ in range(self._workers(stages[0])):
+                queues[0].put(_DONE)
+
+        threads.append(threading.Thread(target=feed, daemon=True))
+
+        for i, stage in enumerate(stages):
+            remaining = [self._workers(stage)]
+            lock = threading.Lock()
+            downstream = self._workers(stages[i + 1]) if i + 1 < len(stages) else 1
+
+            def work(stage=stage, inbox=queues[i], outbox=queues[i + 1],
+                     remaining=remaining, lock=lock, downstream=downstream):
+                while True:
+                    job = inbox.get()
+                    if job is _DONE:
+                        break
+                    # jobs still waiting in front of this stage
+                    self.pipeline.metrics.gauge('queue_depth', inbox.qsize(), stage=stage)
+                    self.pipeline.run_stage(stage, job)
+                    if on_stage is not None:
+                        on_stage(stage, job)
+                    outbox.put(job)
+                # the last worker of a stage to finish signals the next stage
+                with lock:
+                    remaining[0] -= 1
+                    if remaining[0] == 0:
+                        for _ in range(downstream):
+                            outbox.put(_DONE)
+
+            for _ in range(self._workers(stage)):
+                threads.append(threading.Thread(target=work, name=f'{stage}-worker', daemon=True))
+
+        for t in threads:
+            t.start()
+        jobs = []
+        while True:
+            job = queues[-1].get()
+            if job is _DONE:
+                break
+            if on_done is not None:
+                on_done(job)
+            else:
+                jobs.append(job)
+        for t in threads:
+            t.join()
+        return sorted(jobs, key=lambda job: job.index)
@@ -0,0 +1,180 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from typing import List, Optional, Sequence, Set, Tuple
+
+# my module
+from modules.utils.fileops import node_name
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """
+    Parse an "i/N" shard spec (0 <= i < N).
+    """
+    try:
+        index, count = (int(part) for part in spec.split('/'))
+    except ValueError:
+        raise ValueError(f'Invalid shard spec {spec!r}; expected i/N, e.g. 0/4')
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f'Invalid shard spec {spec!r}; need 0 <= i < N')
+    return index, count
+
+
+def _stable_hash(inp: str) -> int:
+    # Python's hash() is salted per process; every host must agree on the partition
+    return int.from_bytes(hashlib.sha256(inp.encode('utf-8')).digest()[:8], 'big')
+
+
+def select_shard(inputs: Sequence[str], index: int, count: int) -> List[str]:
+    """
+    Deterministic partition: the inputs of shard `index` out of `count`.
+    Every host computes the same split from the same input strings, whatever their order.
+    """
+    return [inp for inp in inputs if _stable_hash(inp) % count == index]
+
+
+class LeaseManager:
+    """
+    Dynamic work sharing through lease files in a directory shared by all nodes
+    (e.g. on NFS). A node claims an input by creating its lease file with O_EXCL,
+    keeps it alive with a heartbeat that touches the file, and replaces it with a
+    `.done` marker when finished. A lease whose mtime is older than `ttl` belonged
+    to a node that died and may be taken over by another one.
+    """
+    def __init__(self, lease_dir: str, ttl: float = 600.0):
+        """
+        :param lease_dir: directory shared by all nodes
+        :param ttl: seconds without heartbeat after which a lease is considered expired
+        """
+        self.lease_dir = lease_dir
+        self.ttl = ttl
+        self.node = f'{node_name()}-{os.getpid()}'
+        os.makedirs(lease_dir, exist_ok=True)
+        self._held: Set[str] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._heartbeat = threading.Thread(target=self._beat, name='lease-heartbeat', daemon=True)
+        self._heartbeat.start()
+
+    def _path(self, inp: str) -> str:
+        return os.path.join(self.lease_dir, hashlib.sha256(inp.encode('utf-8')).hexdigest()[:32])
+
+    def claim(self, inp: str) -> bool:
+        """
+        Try to take the lease for an input. False if it is done or held by a live node.
+        """
+        path = self._path(inp)
+        if os.path.exists(f'{path}.done'):
+            return False
+        lease = f'{path}.lease'
+        for _ in range(2):
+            try:
+                fd = os.open(lease, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            except FileExistsError:
+                if not self._take_over(lease):
+                    return False
+                continue
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'input': inp, 'node': self.node, 'claimed_at': time.time()}, f)
+            # the holder may have finished and released between the first check and our create
+            if os.path.exists(f'{path}.done'):
+                os.remove(lease)
+                return False
+            with self._lock:
+                self._held.add(lease)
+            return True
+        return False
+
+    def _take_over(self, lease: str) -> bool:
+        """
+        Remove an expired lease so the caller can retry creating its own.
+        The lease is first renamed to a name unique to this call (rename is atomic, so only
+        one node gets it) and then checked again: if what was moved is not the expired lease
+        that was inspected (its holder released it and another node claimed it meanwhile),
+        it is linked back in place instead of being deleted.
+        :return: True if the lease is gone (expired and removed, or released meanwhile)
+        """
+        observed = self._read(lease)
+        if observed is None:
+            # released in the meantime
+            return True
+        if time.time() - observed[1] <= self.ttl:
+            return False
+        moved = f'{lease}.stale.{self.node}.{uuid.uuid4().hex[:8]}'
+        try:
+            os.rename(lease, moved)
+        except FileNotFoundError:
+            # another node took it over or it was released
+            return True
+        except OSError:
+            return False
+        current = self._read(moved)
+        if current is not None and (current != observed or time.time() - current[1] <= self.ttl):
+            # a fresh lease: put it back without clobbering one created since the rename
+            try:
+                os.link(moved, lease)
+            except OSError:
+                pass
+            os.remove(moved)
+            return False
+        try:
+            os.remove(moved)
+        except FileNotFoundError:
+            pass
+        return True
+
+    @staticmethod
+    def _read(lease: str) -> Optional[Tuple[str, float]]:
+        """
+        (content, mtime) of a lease file, or None if it does not exist.
+        """
+        try:
+            with open(lease, 'r', encoding='utf-8') as f:
+                content = f.read()
+            return content, os.path.getmtime(lease)
+        except FileNotFoundError:
+            return None
+
+    def release(self, inp: str, done: bool):
+        """
+        Give up a held lease; with done=True, mark the input finished for every node.
+        """
+        path = self._path(inp)
+        lease = f'{path}.lease'
+        with self._lock:
+            if lease not in self._held:
+                return
+            self._held.discard(lease)
+        if done:
+            with open(f'{path}.done', 'w', encoding='utf-8') as f:
+                json.dump({'input': inp, 'node': self.node, 'done_at': time.time()}, f)
+        try:
+            os.remove(lease)
+        except FileNotFoundError:
+            pass
+
+    def _beat(self):
+        while not self._stop.wait(self.ttl / 3):
+            with self._lock:
+                held = list(self._held)
+            for lease in held:
+                try:
+                    os.utime(lease)
+                except OSError:
+                    pass
+
+    def close(self):
+        """
+        Stop the heartbeat and drop unfinished leases, so other nodes can take them at once.
+        """
+        self._stop.set()
+        with self._lock:
+            held, self._held = self._held, set()
+        for lease in held:
+            try:
+                os.remove(lease)
+            except OSError:
+                pass
@@ -0,0 +1,271 @@
+import multiprocessing
+from multiprocessing.connection import wait
+from multiprocessing.util import Finalize
+import os
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+# my module
+from modules.utils.config import load_config
+from modules.utils.metrics import Metrics
+from .pipeline import Job, Pipeline
+
+# pipeline of the current worker process, built once by _init_worker
+_pipeline = None
+# seconds the pool waits for a worker message before checking that busy workers are alive
+POLL_SEC = 1.0
+# replacement workers started after failed initializations before the remaining inputs are given up
+MAX_INIT_RETRIES = 2
+
+
+def _build_pipeline(cfg, cpu_threads: int, preset: Optional[str], **pipeline_options) -> Pipeline:
+    """
+    Default worker pipeline: the configured VAD and FasterWhisperASR, limited to this
+    worker's share of cores.
+    """
+    from modules.transcription.faster_whisper import FasterWhisperASR
+    from modules.utils.model_registry import load_segmenter
+    if cfg.pipeline.vad.backend == 'silero':
+        import torch
+        torch.set_num_threads(cpu_threads)
+    segmenter = load_segmenter(cfg, cpu_threads=cpu_threads)
+    asr = FasterWhisperASR(cfg, cpu_threads=cpu_threads, preset=preset)
+    return Pipeline(cfg, segmenter, asr, **pipeline_options)
+
+
+def _init_worker(options: dict, cpu_threads: int, metrics_dir: Optional[str] = None, preset: Optional[str] = None,
+                 factory: Optional[Callable[..., Pipeline]] = None, profile: bool = False):
+    """
+    Build the pipeline, and with it VAD and ASR, once per worker process.
+    """
+    global _pipeline
+    cfg = load_config()
+    pid = os.getpid()
+    # each worker writes its own metrics files; profiling alone keeps them in memory
+    metrics = Metrics(metrics_dir, suffix=f'-worker{pid}') if metrics_dir or profile else None
+    _pipeline = (factory or _build_pipeline)(cfg, cpu_threads, preset, metrics=metrics,
+                                             log=lambda msg: print(f'[worker {pid}] {msg}', flush=True), **options)
+    # multiprocessing runs finalizers when the worker process exits
+    Finalize(_pipeline, _pipeline.close, exitpriority=10)
+
+
+def _process(job: Job) -> Job:
+    """
+    Run every stage on one job inside a worker; the waveform is not sent back.
+    """
+    try:
+        job = _pipeline.process(job)
+    except Exception as e:
+        job.error = f'worker: {e}'
+    job.waveform = None
+    return job
+
+
+def _worker_main(worker_id: int, tasks, results, init_args: tuple, profile: bool):
+    """
+    Worker process loop: initialize, then process jobs from `tasks` until a None sentinel.
+    Every message sent on the worker's own `results` pipe is (kind, worker_id, payload) with kind
+    'ready', 'init_error', 'started' (payload: the job index, sent before the job runs) or 'done',
+    whose payload is the finished Job and, when profiling, a snapshot of the worker's metrics so far
+    (so the totals of a worker that dies later are not lost).
+    """
+    try:
+        _init_worker(*init_args, profile=profile)
+    except Exception as e:
+        results.send(('init_error', worker_id, f'{type(e).__name__}: {e}'))
+        return
+    results.send(('ready', worker_id, None))
+    for job in iter(tasks.get, None):
+        results.send(('started', worker_id, job.index))
+        job = _process(job)
+        results.send(('done', worker_id, (job, _pipeline.metrics.snapshot() if profile else None)))
+
+
+class _Worker:
+    """
+    Parent-side handle of one worker process and the job it is running.
+    """
+    def __init__(self, ctx, worker_id: int, init_args: tuple, profile: bool):
+        self.id = worker_id
+        self.tasks = ctx.Queue()
+        # a pipe per worker rather than one shared queue: a worker killed halfway through a
+        # message can then only garble its own channel, not block the others' writes
+        self.results, writer = ctx.Pipe(duplex=False)
+        self.job: Optional[Job] = None
+        # whether the worker reported starting self.job; a job it never started is handed out again
+        self.started = False
+        self.ready = False
+        # cleared as soon as the process is found dead, so it is never handed another job
+        self.alive = True
+        self.process = ctx.Process(target=_worker_main, args=(worker_id, self.tasks, writer, init_args, profile),
+                                   name=f'corpus-worker-{worker_id}', daemon=True)
+        self.process.start()
+        # the worker holds the only write end, so the pipe reports EOF once it exits
+        writer.close()
+
+
+def _input_size(inp: str) -> int:
+    """
+    Size of a local input in bytes; URLs and missing files count as 0.
+    """
+    try:
+        return os.path.getsize(inp)
+    except OSError:
+        return 0
+
+
+class WorkerPool:
+    """
+    Process inputs with N worker processes, each holding its own SileroVAD and
+    FasterWhisperASR. Inputs are handed out one at a time, largest first, so a long
+    file does not start last and hold up the whole run.
+    A worker that dies (e.g. killed for memory) fails only the job it was running and is
+    replaced while inputs remain.
+    """
+    def __init__(self, workers: int, metrics_dir: Optional[str] = None, preset: Optional[str] = None,
+                 profile: bool = False, pipeline_factory: Optional[Callable[..., Pipeline]] = None,
+                 **pipeline_options):
+        """
+        :param workers: number of worker processes
+        :param metrics_dir: directory for per-worker metrics files; None disables metrics
+        :param preset: decoding preset for the workers' ASR; None uses the configured one
+        :param profile: collect the workers' stage totals into `metrics` for a combined summary
+        :param pipeline_factory: module-level function building a worker's pipeline, called as
+            factory(cfg, cpu_threads, preset, metrics=..., log=..., **pipeline_options);
+            None loads the configured VAD and FasterWhisperASR
+        :param pipeline_options: keyword arguments for Pipeline (stream, keep_wav, export_clips, ...)
+        """
+        self.workers = workers
+        self.metrics_dir = metrics_dir
+        self.preset = preset
+        self.profile = profile
+        self.pipeline_factory = pipeline_factory
+        self.pipeline_options = pipeline_options
+        # split CPU cores evenly between workers for torch and CTranslate2
+        self.cpu_threads = max(1, (os.cpu_count() or 1) // workers)
+        # per-stage totals of all workers, filled by run() when profiling
+        self.metrics = Metrics()
+
+    def run(self, inputs: List[str]) -> List[Job]:
+        """
+        Process all inputs and return their jobs in input order.
+        A failing input or a crashed worker is recorded in `Job.error` and does not stop the run.
+        """
+        jobs = [Job(input=inp, index=index) for index, inp in enumerate(inputs)]
+        # longest first approximates the best finishing time for a greedy pool
+        pending = deque(sorted(jobs, key=lambda job: _input_size(job.input), reverse=True))
+        finished: Dict[int, Job] = {}
+        # latest metrics snapshot of every worker process, merged once the run is over
+        snapshots: Dict[int, dict] = {}
+        # spawn avoids forking a parent that may already hold torch threads
+        ctx = multiprocessing.get_context('spawn')
+        init_args = (self.pipeline_options, self.cpu_threads, self.metrics_dir, self.preset, self.pipeline_factory)
+        workers: Dict[int, _Worker] = {}
+        next_id = 0
+        init_retries = 0
+        init_error = None
+
+        def start_worker():
+            nonlocal next_id
+            worker = _Worker(ctx, next_id, init_args, self.profile)
+            workers[worker.id] = worker
+            next_id += 1
+
+        def finish(job: Job):
+            finished[job.index] = job
+            print(f'Finished {len(finished)}/{len(jobs)}: {job.input}')
+
+        def assign(worker: _Worker):
+            # one job at a time, so a crash loses only the job the worker was running
+            if not worker.alive or not worker.process.is_alive():
+                # left to reap(); its next job goes to a live worker
+                worker.job = None
+                return
+            worker.job = pending.popleft() if pending else None
+            worker.started = False
+            worker.tasks.put(worker.job)
+
+        def handle(message):
+            nonlocal init_error
+            kind, worker_id, payload = message
+            worker = workers.get(worker_id)
+            if kind == 'done':
+                job, snapshot = payload
+                if snapshot is not None:
+                    snapshots[worker_id] = snapshot
+                finish(job)
+                if worker is not None:
+                    worker.job = None
+                    assign(worker)
+            elif kind == 'started' and worker is not None and worker.job is not None:
+                worker.started = worker.job.index == payload
+            elif kind == 'ready' and worker is not None:
+                worker.ready = True
+                assign(worker)
+            elif kind == 'init_error':
+                init_error = payload
+                print(f'Worker {worker_id} failed to start: {payload}')
+
+        def read(worker: _Worker):
+            # everything the worker has sent so far; EOF, or a message cut short, means it exited
+            try:
+                while worker.results.poll():
+                    handle(worker.results.recv())
+            except (EOFError, OSError):
+                worker.alive = False
+
+        def drain(timeout: float) -> bool:
+            ready = wait([worker.results for worker in workers.values() if worker.alive], timeout)
+            for worker in list(workers.values()):
+                if worker.results in ready:
+                    read(worker)
+            return bool(ready)
+
+        def reap():
+            nonlocal init_retries
+            for worker in list(workers.values()):
+                if worker.alive and worker.process.is_alive():
+                    continue
+                worker.alive = False
+                # pick up anything the worker sent before it exited; no new job goes to it meanwhile
+                read(worker)
+                worker.process.join()
+                worker.results.close()
+                del workers[worker.id]
+                if worker.job is not None and not worker.started:
+                    # died between two jobs: the next one never ran, so it goes to another worker
+                    pending.appendleft(worker.job)
+                elif worker.job is not None:
+                    worker.job.error = f'worker: process exited with code {worker.process.exitcode}'
+                    finish(worker.job)
+                elif not worker.ready:
+                    init_retries += 1
+                if pending and len(workers) < self.workers and init_retries <= MAX_INIT_RETRIES:
+                    start_worker()
+
+        for _ in range(min(self.workers, len(jobs))):
+            start_worker()
+        try:
+            while len(finished) < len(jobs):
+                drain(POLL_SEC)
+                reap()
+                if not workers:
+                    # every worker failed to start: give up the inputs nobody can run
+                    reason = init_error or 'worker processes exited during startup'
+                    while pending:
+                        job = pending.popleft()
+                        job.error = f'worker: {reason}'
+                        finish(job)
+            # workers get their None sentinel once the queue is empty; late starters still report ready
+            for worker in list(workers.values()):
+                while worker.process.is_alive():
+                    drain(0.1)
+                    worker.process.join(0.1)
+        finally:
+            for worker in workers.values():
+                if worker.process.is_alive():
+                    worker.process.terminate()
+                worker.results.close()
+        for snapshot in snapshots.values():
+            self.metrics.merge(snapshot)
+        return [finished[job.index] for job in jobs]
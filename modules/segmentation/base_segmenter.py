@@ -1,20 +1,50 @@
 from abc import ABC, abstractmethod
-from typing import List, Tuple
+from dataclasses import asdict
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+import numpy as np
 
 
 class AbstractSegmenter(ABC):
     """
     Abstract base class for audio segmentation (VAD).
     """
+    # seconds per speech probability returned by `segment_with_probs`; 0 if none are exposed
+    prob_hop_sec = 0.0
+
     def __init__(self, cfg):
         """Store configuration with sample rate and VAD params"""
         self.cfg = cfg
 
     @abstractmethod
-    def segment(self, wav_path: str) -> List[Tuple[float, float]]:
+    def segment(self, wav_path: Union[str, np.ndarray]) -> List[Tuple[float, float]]:
         """
         Segment audio into speech regions.
-        :param wav_path: Path to input wav file.
+        :param wav_path: Path to input wav file, or a decoded mono waveform at the pipeline sample rate.
         :return: List of (start_sec, end_sec) tuples representing speech segments.
         """
         pass
+
+    def segment_with_probs(self, wav_path: Union[str, np.ndarray]) -> Tuple[List[Tuple[float, float]], Optional[np.ndarray]]:
+        """
+        Segment audio and also return the per-window speech probabilities of the whole
+        source, one every `prob_hop_sec` seconds, for backends that compute them anyway.
+        The default returns None for the probabilities.
+        """
+        return self.segment(wav_path), None
+
+    def cache_key(self) -> tuple:
+        """
+        Parameters that determine this segmenter's output, used to key cached segment lists.
+        """
+        return (type(self).__name__, self.cfg.pipeline.sample_rate, asdict(self.cfg.pipeline.vad))
+
+    def iter_segments(self, chunks: Iterable[np.ndarray]) -> Iterator[Tuple[float, float]]:
+        """
+        Segment a stream of consecutive float32 chunks, yielding each (start_sec, end_sec)
+        as soon as it closes. Subclasses that can segment incrementally should override
+        this; the default buffers the whole stream and calls `segment`.
+        :param chunks: Iterable of 1-D float32 chunks at the pipeline sample rate.
+        """
+        chunks = list(chunks)
+        waveform = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.float32)
+        yield from self.segment(waveform)
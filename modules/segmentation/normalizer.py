@@ -0,0 +1,85 @@
+from typing import List, Optional, Tuple
+import numpy as np
+
+# energy frames used to look for a cut point inside an overlong segment
+FRAME_SEC = 0.02
+# Whisper decodes 30s windows; longer segments are re-windowed by the model
+MAX_WINDOW_SEC = 30.0
+
+
+class SegmentNormalizer:
+    """
+    Post-VAD segment length normalization:
+    merge segments separated by less than `vad.min_silence_len`, split segments longer
+    than `vad.max_segment_len` at their lowest-energy frame, pad both edges by `vad.pad`
+    and drop segments shorter than `vad.min_segment_len`.
+    """
+    def __init__(self, cfg):
+        """Store configuration with sample rate and VAD params"""
+        self.cfg = cfg
+
+    def normalize(self, segments: List[Tuple[float, float]],
+                  waveform: Optional[np.ndarray] = None) -> List[Tuple[float, float]]:
+        """
+        :param segments: List of (start_sec, end_sec) from the segmenter.
+        :param waveform: Source waveform, used to place splits at low-energy points;
+            without it overlong segments are cut at the maximum length.
+        :return: Normalized list of (start_sec, end_sec).
+        """
+        vad = self.cfg.pipeline.vad
+        duration = len(waveform) / self.cfg.pipeline.sample_rate if waveform is not None else None
+        merged = self._merge(sorted(segments), vad.min_silence_len)
+        # leave room for the padding so padded segments still respect the maximum
+        max_len = max(min(vad.max_segment_len, MAX_WINDOW_SEC) - 2 * vad.pad, vad.min_segment_len)
+        split = []
+        for start, end in merged:
+            split.extend(self._split(start, end, max_len, vad.min_segment_len, waveform))
+        padded = self._pad(split, vad.pad, duration)
+        return [(start, end) for start, end in padded if end - start >= vad.min_segment_len]
+
+    @staticmethod
+    def _merge(segments, min_gap):
+        out = []
+        for start, end in segments:
+            if out and start - out[-1][1] < min_gap:
+                out[-1] = (out[-1][0], max(out[-1][1], end))
+            else:
+                out.append((start, end))
+        return out
+
+    def _split(self, start, end, max_len, min_len, waveform):
+        pieces = []
+        while end - start > max_len:
+            # each piece must stay within [min_len, max_len]
+            lo = start + min(min_len, max_len / 2)
+            hi = min(start + max_len, end - min(min_len, max_len / 2))
+            cut = self._quietest_point(lo, hi, waveform) if waveform is not None and hi > lo else start + max_len
+            pieces.append((start, cut))
+            start = cut
+        pieces.append((start, end))
+        return pieces
+
+    def _quietest_point(self, lo, hi, waveform):
+        """
+        Time (sec) of the centre of the lowest-energy frame in [lo, hi).
+        """
+        sr = self.cfg.pipeline.sample_rate
+        frame = max(1, int(FRAME_SEC * sr))
+        region = waveform[int(lo * sr):int(hi * sr)]
+        n = len(region) // frame
+        if n == 0:
+            return hi
+        energy = np.square(region[:n * frame].reshape(n, frame), dtype=np.float32).mean(axis=1)
+        return lo + (int(np.argmin(energy)) + 0.5) * frame / sr
+
+    @staticmethod
+    def _pad(segments, pad, duration):
+        out = []
+        for i, (start, end) in enumerate(segments):
+            # never pad into the neighbour: stop at the middle of the gap
+            lower = (segments[i - 1][1] + start) / 2 if i > 0 else 0.0
+            upper = (end + segments[i + 1][0]) / 2 if i + 1 < len(segments) else duration
+            new_start = max(start - pad, lower)
+            new_end = end + pad if upper is None else min(end + pad, upper)
+            out.append((new_start, new_end))
+        return out
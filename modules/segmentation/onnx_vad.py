@@ -0,0 +1,198 @@
+import importlib.util
+import os
+import threading
+from pathlib import Path
+from typing import Iterable, Iterator, List, Sequence, Tuple, Union
+import numpy as np
+
+# my module
+from modules.utils.audio import as_float32, load_waveform
+from .base_segmenter import AbstractSegmenter
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent.resolve()
+# Silero's end-of-speech threshold sits this far below the start threshold
+NEG_THRESHOLD_GAP = 0.15
+
+
+def _find_model(configured: str) -> str:
+    """
+    Locate the ONNX model: the configured path (relative to the project root), else the
+    copy bundled with the `silero-vad` pip package, found without importing the package.
+    Nothing is downloaded.
+    """
+    if configured:
+        path = configured if os.path.isabs(configured) else os.path.join(PROJECT_ROOT, configured)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f'ONNX VAD model not found: {path}')
+        return path
+    # find_spec locates the package without running its __init__, which imports torch
+    spec = importlib.util.find_spec('silero_vad')
+    locations = spec.submodule_search_locations if spec is not None else None
+    for location in locations or []:
+        path = os.path.join(location, 'data', 'silero_vad.onnx')
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError('No ONNX VAD model: set pipeline.vad.onnx_model to a silero_vad.onnx file, '
+                            'or pip install silero-vad, which bundles one')
+
+
+def speech_regions(probs: np.ndarray, threshold: float, min_silence: int) -> List[Tuple[int, int]]:
+    """
+    Turn per-window speech probabilities into (start, end) window ranges.
+    Hysteresis as in Silero: speech starts at `threshold`, and only a probability below
+    `threshold - 0.15` ends it. Gaps shorter than `min_silence` windows are bridged.
+    Vectorized: each window takes the state of the last window that crossed either threshold.
+    """
+    n = len(probs)
+    if n == 0:
+        return []
+    above = probs >= threshold
+    below = probs < threshold - NEG_THRESHOLD_GAP
+    last = np.where(above | below, np.arange(n), -1)
+    np.maximum.accumulate(last, out=last)
+    speech = np.zeros(n, dtype=bool)
+    decided = last >= 0
+    speech[decided] = above[last[decided]]
+    edges = np.diff(np.concatenate(([0], speech.view(np.int8), [0])))
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    if len(starts) > 1 and min_silence > 0:
+        keep = starts[1:] - ends[:-1] >= min_silence
+        starts = starts[np.concatenate(([True], keep))]
+        ends = ends[np.concatenate((keep, [True]))]
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+class OnnxSileroVAD(AbstractSegmenter):
+    """
+    Silero VAD run through onnxruntime, fully offline and without torch.
+    The model is recurrent, so one signal cannot be scored in parallel window by window;
+    instead each signal is cut into lanes of `vad.lane_sec` seconds (each primed with
+    `vad.lane_warmup_sec` of the preceding audio) and up to `vad.batch_lanes` lanes of the
+    signal advance together through the model as one batch.
+    """
+    def __init__(self, cfg, cpu_threads: int = 0):
+        """
+        :param cfg: AppConfig
+        :param cpu_threads: onnxruntime intra-op threads; 0 keeps the library default
+        """
+        super().__init__(cfg)
+        import onnxruntime
+        sr = cfg.pipeline.sample_rate
+        if sr not in (8000, 16000):
+            raise ValueError(f'Silero VAD supports 8000 or 16000 Hz, not {sr}')
+        self.model_path = _find_model(cfg.pipeline.vad.onnx_model)
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = cpu_threads
+        self.session = onnxruntime.InferenceSession(self.model_path, sess_options=options,
+                                                    providers=['CPUExecutionProvider'])
+        names = {i.name for i in self.session.get_inputs()}
+        if names != {'input', 'state', 'sr'}:
+            raise ValueError(f'Unsupported Silero ONNX model (inputs {sorted(names)}); use Silero VAD v5 or later')
+        # Silero scores fixed windows: 512 samples at 16 kHz, 256 at 8 kHz, plus a short context
+        self.window = 512 if sr == 16000 else 256
+        self.context = 64 if sr == 16000 else 32
+        self._sr = np.array(sr, dtype=np.int64)
+        self.prob_hop_sec = self.window / sr
+        # onnxruntime sessions are thread-safe; the lock keeps concurrent files from oversubscribing cores
+        self._lock = threading.Lock()
+
+    def cache_key(self) -> tuple:
+        return super().cache_key() + (os.path.basename(self.model_path),)
+
+    def _score_lanes(self, lanes: Sequence[np.ndarray]) -> np.ndarray:
+        """
+        Speech probability of every window of several independent lanes, scored as one batch.
+        :param lanes: 1-D float32 arrays of at most equal length in whole windows
+        :return: (len(lanes), windows) probabilities; windows past a lane's end are padding
+        """
+        win, ctx = self.window, self.context
+        steps = max(-(-len(lane) // win) for lane in lanes)
+        audio = np.zeros((len(lanes), ctx + steps * win), dtype=np.float32)
+        for row, lane in zip(audio, lanes):
+            row[ctx:ctx + len(lane)] = lane
+        state = np.zeros((2, len(lanes), 128), dtype=np.float32)
+        probs = np.empty((len(lanes), steps), dtype=np.float32)
+        for step in range(steps):
+            # each window is fed with the `ctx` samples before it
+            x = audio[:, step * win:(step + 1) * win + ctx]
+            out, state = self.session.run(None, {'input': x, 'state': state, 'sr': self._sr})
+            probs[:, step] = out[:, 0]
+        return probs
+
+    def window_probs(self, signal: np.ndarray) -> np.ndarray:
+        """
+        Per-window speech probabilities of a whole signal, its lanes scored in batches.
+        """
+        vad = self.cfg.pipeline.vad
+        sr = self.cfg.pipeline.sample_rate
+        lane = max(1, int(vad.lane_sec * sr) // self.window) * self.window
+        warmup = int(vad.lane_warmup_sec * sr) // self.window * self.window
+        # (first kept window, audio start incl. warm-up, audio end)
+        specs = [(start // self.window, max(0, start - warmup), min(start + lane, len(signal)))
+                 for start in range(0, len(signal), lane)]
+        out = np.zeros(-(-len(signal) // self.window), dtype=np.float32)
+        batch = max(1, vad.batch_lanes)
+        with self._lock:
+            for i in range(0, len(specs), batch):
+                group = specs[i:i + batch]
+                probs = self._score_lanes([as_float32(signal[lo:hi]) for _, lo, hi in group])
+                for row, (first, lo, hi) in zip(probs, group):
+                    skip = (first * self.window - lo) // self.window
+                    count = -(-(hi - first * self.window) // self.window)
+                    out[first:first + count] = row[skip:skip + count]
+        return out
+
+    def _regions_to_seconds(self, probs: np.ndarray, total: int) -> List[Tuple[float, float]]:
+        vad = self.cfg.pipeline.vad
+        sr = self.cfg.pipeline.sample_rate
+        min_silence = int(round(vad.min_silence_len * sr / self.window))
+        return [(start * self.window / sr, min(end * self.window, total) / sr)
+                for start, end in speech_regions(probs, vad.threshold, min_silence)]
+
+    def segment(self, wav_path: Union[str, np.ndarray]) -> List[Tuple[float, float]]:
+        """
+        Segment one wav path or waveform into (start_sec, end_sec) speech regions.
+        """
+        return self.segment_with_probs(wav_path)[0]
+
+    def segment_with_probs(self, wav_path: Union[str, np.ndarray]) -> Tuple[List[Tuple[float, float]], np.ndarray]:
+        """
+        Segment one source and return its per-window speech probabilities with the regions.
+        """
+        sr = self.cfg.pipeline.sample_rate
+        signal = load_waveform(wav_path, sr) if isinstance(wav_path, str) else wav_path
+        probs = self.window_probs(signal)
+        return self._regions_to_seconds(probs, len(signal)), probs
+
+    def iter_segments(self, chunks: Iterable[np.ndarray]) -> Iterator[Tuple[float, float]]:
+        """
+        Segment a chunk stream, scoring one batch of lanes whenever enough audio arrived.
+        Only the per-window probabilities (one float per window) are kept for the whole
+        stream, so memory is bounded by one batch; regions are yielded at the end.
+        """
+        vad = self.cfg.pipeline.vad
+        sr = self.cfg.pipeline.sample_rate
+        warmup = int(vad.lane_warmup_sec * sr) // self.window * self.window
+        block = max(1, int(vad.lane_sec * sr) // self.window) * self.window * max(1, vad.batch_lanes)
+        tail = np.zeros(0, dtype=np.float32)  # warm-up audio preceding the pending block
+        pending, pending_len, total = [], 0, 0
+        probs = []
+
+        def score(audio, final):
+            # score whole windows (all of it at the end); return the unscored remainder
+            usable = len(audio) if final else len(audio) // self.window * self.window
+            signal = np.concatenate([tail, audio[:usable]])
+            probs.append(self.window_probs(signal)[len(tail) // self.window:])
+            return signal[max(0, len(signal) - warmup):], audio[usable:]
+
+        for chunk in chunks:
+            pending.append(as_float32(chunk))
+            pending_len += len(chunk)
+            total += len(chunk)
+            if pending_len >= block:
+                tail, rest = score(np.concatenate(pending), final=False)
+                pending, pending_len = [rest], len(rest)
+        if pending_len:
+            score(np.concatenate(pending), final=True)
+        all_probs = np.concatenate(probs) if probs else np.zeros(0, dtype=np.float32)
+        yield from self._regions_to_seconds(all_probs, total)
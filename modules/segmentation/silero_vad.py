@@ -1,9 +1,16 @@
+import threading
+from typing import Iterable, Iterator, Tuple, Union
+import numpy as np
 import torch
 import soundfile as sf
 import torchaudio
 
+from modules.utils.audio import as_float32
 from .base_segmenter import AbstractSegmenter
 
+# samples fed to the file reader per block when segmenting a wav path
+READ_BLOCK_SEC = 30
+
 
 class SileroVAD(AbstractSegmenter):
     """
@@ -11,44 +18,107 @@ class SileroVAD(AbstractSegmenter):
     """
     def __init__(self, cfg):
         super().__init__(cfg)
-        # Load model and utils from snakers4 silero-vad, using standard get_speech_timestamps
+        # Load model and utils from snakers4 silero-vad
         self.model, utils = torch.hub.load(
             repo_or_dir='snakers4/silero-vad',
             model='silero_vad',
             force_reload=False
         )
-        # utils[0] is always get_speech_timestamps (non-adaptive)
-        self.get_speech_ts = utils[0]
+        # utils[3] is VADIterator, which keeps the model state across windows
+        self.vad_iterator_cls = utils[3]
+        # the model is stateful, so a shared instance segments one stream at a time
+        self._lock = threading.Lock()
 
-    def segment(self, wav_path: str):
+    def segment(self, wav_path: Union[str, np.ndarray]):
         """
         Segment wav into speech regions using Silero VAD.
+        Accepts a wav path or an already decoded waveform at the pipeline sample rate.
         Returns list of (start_sec, end_sec).
         """
-        # load and resample audio manually
-        data, orig_sr = sf.read(wav_path)
-        # mono
-        if data.ndim > 1:
-            data = data.mean(axis=1)
-        # to torch tensor (channel-first)
-        audio = torch.from_numpy(data).float().unsqueeze(0)
-        target_sr = self.cfg.pipeline.sample_rate
-        if orig_sr != target_sr:
-            audio = torchaudio.functional.resample(audio, orig_sr, target_sr)
-        # collapse to 1D
-        audio = audio.squeeze(0)
-
-        # run VAD: use non-adaptive get_speech_timestamps
-        segments = self.get_speech_ts(
-            audio,
+        return list(self.iter_segments(self._read_chunks(wav_path)))
+
+    def iter_segments(self, chunks: Iterable[np.ndarray]) -> Iterator[Tuple[float, float]]:
+        """
+        Run Silero VAD window by window over a chunk stream, carrying the model state,
+        and yield (start_sec, end_sec) as soon as each speech region closes.
+        Memory use is bounded by one chunk regardless of input duration.
+        """
+        sr = self.cfg.pipeline.sample_rate
+        # Silero scores fixed windows: 512 samples at 16 kHz, 256 at 8 kHz
+        window = 512 if sr == 16000 else 256
+        with self._lock:
+            yield from self._iter_segments_locked(chunks, sr, window)
+
+    def _iter_segments_locked(self, chunks, sr, window):
+        """
+        Body of `iter_segments`; the caller holds the model lock.
+        """
+        vad_iterator = self.vad_iterator_cls(
             self.model,
             threshold=self.cfg.pipeline.vad.threshold,
-            sampling_rate=target_sr
+            sampling_rate=sr,
+            min_silence_duration_ms=int(self.cfg.pipeline.vad.min_silence_len * 1000)
         )
-        # segments is list of dict with 'start' and 'end' keys (in samples)
-        out = [
-            (seg['start'] / self.cfg.pipeline.sample_rate,
-             seg['end'] / self.cfg.pipeline.sample_rate)
-            for seg in segments
-        ]
-        return out
+        pending = np.zeros(0, dtype=np.float32)
+        consumed = 0  # samples already scored
+        speech_start = None
+        for chunk in chunks:
+            pending = np.concatenate([pending, chunk]) if len(pending) else chunk
+            usable = len(pending) - len(pending) % window
+            for offset in range(0, usable, window):
+                event = vad_iterator(torch.from_numpy(np.array(pending[offset:offset + window])))
+                speech_start, closed = self._handle_event(event, speech_start)
+                if closed is not None:
+                    yield closed
+            consumed += usable
+            pending = pending[usable:]
+
+        if len(pending):
+            # zero-pad the trailing partial window
+            last = np.zeros(window, dtype=np.float32)
+            last[:len(pending)] = pending
+            event = vad_iterator(torch.from_numpy(last))
+            speech_start, closed = self._handle_event(event, speech_start)
+            if closed is not None:
+                yield closed
+            consumed += len(pending)
+        vad_iterator.reset_states()
+
+        # speech still open at the end of the stream
+        if speech_start is not None and consumed > speech_start:
+            yield (speech_start / sr, consumed / sr)
+
+    def _handle_event(self, event, speech_start):
+        """
+        Fold one VADIterator event into the open-segment state.
+        :return: (new speech_start, closed segment in seconds or None)
+        """
+        if not event:
+            return speech_start, None
+        if 'start' in event:
+            return event['start'], None
+        if 'end' in event and speech_start is not None:
+            sr = self.cfg.pipeline.sample_rate
+            return None, (speech_start / sr, event['end'] / sr)
+        return speech_start, None
+
+    def _read_chunks(self, wav_path: Union[str, np.ndarray]) -> Iterator[np.ndarray]:
+        """
+        Yield mono float32 blocks at the pipeline sample rate from a wav path or waveform.
+        """
+        target_sr = self.cfg.pipeline.sample_rate
+        block = READ_BLOCK_SEC * target_sr
+        if not isinstance(wav_path, str):
+            # convert block by block, so a memory-mapped 16-bit source is never copied whole
+            for start in range(0, len(wav_path), block):
+                yield as_float32(wav_path[start:start + block])
+            return
+
+        orig_sr = sf.info(wav_path).samplerate
+        for data in sf.blocks(wav_path, blocksize=READ_BLOCK_SEC * orig_sr, dtype='float32'):
+            # mono
+            if data.ndim > 1:
+                data = data.mean(axis=1, dtype=np.float32)
+            if orig_sr != target_sr:
+                data = torchaudio.functional.resample(torch.from_numpy(data), orig_sr, target_sr).numpy()
+            yield data
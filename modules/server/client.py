@@ -0,0 +1,133 @@
+import json
+import http.client
+from typing import Iterator, List, Optional, Tuple, Union
+from urllib.parse import quote, urlparse
+import numpy as np
+
+# my module
+from modules.utils.audio import as_float32
+from modules.segmentation.base_segmenter import AbstractSegmenter
+from modules.transcription.base_asr import AbstractASR
+
+# bytes sent per chunk when uploading
+UPLOAD_CHUNK = 1024 * 1024
+
+
+class JobClient:
+    """
+    Client for a JobServer on this machine.
+    """
+    def __init__(self, url: str, timeout: Optional[float] = None):
+        """
+        :param url: server address, e.g. http://127.0.0.1:8765
+        :param timeout: socket timeout in seconds; None waits as long as the server works
+        """
+        parsed = urlparse(url)
+        self.host = parsed.hostname or '127.0.0.1'
+        self.port = parsed.port or 80
+        self.timeout = timeout
+
+    def _request(self, method: str, path: str, body=None, headers: Optional[dict] = None,
+                 chunked: bool = False) -> http.client.HTTPResponse:
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        conn.request(method, path, body=body, headers=headers or {}, encode_chunked=chunked)
+        response = conn.getresponse()
+        if response.status >= 400:
+            detail = response.read().decode('utf-8', 'replace')
+            conn.close()
+            raise RuntimeError(f'Job server error {response.status} on {method} {path}: {detail}')
+        return response
+
+    def _json(self, method: str, path: str, data=None):
+        body = json.dumps(data).encode('utf-8') if data is not None else None
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        with self._request(method, path, body, headers) as response:
+            return json.loads(response.read())
+
+    def health(self) -> dict:
+        return self._json('GET', '/health')
+
+    def submit(self, inputs: List[str]) -> List[int]:
+        """
+        Queue inputs (paths on the server's machine, or URLs) and return their job ids.
+        """
+        return self._json('POST', '/jobs', {'inputs': inputs})['ids']
+
+    def status(self, job_id: Optional[int] = None):
+        return self._json('GET', '/jobs' if job_id is None else f'/jobs/{job_id}')
+
+    def cancel(self, job_id: int) -> bool:
+        return self._json('DELETE', f'/jobs/{job_id}')['cancelled']
+
+    def events(self, job_id: int) -> Iterator[dict]:
+        """
+        Yield progress events of a job as they happen; the last one has event "finished".
+        """
+        with self._request('GET', f'/jobs/{job_id}/events') as response:
+            for line in response:
+                if line.strip():
+                    yield json.loads(line)
+
+    def upload(self, fileobj, name: str) -> str:
+        """
+        Stream a file object to the server in chunks and return the path it was saved to.
+        """
+        def chunks():
+            while True:
+                data = fileobj.read(UPLOAD_CHUNK)
+                if not data:
+                    return
+                yield data
+
+        headers = {'Content-Type': 'application/octet-stream'}
+        with self._request('POST', f'/uploads?name={quote(name)}', chunks(), headers, chunked=True) as response:
+            return json.loads(response.read())['path']
+
+
+class RemoteSegmenter(AbstractSegmenter):
+    """
+    Segmenter running on a JobServer, so clients share the server's loaded VAD model.
+    Paths are read by the server; waveforms are sent as float32 PCM.
+    """
+    def __init__(self, cfg, client: JobClient):
+        super().__init__(cfg)
+        self.client = client
+
+    def segment(self, wav_path: Union[str, np.ndarray]) -> List[Tuple[float, float]]:
+        if isinstance(wav_path, str):
+            segments = self.client._json('POST', '/segment', {'path': wav_path})['segments']
+        else:
+            body = np.ascontiguousarray(as_float32(wav_path)).tobytes()
+            with self.client._request('POST', '/segment', body, {'Content-Type': 'application/octet-stream'}) as response:
+                segments = json.loads(response.read())['segments']
+        return [tuple(seg) for seg in segments]
+
+
+class RemoteASR(AbstractASR):
+    """
+    ASR running on a JobServer, so clients share the server's loaded Whisper model.
+    Paths are read by the server; waveforms are sent as float32 PCM.
+    """
+    def __init__(self, cfg, client: JobClient):
+        super().__init__(cfg)
+        self.client = client
+        self._concurrency = None
+
+    def transcribe(self, audio: Union[str, np.ndarray], language: Optional[str] = None) -> str:
+        if isinstance(audio, str):
+            return self.client._json('POST', '/transcribe', {'path': audio, 'language': language})['text']
+        path = '/transcribe' + (f'?language={quote(language)}' if language else '')
+        body = np.ascontiguousarray(as_float32(audio)).tobytes()
+        with self.client._request('POST', path, body, {'Content-Type': 'application/octet-stream'}) as response:
+            return json.loads(response.read())['text']
+
+    def detect_language(self, segments: List[Union[str, np.ndarray]]) -> Optional[str]:
+        paths = [seg for seg in segments if isinstance(seg, str)]
+        if not paths:
+            return None
+        return self.client._json('POST', '/language', {'paths': paths})['language']
+
+    def max_concurrency(self) -> int:
+        if self._concurrency is None:
+            self._concurrency = self.client.health()['max_concurrency']
+        return self._concurrency
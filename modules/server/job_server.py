@@ -0,0 +1,348 @@
+import itertools
+import json
+import os
+import threading
+import queue
+import uuid
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+import numpy as np
+
+# my module
+from modules.pipeline.pipeline import Job, Pipeline
+from modules.pipeline.runner import PipelineRunner
+
+# bytes read from an upload body at a time
+UPLOAD_CHUNK = 1024 * 1024
+
+
+@dataclass
+class ServerJob:
+    """
+    A submitted input and the progress events published for it.
+    """
+    job: Job
+    status: str = 'queued'  # queued, running, done, failed, cancelled
+    events: List[dict] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        job = self.job
+        return {
+            'id': job.index, 'input': job.input, 'status': self.status, 'error': job.error,
+            'skipped': job.skipped, 'audio_sec': job.audio_sec,
+            'segments': len(job.segments) if job.segments is not None else None,
+            'rejected': job.rejected,
+            'duplicates': job.duplicates,
+            'txt_files': job.txt_files,
+        }
+
+
+class JobServer:
+    """
+    Long-running local server holding one Pipeline, and with it one set of loaded
+    VAD/ASR models, for every client on the machine. Jobs are fed to a single
+    PipelineRunner, so all clients share its stage workers and queues.
+
+    HTTP API (JSON unless noted):
+        POST   /jobs               {"inputs": [...]} -> {"ids": [...]}
+        GET    /jobs               status of every job
+        GET    /jobs/<id>          status of one job
+        GET    /jobs/<id>/events   progress as NDJSON, streamed until the job finishes
+        DELETE /jobs/<id>          cancel; takes effect before the job's next stage
+        POST   /uploads?name=F     raw (optionally chunked) body saved to disk -> {"path": ...}
+        POST   /segment            {"path": ...}, or float32 PCM -> {"segments": [...]}
+        POST   /transcribe         {"path": ..., "language": ...}, or float32 PCM with ?language=
+        POST   /language           {"paths": [...]} -> {"language": ...}
+        GET    /health             {"status": "ok", "max_concurrency": N}
+    """
+    def __init__(self, pipeline: Pipeline, runner_cfg, host: str = '127.0.0.1', port: int = 8765,
+                 upload_dir: Optional[str] = None):
+        """
+        :param pipeline: Pipeline whose segmenter and ASR serve every request
+        :param runner_cfg: RunnerConfig for the shared PipelineRunner
+        :param host: interface to bind; keep it on localhost, there is no authentication
+        :param port: TCP port; 0 picks a free one
+        :param upload_dir: where uploads are written; defaults to <temp_dir>/uploads
+        """
+        self.pipeline = pipeline
+        self.runner = PipelineRunner(pipeline, runner_cfg)
+        self.upload_dir = upload_dir or os.path.join(pipeline.cfg.paths.temp_dir, 'uploads')
+        os.makedirs(self.upload_dir, exist_ok=True)
+        self.jobs: Dict[int, ServerJob] = {}
+        self._ids = itertools.count()
+        self._pending = queue.Queue()
+        self._cond = threading.Condition()
+        # progress lines from the pipeline are routed to jobs by their input
+        pipeline.log = self._log
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._runner_thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def submit(self, inputs: List[str]) -> List[int]:
+        """
+        Queue inputs for processing and return their job ids.
+        """
+        ids = []
+        for inp in inputs:
+            job = Job(input=inp, index=next(self._ids))
+            with self._cond:
+                self.jobs[job.index] = ServerJob(job)
+            self._publish(job.index, {'event': 'queued'})
+            self._pending.put(job)
+            ids.append(job.index)
+        return ids
+
+    def cancel(self, job_id: int) -> bool:
+        """
+        Cancel a job that has not finished. Returns False if it already has.
+        """
+        with self._cond:
+            entry = self.jobs[job_id]
+            if entry.status in ('done', 'failed', 'cancelled'):
+                return False
+            entry.job.cancelled = True
+        self._publish(job_id, {'event': 'cancelling'})
+        return True
+
+    def status(self, job_id: Optional[int] = None):
+        with self._cond:
+            if job_id is None:
+                return [entry.to_dict() for entry in self.jobs.values()]
+            return self.jobs[job_id].to_dict()
+
+    def events(self, job_id: int):
+        """
+        Yield the events of a job, blocking for new ones until the job finishes.
+        """
+        sent = 0
+        while True:
+            with self._cond:
+                entry = self.jobs[job_id]
+                while sent == len(entry.events):
+                    self._cond.wait()
+                new = entry.events[sent:]
+                sent = len(entry.events)
+            for event in new:
+                yield event
+                if event['event'] == 'finished':
+                    return
+
+    def _publish(self, job_id: int, event: dict):
+        with self._cond:
+            entry = self.jobs[job_id]
+            entry.events.append({'job': job_id, **event})
+            self._cond.notify_all()
+
+    def _log(self, msg: str):
+        print(msg, flush=True)
+        # pipeline messages start with "[<input>] "
+        if not msg.startswith('['):
+            return
+        inp, _, text = msg[1:].partition('] ')
+        with self._cond:
+            ids = [i for i, entry in self.jobs.items()
+                   if entry.job.input == inp and entry.status in ('queued', 'running')]
+        for job_id in ids:
+            self._publish(job_id, {'event': 'log', 'message': text})
+
+    def _on_stage(self, stage: str, job: Job):
+        if job.error is not None and not job.error.startswith(f'{stage}:'):
+            # failed or cancelled before this stage; it was passed through without running
+            return
+        with self._cond:
+            entry = self.jobs[job.index]
+            if entry.status == 'queued':
+                entry.status = 'running'
+        self._publish(job.index, {'event': 'stage', 'stage': stage, 'error': job.error})
+
+    def _on_done(self, job: Job):
+        with self._cond:
+            entry = self.jobs[job.index]
+            if job.cancelled and job.error == 'cancelled':
+                entry.status = 'cancelled'
+            else:
+                entry.status = 'failed' if job.error else 'done'
+        self._publish(job.index, {'event': 'finished', **self.status(job.index)})
+
+    def _inputs(self):
+        # blocks the runner's feeder until work arrives; None stops the runner
+        return iter(self._pending.get, None)
+
+    def serve_forever(self):
+        """
+        Start the shared runner and serve requests until `shutdown` is called.
+        """
+        self._runner_thread = threading.Thread(
+            target=self.runner.run, args=(self._inputs(),),
+            kwargs={'on_stage': self._on_stage, 'on_done': self._on_done}, daemon=True)
+        self._runner_thread.start()
+        self.pipeline.log(f'Job server listening on {self.url}')
+        self.httpd.serve_forever()
+
+    def shutdown(self):
+        """
+        Stop accepting requests, cancel unfinished jobs and close the pipeline.
+        Running jobs stop after their current stage; `--resume` continues them later.
+        """
+        self.httpd.shutdown()
+        for job_id in list(self.jobs):
+            self.cancel(job_id)
+        self._pending.put(None)
+        if self._runner_thread is not None:
+            self._runner_thread.join()
+        self.httpd.server_close()
+        self.pipeline.close()
+
+    def _save_upload(self, name: str, body) -> str:
+        # keep the extension for ffmpeg; the random prefix keeps concurrent uploads apart
+        base = os.path.basename(name) or 'upload'
+        path = os.path.join(self.upload_dir, f'{uuid.uuid4().hex}_{base}')
+        with open(path, 'wb') as f:
+            for chunk in body:
+                f.write(chunk)
+        return path
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _body_chunks(self):
+                """
+                Yield the request body in pieces, for both chunked and Content-Length bodies.
+                """
+                if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+                    while True:
+                        size = int(self.rfile.readline().split(b';')[0].strip(), 16)
+                        if size == 0:
+                            # trailers end with an empty line
+                            while self.rfile.readline() not in (b'\r\n', b'\n', b''):
+                                pass
+                            return
+                        remaining = size
+                        while remaining:
+                            data = self.rfile.read(min(remaining, UPLOAD_CHUNK))
+                            if not data:
+                                raise ConnectionError('upload interrupted')
+                            remaining -= len(data)
+                            yield data
+                        self.rfile.readline()
+                else:
+                    remaining = int(self.headers.get('Content-Length', 0))
+                    while remaining:
+                        data = self.rfile.read(min(remaining, UPLOAD_CHUNK))
+                        if not data:
+                            raise ConnectionError('upload interrupted')
+                        remaining -= len(data)
+                        yield data
+
+            def _json_body(self, *required):
+                body = json.loads(b''.join(self._body_chunks()) or b'{}')
+                missing = [name for name in required if name not in body]
+                if missing:
+                    raise ValueError(f'missing fields: {", ".join(missing)}')
+                return body
+
+            def _send_json(self, data, code: int = 200):
+                payload = json.dumps(data, ensure_ascii=False).encode('utf-8')
+                self.send_response(code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _route(self):
+                url = urlparse(self.path)
+                return [p for p in url.path.split('/') if p], parse_qs(url.query)
+
+            def _dispatch(self, handler):
+                try:
+                    handler()
+                except KeyError as e:
+                    self._send_json({'error': f'not found: {e}'}, 404)
+                except (ValueError, TypeError) as e:
+                    self._send_json({'error': str(e)}, 400)
+                except Exception as e:
+                    self._send_json({'error': str(e)}, 500)
+
+            def do_GET(self):
+                self._dispatch(self._get)
+
+            def do_POST(self):
+                self._dispatch(self._post)
+
+            def do_DELETE(self):
+                self._dispatch(self._delete)
+
+            def _get(self):
+                parts, _ = self._route()
+                if parts == ['health']:
+                    self._send_json({'status': 'ok', 'max_concurrency': server.pipeline.asr.max_concurrency()})
+                elif parts == ['jobs']:
+                    self._send_json(server.status())
+                elif len(parts) == 2 and parts[0] == 'jobs':
+                    self._send_json(server.status(int(parts[1])))
+                elif len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'events':
+                    events = server.events(int(parts[1]))
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'application/x-ndjson')
+                    self.send_header('Transfer-Encoding', 'chunked')
+                    self.end_headers()
+                    for event in events:
+                        line = json.dumps(event, ensure_ascii=False).encode('utf-8') + b'\n'
+                        self.wfile.write(b'%x\r\n%s\r\n' % (len(line), line))
+                        self.wfile.flush()
+                    self.wfile.write(b'0\r\n\r\n')
+                else:
+                    raise KeyError(self.path)
+
+            def _post(self):
+                parts, query = self._route()
+                if parts == ['jobs']:
+                    inputs = self._json_body().get('inputs') or []
+                    if not isinstance(inputs, list):
+                        raise ValueError('inputs must be a list')
+                    self._send_json({'ids': server.submit(inputs)})
+                elif parts == ['uploads']:
+                    name = query.get('name', ['upload'])[0]
+                    self._send_json({'path': server._save_upload(name, self._body_chunks())})
+                elif parts == ['segment']:
+                    if self.headers.get('Content-Type') == 'application/octet-stream':
+                        audio = np.frombuffer(b''.join(self._body_chunks()), dtype=np.float32)
+                    else:
+                        audio = self._json_body('path')['path']
+                    segments = server.pipeline.segmenter.segment(audio)
+                    self._send_json({'segments': segments})
+                elif parts == ['transcribe']:
+                    if self.headers.get('Content-Type') == 'application/octet-stream':
+                        audio = np.frombuffer(b''.join(self._body_chunks()), dtype=np.float32)
+                        language = query.get('language', [None])[0]
+                    else:
+                        body = self._json_body('path')
+                        audio, language = body['path'], body.get('language')
+                    self._send_json({'text': server.pipeline.asr.transcribe(audio, language)})
+                elif parts == ['language']:
+                    paths = self._json_body('paths')['paths']
+                    self._send_json({'language': server.pipeline.asr.detect_language(paths)})
+                else:
+                    raise KeyError(self.path)
+
+            def _delete(self):
+                parts, _ = self._route()
+                if len(parts) == 2 and parts[0] == 'jobs':
+                    self._send_json({'cancelled': server.cancel(int(parts[1]))})
+                else:
+                    raise KeyError(self.path)
+
+        return Handler
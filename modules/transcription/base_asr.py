@@ -1,4 +1,16 @@
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import List, Optional, Tuple, Union
+import numpy as np
+
+
+@dataclass
+class TranscriptScore:
+    """
+    Decoder confidence of one transcript, averaged over its decoded segments.
+    """
+    no_speech_prob: float
+    avg_logprob: float
 
 
 class AbstractASR(ABC):
@@ -9,8 +21,48 @@ class AbstractASR(ABC):
         self.cfg = cfg
 
     @abstractmethod
-    def transcribe(self, wav_path: str) -> str:
+    def transcribe(self, audio: Union[str, np.ndarray], language: Optional[str] = None) -> str:
+        """
+        Transcribe audio and return the transcript string.
+        :param audio: Path to a wav file, or a mono float32 waveform (or a
+            sample-range view of one) at the pipeline sample rate.
+        :param language: Language of the audio, e.g. from `detect_language`; None lets the model decide.
+        """
+        pass
+
+    def cache_key(self) -> tuple:
+        """
+        Parameters that determine the transcripts, used to key cached results.
+        Subclasses should add their model and decoding options.
+        """
+        return (type(self).__name__, self.cfg.pipeline.sample_rate)
+
+    def detect_language(self, segments: List[Union[str, np.ndarray]]) -> Optional[str]:
+        """
+        Detect the language of a source once from its first segments, so it can be
+        passed to every `transcribe` call for that source. None means unknown.
+        """
+        return None
+
+    def max_concurrency(self) -> int:
+        """
+        Number of `transcribe` calls the model can usefully run at the same time.
+        """
+        return 1
+
+    def transcribe_batch(self, segments: List[Union[str, np.ndarray]], language: Optional[str] = None) -> List[str]:
+        """
+        Transcribe several segments and return transcripts in input order.
+        Subclasses may override this with real batched inference.
+        :param segments: List of wav paths or waveforms, as accepted by `transcribe`.
+        :param language: Language of all segments, as for `transcribe`.
+        """
+        return [self.transcribe(seg, language) for seg in segments]
+
+    def transcribe_batch_scored(self, segments: List[Union[str, np.ndarray]],
+                                language: Optional[str] = None) -> List[Tuple[str, Optional[TranscriptScore]]]:
         """
-        Transcribe a wav file and return the transcript string.
+        Like `transcribe_batch`, but pair each transcript with its TranscriptScore.
+        The default reports no scores (None).
         """
-        pass
\ No newline at end of file
+        return [(text, None) for text in self.transcribe_batch(segments, language)]
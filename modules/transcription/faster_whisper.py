@@ -1,35 +1,229 @@
-from faster_whisper import WhisperModel
+from bisect import bisect_right
+from dataclasses import asdict
+from typing import List, Optional, Tuple, Union
+import numpy as np
+from faster_whisper import WhisperModel, __version__ as FASTER_WHISPER_VERSION
+from faster_whisper.audio import decode_audio
 from opencc import OpenCC
 
 # my module
-from .base_asr import AbstractASR
+from modules.utils.audio import as_float32
+from .base_asr import AbstractASR, TranscriptScore
+
+try:
+    # batched inference is available from faster-whisper 1.1
+    from faster_whisper import BatchedInferencePipeline
+except ImportError:
+    BatchedInferencePipeline = None
+# `_transcribe_group` relies on 1.1.x semantics: clip timestamps in samples, one window per clip.
+# 1.2 reads them as seconds and merges consecutive clips into shared 30s windows.
+if tuple(int(part) for part in FASTER_WHISPER_VERSION.split('.')[:2]) >= (1, 2):
+    BatchedInferencePipeline = None
+
+# Whisper encodes at most 30 seconds per window; longer clips cannot share a batch
+MAX_BATCH_CLIP_SEC = 30.0
+# seconds a decoded segment may extend past its own clip before the batch is distrusted
+CLIP_BOUND_TOLERANCE = 0.5
 
 
 class FasterWhisperASR(AbstractASR):
     """
     ASR implementation using Faster Whisper.
     """
-    def __init__(self, cfg):
+    def __init__(self, cfg, cpu_threads: int = 0, preset: Optional[str] = None):
+        """
+        :param cfg: AppConfig
+        :param cpu_threads: CTranslate2 threads on CPU; 0 keeps the library default
+        :param preset: name of a decoding preset in `cfg.decoding.presets`; None uses `cfg.decoding.preset`
+        """
         super().__init__(cfg)
+        self.preset_name = preset or cfg.decoding.preset
+        if self.preset_name not in cfg.decoding.presets:
+            raise ValueError(f'Unknown decoding preset: {self.preset_name} '
+                             f'(available: {", ".join(cfg.decoding.presets)})')
+        self.preset = cfg.decoding.presets[self.preset_name]
         # Load model; cfg.pipeline.asr_model may be model name or path
         self.model = WhisperModel(
             model_size_or_path=self.cfg.pipeline.asr_model,
-            device='auto',
-            compute_type='int8'
+            device=self.cfg.pipeline.asr_device,
+            compute_type=self.cfg.pipeline.asr_compute_type,
+            cpu_threads=cpu_threads,
+            num_workers=self.cfg.pipeline.asr_num_workers
         )
+        # faster-whisper's own VAD does not run on clip timestamps, so a preset using it decodes clip by clip
+        batched = BatchedInferencePipeline is not None and not self.preset.vad_filter
+        self.batched_model = BatchedInferencePipeline(model=self.model) if batched else None
         self.opencc = OpenCC('s2t')
 
-    def transcribe(self, wav_path: str) -> str:
+    def cache_key(self) -> tuple:
+        """
+        Model, precision and decoding options that affect the transcripts.
+        """
+        return super().cache_key() + (
+            self.cfg.pipeline.asr_model,
+            self.cfg.pipeline.asr_compute_type,
+            {**asdict(self.preset), 'language': self.cfg.decoding.language, 'opencc': 's2t'}
+        )
+
+    def detect_language(self, segments: List[Union[str, np.ndarray]]) -> Optional[str]:
+        """
+        Detect the language on the first `decoding.detect_sec` seconds of speech.
+        A language set in the config is returned as is.
+        """
+        if self.cfg.decoding.language != 'auto':
+            return self.cfg.decoding.language
+        limit = int(self.cfg.decoding.detect_sec * self.cfg.pipeline.sample_rate)
+        waves, total = [], 0
+        for seg in segments:
+            if total >= limit:
+                break
+            waves.append(self._waveform(seg))
+            total += len(waves[-1])
+        if total == 0:
+            return None
+        # language detection runs eagerly; the returned segment generator is never consumed, so nothing is decoded
+        _, info = self.model.transcribe(np.concatenate(waves)[:limit], beam_size=1, without_timestamps=True)
+        return info.language
+
+    def max_concurrency(self) -> int:
+        """
+        CTranslate2 serves one transcription per worker; extra callers just wait.
+        """
+        return self.cfg.pipeline.asr_num_workers
+
+    def _waveform(self, audio: Union[str, np.ndarray]) -> np.ndarray:
+        if isinstance(audio, str):
+            return decode_audio(audio, sampling_rate=self.cfg.pipeline.sample_rate)
+        # faster-whisper expects float32 samples; views of a float32 source are passed as-is,
+        # views of a memory-mapped 16-bit source are converted clip by clip
+        return as_float32(audio)
+
+    def _decode_options(self) -> dict:
+        """
+        Decoding options of the preset, passed alike to sequential and batched transcription.
+        """
+        return asdict(self.preset)
+
+    def _language(self, language: Optional[str]) -> Optional[str]:
+        if language is None and self.cfg.decoding.language != 'auto':
+            return self.cfg.decoding.language
+        return language
+
+    def transcribe(self, audio: Union[str, np.ndarray], language: Optional[str] = None) -> str:
         """
-        Transcribe the audio file and return the concatenated transcript.
+        Transcribe the audio file or in-memory waveform and return the concatenated transcript.
+        Without a language (argument or config) faster-whisper detects it for this clip.
         """
+        return self._transcribe_scored(audio, language)[0]
+
+    def _transcribe_scored(self, audio: Union[str, np.ndarray],
+                           language: Optional[str] = None) -> Tuple[str, Optional[TranscriptScore]]:
+        if not isinstance(audio, str):
+            audio = self._waveform(audio)
         segments, _ = self.model.transcribe(
-            wav_path,
-            beam_size=5,
-            word_timestamps=False
+            audio,
+            language=self._language(language),
+            word_timestamps=False,
+            **self._decode_options()
         )
-        # segments is a list of Segment objects with `.text` attribute
+        # segments is a generator of Segment objects with `.text` attribute
+        segments = list(segments)
         transcript = ''.join([seg.text for seg in segments])
         # Transform simplified Chinese to traditional Chinese
         transcript = self.opencc.convert(transcript)
-        return transcript
+        return transcript, _score(segments)
+
+    def transcribe_batch(self, segments: List[Union[str, np.ndarray]], language: Optional[str] = None) -> List[str]:
+        """
+        Transcribe segments with batched inference, `asr_batch_size` segments per encoder batch.
+        Falls back to one call per segment when batched inference is unavailable.
+        """
+        return [text for text, _ in self.transcribe_batch_scored(segments, language)]
+
+    def transcribe_batch_scored(self, segments: List[Union[str, np.ndarray]],
+                                language: Optional[str] = None) -> List[Tuple[str, Optional[TranscriptScore]]]:
+        """
+        `transcribe_batch` with the no-speech probability and average log-probability of each clip.
+        """
+        if self.batched_model is None:
+            return [self._transcribe_scored(seg, language) for seg in segments]
+        sr = self.cfg.pipeline.sample_rate
+        language = self._language(language)
+        waves = [self._waveform(seg) for seg in segments]
+        results = [('', None)] * len(waves)
+        # clips longer than one Whisper window are decoded on their own
+        batchable = []
+        for idx, wave in enumerate(waves):
+            if len(wave) > MAX_BATCH_CLIP_SEC * sr:
+                results[idx] = self._transcribe_scored(wave, language)
+            else:
+                batchable.append(idx)
+
+        batch_size = self.cfg.pipeline.asr_batch_size
+        for i in range(0, len(batchable), batch_size):
+            group = batchable[i:i + batch_size]
+            if self.batched_model is None:
+                # batching was disabled by a failed group check below
+                scored = [self._transcribe_scored(waves[idx], language) for idx in group]
+            else:
+                scored = self._transcribe_group([waves[idx] for idx in group], language)
+            for idx, result in zip(group, scored):
+                results[idx] = result
+        return results
+
+    def _transcribe_group(self, waves: List[np.ndarray],
+                          language: Optional[str] = None) -> List[Tuple[str, Optional[TranscriptScore]]]:
+        """
+        Run one batched pass over at most `asr_batch_size` short clips.
+        The clips are laid end to end and each one is passed as its own clip timestamp
+        (in samples, as faster-whisper 1.1 expects), so the pipeline pads them into a single
+        encoder batch. If any decoded segment crosses its clip's bounds, the clips did not get
+        windows of their own: the group is decoded clip by clip instead and batching is
+        turned off for this model.
+        Every preset option is passed on. `condition_on_previous_text` has no effect here, since
+        each clip is decoded as a single window; presets with `vad_filter` never reach this path.
+        """
+        sr = self.cfg.pipeline.sample_rate
+        bounds = np.cumsum([0] + [len(w) for w in waves])
+        clip_timestamps = [
+            {'start': int(start), 'end': int(end)}
+            for start, end in zip(bounds[:-1], bounds[1:]) if end > start
+        ]
+        if not clip_timestamps:
+            return [('', None)] * len(waves)
+        segments, _ = self.batched_model.transcribe(
+            np.concatenate(waves),
+            clip_timestamps=clip_timestamps,
+            batch_size=len(clip_timestamps),
+            language=language,
+            word_timestamps=False,
+            **self._decode_options()
+        )
+        # map each decoded segment back to its clip by the midpoint of its time span
+        starts = (bounds[:-1] / sr).tolist()
+        ends = (bounds[1:] / sr).tolist()
+        decoded = [[] for _ in waves]
+        for seg in segments:
+            idx = max(bisect_right(starts, (seg.start + seg.end) / 2) - 1, 0)
+            if seg.start < starts[idx] - CLIP_BOUND_TOLERANCE or seg.end > ends[idx] + CLIP_BOUND_TOLERANCE:
+                print(f'Batched decoding returned a segment spanning several clips '
+                      f'({seg.start:.2f}-{seg.end:.2f}s); falling back to one clip at a time.')
+                self.batched_model = None
+                return [self._transcribe_scored(wave, language) for wave in waves]
+            decoded[idx].append(seg)
+        # Transform simplified Chinese to traditional Chinese
+        return [(self.opencc.convert(''.join(seg.text for seg in parts)), _score(parts)) for parts in decoded]
+
+
+def _score(segments) -> Optional[TranscriptScore]:
+    """
+    Token-weighted mean no-speech probability and average log-probability of decoded segments.
+    """
+    if not segments:
+        return None
+    weights = [max(1, len(seg.tokens)) for seg in segments]
+    total = sum(weights)
+    return TranscriptScore(
+        no_speech_prob=sum(w * seg.no_speech_prob for w, seg in zip(weights, segments)) / total,
+        avg_logprob=sum(w * seg.avg_logprob for w, seg in zip(weights, segments)) / total
+    )
@@ -0,0 +1,86 @@
+import threading
+from typing import Callable, List, Optional, Union
+import numpy as np
+
+
+class TranscriptionScheduler:
+    """
+    Background transcription in review order: the segment in focus is always
+    transcribed first, then the `lookahead` segments after it. Segments outside that
+    window wait until the reviewer gets closer, so no CPU is spent on clips nobody
+    is looking at. Finished transcripts are handed to `on_result` from the worker thread.
+    """
+    def __init__(self, asr, clips: List[Union[str, np.ndarray]], on_result: Callable[[int, str], None],
+                 lookahead: int = 5, workers: Optional[int] = None, language: Optional[str] = None):
+        """
+        :param asr: AbstractASR instance
+        :param clips: clip paths or waveforms, as accepted by `asr.transcribe`
+        :param on_result: called with (index, transcript) when a segment is done
+        :param lookahead: segments after the focused one to prefetch
+        :param workers: concurrent transcriptions; defaults to what the model can run in parallel
+        :param language: language of all clips, e.g. from `asr.detect_language`
+        """
+        self.asr = asr
+        self.clips = clips
+        self.on_result = on_result
+        self.lookahead = lookahead
+        self.language = language
+        self.results = [None] * len(clips)
+        self._running = set()
+        self._focus = 0
+        self._stopped = False
+        self._cond = threading.Condition()
+        workers = workers or asr.max_concurrency()
+        self._threads = [threading.Thread(target=self._worker, daemon=True)
+                         for _ in range(max(1, min(workers, len(clips))))]
+        for thread in self._threads:
+            thread.start()
+
+    def focus(self, index: int):
+        """
+        Move the priority window to start at `index` (the segment on screen).
+        """
+        with self._cond:
+            self._focus = index
+            self._cond.notify_all()
+
+    def result(self, index: int) -> Optional[str]:
+        """
+        Transcript of segment `index`, or None while it is pending.
+        """
+        return self.results[index]
+
+    def stop(self):
+        """
+        Stop taking new segments; transcriptions already running finish in the background.
+        """
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def _next_index(self) -> Optional[int]:
+        # caller holds the condition; nearest pending segment in [focus, focus + lookahead]
+        end = min(self._focus + self.lookahead + 1, len(self.clips))
+        for index in range(self._focus, end):
+            if self.results[index] is None and index not in self._running:
+                return index
+        return None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                index = self._next_index()
+                while index is None and not self._stopped:
+                    self._cond.wait()
+                    index = self._next_index()
+                if self._stopped:
+                    return
+                self._running.add(index)
+            try:
+                text = self.asr.transcribe(self.clips[index], self.language)
+            except Exception as e:
+                text = f'[Error: {e}]'
+            with self._cond:
+                self.results[index] = text
+                self._running.discard(index)
+            self.on_result(index, text)
@@ -0,0 +1,125 @@
+import os
+import struct
+from typing import List, Optional, Tuple
+import numpy as np
+
+# WAV format tags that can be mapped directly: (format tag, bits per sample) -> dtype
+_MAPPABLE_WAV = {(1, 16): '<i2', (3, 32): '<f4'}
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def map_wav(wav_path: str, sample_rate: int) -> Optional[np.ndarray]:
+    """
+    Memory-map the data chunk of a mono 16-bit PCM or float32 wav read-only, so the
+    source is paged in from disk on demand instead of decoded into RAM.
+    :param wav_path: Path to the wav file.
+    :param sample_rate: Required sample rate.
+    :return: 1-D int16 or float32 np.memmap, or None if the file cannot be mapped as is
+        (other sample formats, several channels or a different sample rate).
+    """
+    with open(wav_path, 'rb') as f:
+        header = f.read(12)
+        if len(header) < 12 or header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+            return None
+        fmt = None
+        while True:
+            chunk = f.read(8)
+            if len(chunk) < 8:
+                return None
+            chunk_id, size = chunk[:4], struct.unpack('<I', chunk[4:])[0]
+            if chunk_id == b'fmt ':
+                data = f.read(size + size % 2)
+                tag, channels, sr = struct.unpack('<HHI', data[:8])
+                bits = struct.unpack('<H', data[14:16])[0]
+                if tag == _WAVE_FORMAT_EXTENSIBLE and size >= 26:
+                    # the sub-format GUID starts with the actual format tag
+                    tag = struct.unpack('<H', data[24:26])[0]
+                fmt = (tag, channels, sr, bits)
+            elif chunk_id == b'data':
+                offset = f.tell()
+                break
+            else:
+                # chunks are padded to an even size
+                f.seek(size + size % 2, os.SEEK_CUR)
+    if fmt is None:
+        return None
+    tag, channels, sr, bits = fmt
+    dtype = _MAPPABLE_WAV.get((tag, bits))
+    if dtype is None or channels != 1 or sr != sample_rate:
+        return None
+    # streamed wavs may carry a placeholder size; never map past the end of the file
+    count = min(size, os.path.getsize(wav_path) - offset) // np.dtype(dtype).itemsize
+    if count <= 0:
+        return np.zeros(0, dtype=np.float32)
+    return np.memmap(wav_path, dtype=dtype, mode='r', offset=offset, shape=(count,))
+
+
+def as_float32(samples: np.ndarray) -> np.ndarray:
+    """
+    Samples as float32 in [-1, 1]: float32 input is returned without copying, 16-bit PCM
+    (e.g. a view of a mapped wav) is scaled into a new array.
+    """
+    if samples.dtype == np.int16:
+        return np.multiply(samples, np.float32(1 / 32768), dtype=np.float32)
+    return np.asarray(samples, dtype=np.float32)
+
+
+def load_waveform(wav_path: str, sample_rate: int) -> np.ndarray:
+    """
+    Open a wav file once as a mono waveform. Mono 16-bit or float32 wavs at the target
+    rate (what FileReader writes) are memory-mapped and returned as int16/float32 memmaps;
+    use `as_float32` on the slices that need float samples. Anything else is decoded.
+    :param wav_path: Path to the wav file.
+    :param sample_rate: Target sample rate; the audio is resampled if it differs.
+    :return: 1-D numpy array (int16 or float32 memmap, or float32 array).
+    """
+    mapped = map_wav(wav_path, sample_rate)
+    if mapped is not None:
+        return mapped
+    import soundfile as sf
+    data, sr = sf.read(wav_path, dtype='float32')
+    # mono
+    if data.ndim > 1:
+        data = data.mean(axis=1, dtype=np.float32)
+    if sr != sample_rate:
+        # torch is only needed for the rare non-16 kHz source
+        import torch
+        import torchaudio
+        audio = torchaudio.functional.resample(torch.from_numpy(data), sr, sample_rate)
+        data = audio.numpy()
+    return data
+
+
+def segment_views(waveform: np.ndarray, segments: List[Tuple[float, float]],
+                  sample_rate: int) -> List[np.ndarray]:
+    """
+    Cut a waveform into segments without copying.
+    :param waveform: 1-D source waveform (float32, or int16 when memory-mapped).
+    :param segments: List of (start_sec, end_sec).
+    :param sample_rate: Sample rate of the waveform.
+    :return: List of sample-range views into the waveform.
+    """
+    return [waveform[int(start * sample_rate):int(end * sample_rate)]
+            for start, end in segments]
+
+
+# output codecs: soundfile format, subtype and file extension
+CODECS = {
+    'wav': ('WAV', 'PCM_16', '.wav'),
+    'flac': ('FLAC', 'PCM_16', '.flac'),
+    # Ogg Opus needs libsndfile >= 1.0.29 and a sample rate of 8, 12, 16, 24 or 48 kHz
+    'opus': ('OGG', 'OPUS', '.opus'),
+}
+
+
+def write_clip(file, clip: np.ndarray, sample_rate: int, codec: str = 'wav'):
+    """
+    Encode a clip with the given codec.
+    :param file: Output path or writable file object.
+    :param clip: 1-D float32 or int16 samples.
+    :param sample_rate: Sample rate of the clip.
+    :param codec: One of CODECS.
+    """
+    import soundfile as sf
+    fmt, subtype, _ = CODECS[codec]
+    sf.write(file, clip, sample_rate, format=fmt, subtype=subtype)
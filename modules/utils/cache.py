@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from typing import Any, Optional
+
+
+def hash_file(path: str, block_size: int = 1 << 20) -> str:
+    """
+    SHA-256 of a file's content, read in blocks.
+    """
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def hash_params(*parts: Any) -> str:
+    """
+    Stable SHA-256 of JSON-serialisable stage parameters.
+    """
+    data = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+class StageCache:
+    """
+    Content-addressed store for stage results (converted audio, segment lists, transcripts).
+    Keys are hashes of the input content plus the stage parameters, so a stage is
+    skipped exactly when its inputs are unchanged. Entries are files under
+    `cache_dir/<stage>/`; reading one refreshes its mtime, and the least recently used
+    entries are removed once the cache grows past `max_bytes`.
+    """
+    def __init__(self, cache_dir: str, max_bytes: int):
+        """
+        :param cache_dir: root directory of the cache
+        :param max_bytes: size limit; 0 disables eviction
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size = None  # total bytes, computed on first write
+
+    @classmethod
+    def from_config(cls, cfg) -> 'StageCache':
+        return cls(cfg.paths.cache_dir, int(cfg.cache.max_size_gb * 1024 ** 3))
+
+    def path(self, stage: str, key: str, suffix: str) -> str:
+        return os.path.join(self.cache_dir, stage, key[:2], f'{key}{suffix}')
+
+    def get_file(self, stage: str, key: str, suffix: str) -> Optional[str]:
+        """
+        Return the cached file for key, or None on a miss.
+        """
+        path = self.path(stage, key, suffix)
+        try:
+            # mark as recently used
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def put_file(self, stage: str, key: str, suffix: str, src_path: str) -> str:
+        """
+        Store a file under key, hardlinking it when possible instead of copying.
+        """
+        path = self.path(stage, key, suffix)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            os.link(src_path, tmp)
+        except OSError:
+            shutil.copyfile(src_path, tmp)
+        self._commit(tmp, path)
+        return path
+
+    def put_audio(self, stage: str, key: str, waveform, sample_rate: int) -> str:
+        """
+        Store a float32 waveform as a 16-bit wav under key.
+        """
+        import soundfile as sf
+        path = self.path(stage, key, '.wav')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        sf.write(tmp, waveform, sample_rate, subtype='PCM_16', format='WAV')
+        self._commit(tmp, path)
+        return path
+
+    def get_json(self, stage: str, key: str) -> Optional[Any]:
+        path = self.get_file(stage, key, '.json')
+        if path is None:
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            # a corrupt entry is treated as a miss
+            return None
+
+    def put_json(self, stage: str, key: str, value: Any) -> str:
+        path = self.path(stage, key, '.json')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(value, f, ensure_ascii=False)
+        self._commit(tmp, path)
+        return path
+
+    def _commit(self, tmp: str, path: str):
+        """
+        Atomically move a finished temp file into place, then enforce the size limit.
+        """
+        old_size = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(tmp, path)
+        if not self.max_bytes:
+            return
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += os.path.getsize(path) - old_size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith('.tmp'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield st.st_mtime, st.st_size, path
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self):
+        """
+        Remove least recently used entries until the cache is below 90% of its limit.
+        """
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._size = total
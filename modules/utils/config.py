@@ -1,13 +1,21 @@
 from pathlib import Path
+from typing import Dict
 import os
+import threading
 import yaml
 from dacite import from_dict
 
 # my module
 from .types import AppConfig, PathsConfig, VADConfig, PipelineConfig
 
+DEFAULT_CONFIG_PATH = "configs/default.yaml"
 
-def load_config(path: str="configs/default.yaml") -> AppConfig:
+# parsed configs, keyed by the path they were loaded from
+_config_cache: Dict[str, AppConfig] = {}
+_config_lock = threading.Lock()
+
+
+def _read_config(path: str) -> AppConfig:
     # conpute project root path
     PROJECT_ROOT = Path(__file__).parent.parent.parent.resolve()
     
@@ -25,3 +33,30 @@ def load_config(path: str="configs/default.yaml") -> AppConfig:
     
     # automatically instantiate dataclasses from config dict
     return from_dict(data_class=AppConfig, data=cfg)
+
+
+def load_config(path: str=DEFAULT_CONFIG_PATH, reload: bool=False) -> AppConfig:
+    """
+    Load the config once per process; later calls return the same AppConfig.
+    :param path: Config path relative to the project root.
+    :param reload: Re-read the file even if it was already loaded.
+    """
+    with _config_lock:
+        if reload or path not in _config_cache:
+            _config_cache[path] = _read_config(path)
+        return _config_cache[path]
+
+
+def reload_config(path: str=DEFAULT_CONFIG_PATH) -> AppConfig:
+    """
+    Re-read the config file, replacing the cached AppConfig.
+    """
+    return load_config(path, reload=True)
+
+
+def set_config(cfg: AppConfig, path: str=DEFAULT_CONFIG_PATH) -> None:
+    """
+    Override the config returned by `load_config(path)`, e.g. for tools or tests.
+    """
+    with _config_lock:
+        _config_cache[path] = cfg
@@ -0,0 +1,41 @@
+import os
+import re
+import shutil
+import socket
+
+
+def place_file(src: str, dst_dir: str, mode: str = 'link') -> str:
+    """
+    Make src available inside dst_dir without writing the bytes twice where possible.
+    :param src: Existing file.
+    :param dst_dir: Target directory; the file keeps its name.
+    :param mode: 'link' hardlinks (falling back to a copy across filesystems),
+        'move' moves the file, 'copy' always copies.
+    :return: Path of the placed file.
+    """
+    dst = os.path.join(dst_dir, os.path.basename(src))
+    if os.path.exists(dst):
+        if os.path.samefile(src, dst):
+            return dst
+        # replace, as a copy would
+        os.remove(dst)
+    if mode == 'move':
+        shutil.move(src, dst)
+    elif mode == 'link':
+        try:
+            os.link(src, dst)
+        except OSError:
+            # cross-device or unsupported filesystem
+            shutil.copy2(src, dst)
+    else:
+        shutil.copy2(src, dst)
+    return dst
+
+
+def node_name() -> str:
+    """
+    This host's short name (a fully qualified name is cut at its first dot), reduced to
+    characters safe in file names and free of '_', which separates the fields of generated
+    names, and of '.', at which WebDataset splits sample keys.
+    """
+    return re.sub(r'[^A-Za-z0-9-]', '-', socket.gethostname().split('.')[0]) or 'node'
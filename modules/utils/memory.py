@@ -0,0 +1,27 @@
+import os
+import sys
+
+
+def current_rss() -> int:
+    """
+    Resident set size of this process in bytes, or 0 where it cannot be read cheaply.
+    """
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+def peak_rss() -> int:
+    """
+    Peak resident set size of this process in bytes, or 0 where unsupported.
+    """
+    try:
+        import resource
+    except ImportError:
+        # not available on Windows
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak if sys.platform == 'darwin' else peak * 1024
@@ -0,0 +1,187 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+# my module
+from .memory import peak_rss
+
+PROM_PREFIX = 'speech_corpus'
+
+
+class NullMetrics:
+    """
+    Metrics sink used when metrics are off; every call is a no-op.
+    """
+    enabled = False
+
+    @contextmanager
+    def stage(self, name: str, source: Optional[str] = None):
+        yield {}
+
+    def gauge(self, name: str, value: float, **labels):
+        pass
+
+    def summary(self) -> str:
+        return ''
+
+    def close(self):
+        pass
+
+
+class Metrics(NullMetrics):
+    """
+    Per-stage timing, real-time factor and memory instrumentation.
+    Every finished stage is appended as one JSON line to `<out_dir>/metrics<suffix>.jsonl`,
+    and totals are written as a Prometheus textfile-collector file
+    `<out_dir>/speech_corpus<suffix>.prom`. With no out_dir the totals are only kept in
+    memory for `summary()`.
+    """
+    enabled = True
+
+    def __init__(self, out_dir: Optional[str] = None, suffix: str = '', prom_interval: float = 10.0):
+        """
+        :param out_dir: directory for the JSON log and the .prom file; None keeps metrics in memory
+        :param suffix: file name suffix, e.g. a worker id, so processes do not share files
+        :param prom_interval: minimum seconds between rewrites of the .prom file
+        """
+        self._lock = threading.Lock()
+        self._totals: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        self._gauges: Dict[tuple, float] = {}
+        self._started = time.time()
+        self._cpu_started = time.process_time()
+        self._prom_interval = prom_interval
+        self._prom_written = 0.0
+        # peak RSS and CPU seconds of other processes merged in with `merge`
+        self._merged_rss = 0
+        self._merged_cpu = 0.0
+        self._log = None
+        self._prom_path = None
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+            self._log = open(os.path.join(out_dir, f'metrics{suffix}.jsonl'), 'a', encoding='utf-8')
+            self._prom_path = os.path.join(out_dir, f'{PROM_PREFIX}{suffix}.prom')
+
+    @contextmanager
+    def stage(self, name: str, source: Optional[str] = None):
+        """
+        Time a stage. The yielded dict may be filled with `audio_sec` and `segments`.
+        CPU time is that of the calling thread; native worker threads (e.g. CTranslate2)
+        show up only in the process-wide CPU total.
+        """
+        extra = {}
+        wall0, cpu0 = time.perf_counter(), time.thread_time()
+        error = None
+        try:
+            yield extra
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            wall, cpu = time.perf_counter() - wall0, time.thread_time() - cpu0
+            audio = float(extra.get('audio_sec') or 0.0)
+            event = {
+                'ts': time.time(), 'stage': name, 'source': source,
+                'wall_sec': round(wall, 6), 'cpu_sec': round(cpu, 6), 'audio_sec': audio,
+                'rtf': round(wall / audio, 6) if audio else None,
+                'segments': extra.get('segments'), 'peak_rss_bytes': peak_rss(),
+                'error': error or extra.get('error'),
+            }
+            with self._lock:
+                totals = self._totals[name]
+                totals['runs'] += 1
+                totals['wall_sec'] += wall
+                totals['cpu_sec'] += cpu
+                totals['audio_sec'] += audio
+                totals['segments'] += extra.get('segments') or 0
+                totals['errors'] += 1 if event['error'] else 0
+                if self._log is not None:
+                    self._log.write(json.dumps(event, ensure_ascii=False) + '\n')
+                    self._log.flush()
+                self._maybe_write_prom()
+
+    def snapshot(self) -> dict:
+        """
+        Picklable per-stage totals plus this process's peak RSS and CPU time, for `merge`.
+        """
+        with self._lock:
+            return {
+                'totals': {stage: dict(totals) for stage, totals in self._totals.items()},
+                'peak_rss_bytes': peak_rss(),
+                'cpu_sec': time.process_time() - self._cpu_started,
+            }
+
+    def merge(self, snapshot: dict):
+        """
+        Add the totals of another process (e.g. a pool worker) to this summary.
+        """
+        with self._lock:
+            for stage, totals in snapshot['totals'].items():
+                for field, value in totals.items():
+                    self._totals[stage][field] += value
+            self._merged_rss = max(self._merged_rss, snapshot['peak_rss_bytes'])
+            self._merged_cpu += snapshot['cpu_sec']
+
+    def gauge(self, name: str, value: float, **labels):
+        """
+        Record the latest value of a gauge such as a queue depth, keeping its maximum too.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        max_key = (f'{name}_max', key[1])
+        with self._lock:
+            self._gauges[key] = value
+            self._gauges[max_key] = max(value, self._gauges.get(max_key, value))
+
+    def _maybe_write_prom(self, force: bool = False):
+        # caller holds self._lock
+        if self._prom_path is None:
+            return
+        now = time.time()
+        if not force and now - self._prom_written < self._prom_interval:
+            return
+        self._prom_written = now
+        lines = []
+        for field, metric_name in (('runs', 'runs'), ('wall_sec', 'wall_seconds'), ('cpu_sec', 'cpu_seconds'),
+                                   ('audio_sec', 'audio_seconds'), ('segments', 'segments'), ('errors', 'errors')):
+            metric = f'{PROM_PREFIX}_stage_{metric_name}_total'
+            lines.append(f'# TYPE {metric} counter')
+            lines += [f'{metric}{{stage="{stage}"}} {totals[field]:.6g}' for stage, totals in self._totals.items()]
+        lines.append(f'# TYPE {PROM_PREFIX}_stage_rtf gauge')
+        lines += [f'{PROM_PREFIX}_stage_rtf{{stage="{stage}"}} {totals["wall_sec"] / totals["audio_sec"]:.6g}'
+                  for stage, totals in self._totals.items() if totals['audio_sec']]
+        for (name, labels), value in sorted(self._gauges.items()):
+            label_text = ','.join(f'{k}="{v}"' for k, v in labels)
+            label_text = f'{{{label_text}}}' if label_text else ''
+            lines.append(f'{PROM_PREFIX}_{name}{label_text} {value:.6g}')
+        lines.append(f'{PROM_PREFIX}_peak_rss_bytes {peak_rss()}')
+        lines.append(f'{PROM_PREFIX}_process_cpu_seconds {time.process_time() - self._cpu_started:.6g}')
+        lines.append(f'{PROM_PREFIX}_uptime_seconds {now - self._started:.6g}')
+        # the textfile collector may read at any time, so replace the file atomically
+        tmp = f'{self._prom_path}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp, self._prom_path)
+
+    def summary(self) -> str:
+        """
+        Human-readable per-stage table.
+        """
+        with self._lock:
+            rows = [f"{'stage':<18}{'runs':>6}{'wall s':>10}{'cpu s':>10}{'audio s':>10}{'RTF':>8}{'segs':>7}"]
+            for stage, t in self._totals.items():
+                rtf = f"{t['wall_sec'] / t['audio_sec']:.3f}" if t['audio_sec'] else '-'
+                rows.append(f"{stage:<18}{int(t['runs']):>6}{t['wall_sec']:>10.2f}{t['cpu_sec']:>10.2f}"
+                            f"{t['audio_sec']:>10.1f}{rtf:>8}{int(t['segments']):>7}")
+            rows.append(f'peak RSS {max(peak_rss(), self._merged_rss) / 2 ** 20:.1f} MB, '
+                        f'process CPU {time.process_time() - self._cpu_started + self._merged_cpu:.1f}s')
+        return '\n'.join(rows)
+
+    def close(self):
+        with self._lock:
+            self._maybe_write_prom(force=True)
+            if self._log is not None:
+                self._log.close()
+                self._log = None
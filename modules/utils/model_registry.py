@@ -0,0 +1,187 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Optional
+
+# my module
+from modules.utils.config import load_config
+from modules.utils.memory import current_rss
+
+
+@dataclass
+class _Entry:
+    model: Any
+    size_bytes: int
+    last_used: float
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of loaded VAD and ASR models.
+    Each model is loaded lazily, once per key, and shared by every caller and thread.
+    Entries idle longer than `idle_timeout` are dropped, and the least recently used
+    ones are dropped while the estimated total size exceeds `memory_budget`.
+    """
+    def __init__(self, idle_timeout: Optional[float] = None, memory_budget: Optional[int] = None):
+        """
+        :param idle_timeout: seconds a model may stay unused before eviction; None or 0 disables
+        :param memory_budget: bytes of loaded models to keep; None or 0 disables
+        """
+        self.idle_timeout = idle_timeout or None
+        self.memory_budget = memory_budget or None
+        self._entries: Dict[Hashable, _Entry] = {}
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+        self._janitor = None
+
+    @staticmethod
+    def vad_key(cfg) -> tuple:
+        vad = cfg.pipeline.vad
+        return ('vad', vad.backend, vad.onnx_model, cfg.pipeline.sample_rate, vad.threshold, vad.min_silence_len,
+                vad.batch_lanes, vad.lane_sec, vad.lane_warmup_sec)
+
+    @staticmethod
+    def asr_key(cfg) -> tuple:
+        p = cfg.pipeline
+        return ('asr', p.asr_model, p.asr_device, p.asr_compute_type, p.asr_batch_size, p.asr_num_workers,
+                cfg.decoding.preset, cfg.decoding.language)
+
+    def get_vad(self, cfg):
+        """
+        Return the shared segmenter for cfg's VAD backend and parameters.
+        """
+        return self.get(self.vad_key(cfg), lambda: load_segmenter(cfg))
+
+    def get_asr(self, cfg):
+        """
+        Return the shared FasterWhisperASR for cfg's model settings.
+        """
+        def load():
+            from modules.transcription.faster_whisper import FasterWhisperASR
+            return FasterWhisperASR(cfg)
+        return self.get(self.asr_key(cfg), load)
+
+    def get(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """
+        Return the model for key, loading it with loader on first use.
+        Concurrent callers asking for the same key wait for a single load.
+        """
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.last_used = time.monotonic()
+                    return entry.model
+            # measure the load by RSS growth; concurrent loads of other keys make this a rough estimate
+            rss_before = current_rss()
+            model = loader()
+            size = max(0, current_rss() - rss_before)
+            with self._lock:
+                self._entries[key] = _Entry(model, size, time.monotonic())
+                self._evict(keep=key)
+            self._start_janitor()
+            return model
+
+    def warmup(self, cfg) -> threading.Thread:
+        """
+        Load the VAD and ASR models for cfg in a background thread.
+        """
+        def load():
+            try:
+                self.get_vad(cfg)
+                self.get_asr(cfg)
+            except Exception as e:
+                print(f'Model warm-up failed: {e}')
+
+        thread = threading.Thread(target=load, name='model-warmup', daemon=True)
+        thread.start()
+        return thread
+
+    def evict_idle(self):
+        """
+        Drop entries unused for longer than idle_timeout.
+        """
+        with self._lock:
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _evict(self, keep: Optional[Hashable] = None):
+        # caller holds self._lock
+        now = time.monotonic()
+        if self.idle_timeout:
+            for key in [k for k, e in self._entries.items()
+                        if k != keep and now - e.last_used > self.idle_timeout]:
+                del self._entries[key]
+        if self.memory_budget:
+            by_age = sorted((e.last_used, k) for k, e in self._entries.items() if k != keep)
+            total = sum(e.size_bytes for e in self._entries.values())
+            for _, key in by_age:
+                if total <= self.memory_budget:
+                    break
+                total -= self._entries.pop(key).size_bytes
+
+    def _start_janitor(self):
+        """
+        Start a daemon thread that evicts idle models periodically.
+        """
+        def sweep():
+            while True:
+                time.sleep(min(60.0, self.idle_timeout))
+                self.evict_idle()
+
+        with self._lock:
+            if not self.idle_timeout or self._janitor is not None:
+                return
+            self._janitor = threading.Thread(target=sweep, name='model-janitor', daemon=True)
+            self._janitor.start()
+
+
+def load_segmenter(cfg, cpu_threads: int = 0):
+    """
+    Build the segmenter selected by `pipeline.vad.backend`: silero (torch.hub) or onnx (offline).
+    """
+    backend = cfg.pipeline.vad.backend
+    if backend == 'silero':
+        from modules.segmentation.silero_vad import SileroVAD
+        return SileroVAD(cfg)
+    if backend == 'onnx':
+        from modules.segmentation.onnx_vad import OnnxSileroVAD
+        return OnnxSileroVAD(cfg, cpu_threads=cpu_threads)
+    raise ValueError(f'Unsupported VAD backend: {backend}')
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ModelRegistry:
+    """
+    Return the process-wide registry, configured from the `models` config section.
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            models_cfg = load_config().models
+            _registry = ModelRegistry(
+                idle_timeout=models_cfg.idle_timeout_sec,
+                memory_budget=models_cfg.memory_budget_mb * 1024 * 1024
+            )
+        return _registry
+
+
+def get_models(cfg):
+    """
+    Return (segmenter, asr) for cfg: clients of the job server at `server.url` when it is set,
+    so every GUI on the machine shares the server's models, else this process's registry.
+    """
+    if cfg.server.url:
+        from modules.server.client import JobClient, RemoteASR, RemoteSegmenter
+        client = JobClient(cfg.server.url)
+        return RemoteSegmenter(cfg, client), RemoteASR(cfg, client)
+    registry = get_registry()
+    return registry.get_vad(cfg), registry.get_asr(cfg)
@@ -1,4 +1,5 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Dict, List
 
 @dataclass(frozen=True)
 class PathsConfig:
@@ -8,17 +9,125 @@ class PathsConfig:
     data_storage_dir: str
     raw_media_dir: str
     resulted_corpus_dir: str
+    cache_dir: str  # content-addressed stage cache
 
 @dataclass(frozen=True)
 class VADConfig:
     threshold: float
     min_silence_len: float  # seconds
+    normalize: bool = True
+    min_segment_len: float = 1.0  # seconds
+    max_segment_len: float = 20.0  # seconds, including padding; at most Whisper's 30s window
+    pad: float = 0.1  # seconds added on both edges
+    backend: str = 'silero'  # silero (torch.hub) or onnx (onnxruntime, offline)
+    onnx_model: str = ''  # silero_vad.onnx path; empty uses the copy bundled with the silero-vad package
+    batch_lanes: int = 64  # onnx: lanes scored together in one batch
+    lane_sec: float = 120.0  # onnx: audio per lane
+    lane_warmup_sec: float = 10.0  # onnx: preceding audio each lane is primed with
 
 @dataclass(frozen=True)
 class PipelineConfig:
     sample_rate: int
     vad: VADConfig
     asr_model: str
+    asr_batch_size: int = 8  # segments per batched encoder pass
+    asr_device: str = 'auto'
+    asr_compute_type: str = 'int8'
+    asr_num_workers: int = 1  # transcriptions the Whisper model runs concurrently
+    decode_chunk_sec: float = 30.0  # chunk length when stream-decoding media
+    decode_format: str = 'f32le'  # raw PCM format piped from ffmpeg: f32le or s16le
+
+@dataclass(frozen=True)
+class RunnerConfig:
+    queue_size: int = 2  # jobs buffered between two stages
+    acquire_workers: int = 3
+    decode_workers: int = 1
+    segment_workers: int = 1
+    transcribe_workers: int = 1
+    export_workers: int = 1
+
+@dataclass(frozen=True)
+class ModelsConfig:
+    warmup: bool = True  # load models in the background when a GUI starts
+    idle_timeout_sec: float = 1800.0  # drop models unused this long; 0 keeps them
+    memory_budget_mb: int = 0  # keep loaded models under this size; 0 means unlimited
+
+@dataclass(frozen=True)
+class DownloadConfig:
+    format: str = 'bestaudio/best'  # yt-dlp format selector; audio only unless unavailable
+
+@dataclass(frozen=True)
+class ExportConfig:
+    backend: str = 'files'  # files: wav + txt per clip; tar: sharded WebDataset archives
+    shard_max_mb: int = 1024  # size cap of one tar shard
+    codec: str = 'wav'  # clip encoding: wav (16-bit PCM), flac (lossless) or opus
+    encoder_threads: int = 4  # clips encoded in parallel
+    placement: str = 'link'  # putting a clip in a second location: link, move or copy
+
+@dataclass(frozen=True)
+class CacheConfig:
+    enabled: bool = True
+    max_size_gb: float = 20.0  # least recently used entries are evicted beyond this
+
+@dataclass(frozen=True)
+class DecodePreset:
+    beam_size: int = 5
+    condition_on_previous_text: bool = True  # prompt each window with the previous window's text
+    vad_filter: bool = False  # faster-whisper's own VAD; segments already come from ours. Disables batched decoding
+    without_timestamps: bool = False
+
+def _default_presets() -> Dict[str, DecodePreset]:
+    return {
+        'fast': DecodePreset(beam_size=1, condition_on_previous_text=False, without_timestamps=True),
+        'accurate': DecodePreset(beam_size=5),
+    }
+
+@dataclass(frozen=True)
+class DecodingConfig:
+    preset: str = 'accurate'  # key of `presets`; --preset overrides it per run
+    language: str = 'auto'  # language code, or auto to detect once per source
+    detect_sec: float = 30.0  # seconds of speech used for language detection
+    presets: Dict[str, DecodePreset] = field(default_factory=_default_presets)
+
+@dataclass(frozen=True)
+class IngestConfig:
+    index_db: str = ''  # SQLite file indexing raw_media_dir; empty means <temp_dir>/ingest_index.sqlite
+    extensions: List[str] = field(default_factory=lambda: ['.mp4', '.mp3', '.wav'])
+    hash_workers: int = 8  # threads hashing new or changed files
+
+@dataclass(frozen=True)
+class ServerConfig:
+    host: str = '127.0.0.1'  # the job server has no authentication; keep it on localhost
+    port: int = 8765
+    url: str = ''  # when set (e.g. http://127.0.0.1:8765), the CLI and GUIs use this server
+
+@dataclass(frozen=True)
+class GuiConfig:
+    lookahead: int = 5  # segments after the one on screen transcribed in the background
+
+@dataclass(frozen=True)
+class QualityConfig:
+    enabled: bool = True
+    action: str = 'flag'  # flag: only report rejections; drop: rejected segments skip ASR and export
+    min_duration: float = 0.5  # seconds
+    min_rms_db: float = -50.0  # segment level in dBFS
+    min_snr_db: float = 3.0  # segment level over the noise floor between the source's VAD segments
+    max_clip_ratio: float = 0.01  # share of clipped samples; 0 disables
+    min_speech_prob: float = 0.0  # mean VAD speech probability (onnx backend only); 0 disables
+    post_asr: bool = True  # reject transcripts by decoder confidence
+    max_no_speech_prob: float = 0.8
+    min_avg_logprob: float = -1.2
+    drop_empty: bool = True
+
+@dataclass(frozen=True)
+class DedupConfig:
+    enabled: bool = True
+    action: str = 'report'  # report: only record matches; drop: skip ASR and export; reuse: copy the earlier transcript
+    index_db: str = ''  # SQLite fingerprint index; empty means <cache_dir>/fingerprints.sqlite
+    threshold: float = 0.4  # minimum estimated Jaccard similarity of the landmark sets
+    max_duration_diff: float = 0.25  # relative to the longer segment
+    num_perm: int = 64  # MinHash signature length
+    bands: int = 32  # LSH bands; num_perm must be a multiple
 
 @dataclass
 class AppConfig:
@@ -26,4 +135,15 @@ class AppConfig:
     Coincide with the default.yaml structure.
     """
     paths: PathsConfig
-    pipeline: PipelineConfig
\ No newline at end of file
+    pipeline: PipelineConfig
+    runner: RunnerConfig = field(default_factory=RunnerConfig)
+    models: ModelsConfig = field(default_factory=ModelsConfig)
+    cache: CacheConfig = field(default_factory=CacheConfig)
+    download: DownloadConfig = field(default_factory=DownloadConfig)
+    export: ExportConfig = field(default_factory=ExportConfig)
+    decoding: DecodingConfig = field(default_factory=DecodingConfig)
+    ingest: IngestConfig = field(default_factory=IngestConfig)
+    server: ServerConfig = field(default_factory=ServerConfig)
+    gui: GuiConfig = field(default_factory=GuiConfig)
+    quality: QualityConfig = field(default_factory=QualityConfig)
+    dedup: DedupConfig = field(default_factory=DedupConfig)
\ No newline at end of file
@@ -0,0 +1,26 @@
+import dataclasses
+import os
+import sys
+import pytest
+
+# tests import the project modules the same way the entry scripts do
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+
+@pytest.fixture
+def cfg(tmp_path):
+    """
+    The default config with every path moved under the test's tmp_path,
+    installed as the config `load_config()` returns for the duration of the test.
+    """
+    from modules.utils.config import load_config, set_config
+    original = load_config()
+    paths = {name: str(tmp_path / name) for name in original.paths.__dataclass_fields__}
+    for path in paths.values():
+        os.makedirs(path, exist_ok=True)
+    config = dataclasses.replace(original, paths=type(original.paths)(**paths))
+    set_config(config)
+    yield config
+    set_config(original)
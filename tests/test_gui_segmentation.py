@@ -0,0 +1,47 @@
+import dataclasses
+import threading
+import pytest
+
+# my module
+from benchmarks.stubs import EnergySegmenter, StubASR
+from benchmarks.synthetic import write_synthetic_wav
+from modules.gui.base_gui import BaseGUI
+from modules.output.audio_exporter import AudioExporter
+from modules.pipeline.pipeline import Pipeline
+from modules.server.client import RemoteSegmenter
+from modules.server.job_server import JobServer
+from modules.utils.model_registry import get_models
+
+
+@pytest.fixture
+def job_server(cfg):
+    """
+    A JobServer on a free local port serving offline stand-in models.
+    """
+    pipeline = Pipeline(cfg, EnergySegmenter(cfg), StubASR(cfg), use_cache=False, log=lambda msg: None)
+    server = JobServer(pipeline, cfg.runner, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    thread.join(10)
+
+
+@pytest.mark.parametrize('normalize', [False, True])
+def test_gui_segments_a_loaded_waveform_on_the_job_server(cfg, job_server, tmp_path, normalize):
+    cfg = dataclasses.replace(cfg, server=dataclasses.replace(cfg.server, url=job_server.url),
+                              pipeline=dataclasses.replace(cfg.pipeline, vad=dataclasses.replace(
+                                  cfg.pipeline.vad, normalize=normalize)))
+    wav_path = str(tmp_path / 'source.wav')
+    write_synthetic_wav(wav_path, 60, cfg.pipeline.sample_rate, seed=3)
+    waveform = AudioExporter().load(wav_path)
+
+    segmenter, _ = get_models(cfg)
+    assert isinstance(segmenter, RemoteSegmenter)
+    remote, remote_rejected = BaseGUI.detect_segments(cfg, segmenter, waveform)
+    local, local_rejected = BaseGUI.detect_segments(cfg, EnergySegmenter(cfg), waveform)
+    assert remote
+    assert [tuple(round(t, 3) for t in seg) for seg in remote] == [tuple(round(t, 3) for t in seg) for seg in local]
+    assert len(remote_rejected) == len(local_rejected)
+    # a path readable by the server still works
+    assert segmenter.segment(wav_path) == EnergySegmenter(cfg).segment(wav_path)
@@ -0,0 +1,57 @@
+import os
+
+# my module
+from modules.input.ingest_index import IngestIndex
+
+EXTENSIONS = ('.mp4', '.wav')
+
+
+def _write(path, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def test_scan_returns_one_path_per_content(tmp_path):
+    root = str(tmp_path / 'drop')
+    _write(os.path.join(root, 'a.mp4'), b'first')
+    _write(os.path.join(root, 'sub', 'copy of a.mp4'), b'first')
+    _write(os.path.join(root, 'b.wav'), b'second')
+    _write(os.path.join(root, 'notes.txt'), b'ignored')
+    index = IngestIndex(str(tmp_path / 'index.sqlite'))
+    try:
+        assert index.scan(root, EXTENSIONS) == [os.path.join(root, 'a.mp4'), os.path.join(root, 'b.wav')]
+        index.mark_done([os.path.join(root, 'sub', 'copy of a.mp4')])
+        assert index.scan(root, EXTENSIONS) == [os.path.join(root, 'b.wav')]
+    finally:
+        index.close()
+
+
+def test_scan_includes_names_outside_the_basic_multilingual_plane(tmp_path):
+    root = str(tmp_path / 'drop')
+    emoji = os.path.join(root, '\U0001F600 intro.mp4')
+    plain = os.path.join(root, 'plain.mp4')
+    _write(emoji, b'emoji')
+    _write(plain, b'plain')
+    # a sibling folder sharing the prefix must stay out of the scan
+    _write(str(tmp_path / 'drop2' / 'other.mp4'), b'other')
+    index = IngestIndex(str(tmp_path / 'index.sqlite'))
+    hashed = []
+    original = index._hash
+
+    def counting_hash(files):
+        hashed.extend(path for path, _, _ in files)
+        return original(files)
+
+    index._hash = counting_hash
+    try:
+        assert sorted(index.scan(root, EXTENSIONS)) == sorted([emoji, plain])
+        # unchanged files, the emoji name included, are known and not hashed again
+        hashed.clear()
+        assert sorted(index.scan(root, EXTENSIONS)) == sorted([emoji, plain])
+        assert hashed == []
+        os.remove(emoji)
+        assert index.scan(root, EXTENSIONS) == [plain]
+        assert index.conn.execute('SELECT COUNT(*) FROM files').fetchone() == (1,)
+    finally:
+        index.close()
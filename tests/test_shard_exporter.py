@@ -0,0 +1,40 @@
+import json
+import os
+import tarfile
+import numpy as np
+
+# my module
+from modules.input.file_reader import FileReader
+from modules.output.shard_exporter import ShardExporter
+from modules.utils import fileops
+
+
+def test_shards_keep_keys_longer_than_ustar_names(cfg, monkeypatch):
+    # a single 63-character DNS label, the longest a host name part can be
+    monkeypatch.setattr(fileops.socket, 'gethostname', lambda: 'n' * 63 + '.cluster.example.org')
+    wav_name = FileReader().make_wav_name()
+    sample_rate = cfg.pipeline.sample_rate
+    waveform = np.random.default_rng(0).uniform(-0.5, 0.5, 3 * sample_rate).astype(np.float32)
+    exporter = ShardExporter()
+    try:
+        keys = exporter.export(wav_name, [(0.0, 1.0), (1.0, 2.5)], waveform, ['first', 'zweite Zeile'],
+                               source='input.mp4')
+    finally:
+        exporter.close()
+    assert len(f'{keys[0]}.json') > 100
+    shard_dir = os.path.join(cfg.paths.resulted_corpus_dir, 'shards')
+    manifest, = [name for name in os.listdir(shard_dir) if name.endswith('.jsonl')]
+    with open(os.path.join(shard_dir, manifest), encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    assert [record['key'] for record in records] == keys
+    for record in records:
+        with tarfile.open(os.path.join(shard_dir, record['shard'])) as tar:
+            names = tar.getnames()
+            assert {f"{record['key']}.wav", f"{record['key']}.txt", f"{record['key']}.json"} <= set(names)
+            assert tar.extractfile(f"{record['key']}.txt").read().decode('utf-8') == record['text']
+            # the manifest offset is where the sample's first member, pax header included, starts
+            assert tar.getmember(f"{record['key']}.wav").offset == record['offset']
+        with open(os.path.join(shard_dir, record['shard']), 'rb') as f:
+            f.seek(record['offset'])
+            with tarfile.open(fileobj=f, mode='r|') as stream:
+                assert next(iter(stream)).name == f"{record['key']}.wav"
@@ -0,0 +1,180 @@
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import time
+import pytest
+
+# my module
+from modules.pipeline.sharding import LeaseManager, parse_shard, select_shard
+from modules.utils import fileops
+
+HOSTS = 4
+INPUTS = [f'/mnt/archive/show{index // 10}/episode{index:03d}.mp4' for index in range(200)]
+
+
+def _spawn(target, args_list):
+    """
+    Run one spawned process per argument tuple, standing in for separate hosts, and wait for all.
+    Processes block on a shared event until every one of them has started, so they race.
+    """
+    ctx = multiprocessing.get_context('spawn')
+    start = ctx.Event()
+    processes = [ctx.Process(target=target, args=(start, *args)) for args in args_list]
+    for process in processes:
+        process.start()
+    start.set()
+    for process in processes:
+        process.join(120)
+    assert [process.exitcode for process in processes] == [0] * len(processes)
+
+
+def _read_lists(paths):
+    lists = []
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            lists.append(json.load(f))
+    return lists
+
+
+def _shard_host(start, inputs, index, count, seed, out_path):
+    start.wait()
+    order = list(inputs)
+    random.Random(seed).shuffle(order)
+    with open(out_path, 'w', encoding='utf-8') as f:
+        json.dump(select_shard(order, index, count), f)
+
+
+def _lease_host(start, lease_dir, inputs, ttl, seed, out_path):
+    start.wait()
+    manager = LeaseManager(lease_dir, ttl)
+    order = list(inputs)
+    random.Random(seed).shuffle(order)
+    claimed = []
+    for inp in order:
+        if manager.claim(inp):
+            claimed.append(inp)
+            manager.release(inp, done=True)
+    manager.close()
+    with open(out_path, 'w', encoding='utf-8') as f:
+        json.dump(claimed, f)
+
+
+def test_parse_shard():
+    assert parse_shard('0/1') == (0, 1)
+    assert parse_shard('3/4') == (3, 4)
+    for spec in ('4/4', '-1/4', '0/0', '1', 'a/b'):
+        with pytest.raises(ValueError):
+            parse_shard(spec)
+
+
+def test_shards_partition_inputs_across_processes(tmp_path):
+    # every process has its own hash seed and input order, like separate hosts
+    outputs = [str(tmp_path / f'shard{index}.json') for index in range(HOSTS)]
+    _spawn(_shard_host, [(INPUTS, index, HOSTS, index, outputs[index]) for index in range(HOSTS)])
+    shards = _read_lists(outputs)
+    assert sorted(inp for shard in shards for inp in shard) == sorted(INPUTS)
+    assert all(shard for shard in shards)
+    # the same split is computed in this process too
+    assert [sorted(shard) for shard in shards] == [sorted(select_shard(INPUTS, index, HOSTS))
+                                                   for index in range(HOSTS)]
+
+
+def test_every_input_is_claimed_exactly_once(tmp_path):
+    lease_dir = str(tmp_path / 'leases')
+    outputs = [str(tmp_path / f'claimed{index}.json') for index in range(HOSTS)]
+    _spawn(_lease_host, [(lease_dir, INPUTS, 600.0, index, outputs[index]) for index in range(HOSTS)])
+    claimed = [inp for host in _read_lists(outputs) for inp in host]
+    assert sorted(claimed) == sorted(INPUTS)
+    # nothing is left behind but the done markers
+    names = os.listdir(lease_dir)
+    assert len(names) == len(INPUTS) and all(name.endswith('.done') for name in names)
+
+
+def test_expired_leases_are_taken_over_exactly_once(tmp_path):
+    # a host died holding every lease; the others race to take them over
+    lease_dir = str(tmp_path / 'leases')
+    dead = LeaseManager(lease_dir, ttl=600.0)
+    for inp in INPUTS:
+        assert dead.claim(inp)
+    dead._stop.set()
+    expired = time.time() - 3600
+    for name in os.listdir(lease_dir):
+        os.utime(os.path.join(lease_dir, name), (expired, expired))
+    outputs = [str(tmp_path / f'claimed{index}.json') for index in range(HOSTS)]
+    _spawn(_lease_host, [(lease_dir, INPUTS, 60.0, index, outputs[index]) for index in range(HOSTS)])
+    claimed = [inp for host in _read_lists(outputs) for inp in host]
+    assert sorted(claimed) == sorted(INPUTS)
+    # moved-aside stale leases are cleaned up
+    names = os.listdir(lease_dir)
+    assert len(names) == len(INPUTS) and all(name.endswith('.done') for name in names)
+
+
+def test_live_and_finished_leases_are_not_taken(tmp_path):
+    lease_dir = str(tmp_path / 'leases')
+    holder = LeaseManager(lease_dir, ttl=1.0)
+    other = LeaseManager(lease_dir, ttl=1.0)
+    try:
+        assert holder.claim('a.mp4')
+        # the holder's heartbeat keeps the lease fresh past its ttl
+        time.sleep(1.5)
+        assert not other.claim('a.mp4')
+        holder.release('a.mp4', done=True)
+        assert not other.claim('a.mp4')
+        # a failed input is handed back and can be claimed again
+        assert holder.claim('b.mp4')
+        holder.release('b.mp4', done=False)
+        assert other.claim('b.mp4')
+    finally:
+        holder.close()
+        other.close()
+
+
+def test_node_name_is_safe_in_keys_and_file_names(monkeypatch):
+    monkeypatch.setattr(fileops.socket, 'gethostname', lambda: 'gpu_01.cluster.example.org')
+    assert fileops.node_name() == 'gpu-01'
+    monkeypatch.setattr(fileops.socket, 'gethostname', lambda: '')
+    assert fileops.node_name() == 'node'
+
+
+def _pipeline_host(start, root, lease_dir, inputs, out_path):
+    import dataclasses
+    from benchmarks.stubs import EnergySegmenter, StubASR
+    from modules.pipeline.pipeline import Pipeline
+    from modules.pipeline.runner import PipelineRunner
+    from modules.utils.config import load_config, set_config
+    cfg = load_config()
+    paths = {name: os.path.join(root, name) for name in cfg.paths.__dataclass_fields__}
+    for path in paths.values():
+        os.makedirs(path, exist_ok=True)
+    cfg = dataclasses.replace(cfg, paths=type(cfg.paths)(**paths))
+    set_config(cfg)
+    pipeline = Pipeline(cfg, EnergySegmenter(cfg), StubASR(cfg), use_cache=False, log=lambda msg: None,
+                        lease_dir=lease_dir)
+    start.wait()
+    try:
+        jobs = PipelineRunner(pipeline, cfg.runner).run(inputs)
+    finally:
+        pipeline.close()
+    with open(out_path, 'w', encoding='utf-8') as f:
+        json.dump([{'input': job.input, 'error': job.error, 'elsewhere': job.claimed_elsewhere,
+                    'transcripts': len(job.transcripts or [])} for job in jobs], f)
+
+
+@pytest.mark.skipif(shutil.which('ffmpeg') is None, reason='ffmpeg is not installed')
+def test_hosts_share_an_input_list_through_leases(cfg, tmp_path):
+    from benchmarks.synthetic import write_synthetic_wav
+    inputs = []
+    for index in range(8):
+        path = str(tmp_path / f'input{index}.wav')
+        write_synthetic_wav(path, 10, cfg.pipeline.sample_rate, seed=index)
+        inputs.append(path)
+    lease_dir = str(tmp_path / 'leases')
+    outputs = [str(tmp_path / f'host{index}.json') for index in range(3)]
+    # each host has its own work and output folders; only the lease directory is shared
+    _spawn(_pipeline_host, [(str(tmp_path / f'host{index}'), lease_dir, inputs, outputs[index])
+                            for index in range(3)])
+    processed = [job for host in _read_lists(outputs) for job in host if not job['elsewhere']]
+    assert sorted(job['input'] for job in processed) == sorted(inputs)
+    assert all(job['error'] is None and job['transcripts'] for job in processed)
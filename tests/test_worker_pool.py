@@ -0,0 +1,88 @@
+import os
+import threading
+import time
+
+# my module
+from modules.pipeline.worker_pool import WorkerPool
+from modules.utils.metrics import NullMetrics
+
+
+def _load_slowly():
+    time.sleep(0.05)
+    return ''
+
+
+class _SlowToLoad:
+    """
+    Takes a while to unpickle, so the pool handles the result only after its worker is gone.
+    """
+    def __reduce__(self):
+        return _load_slowly, ()
+
+
+class _FakePipeline:
+    """
+    Stands in for a worker's Pipeline: records every job it starts, and exits the worker
+    process on inputs named crash* (while running the job) or exit* (right after finishing it).
+    """
+    def __init__(self, marker_dir: str):
+        self.marker_dir = marker_dir
+        self.metrics = NullMetrics()
+
+    def process(self, job):
+        with open(os.path.join(self.marker_dir, f'{job.input}.{os.getpid()}'), 'w'):
+            pass
+        if job.input.startswith('crash'):
+            os._exit(9)
+        if job.input.startswith('exit'):
+            # dies just after sending its result, before the pool has read it
+            job.transcripts = [_SlowToLoad()]
+            threading.Thread(target=lambda: (time.sleep(0.01), os._exit(9)), daemon=True).start()
+        else:
+            time.sleep(0.1)
+        return job
+
+    def close(self):
+        pass
+
+
+def _fake_pipeline(cfg, cpu_threads, preset, metrics=None, log=None, marker_dir=None):
+    return _FakePipeline(marker_dir)
+
+
+def _failing_pipeline(cfg, cpu_threads, preset, metrics=None, log=None, marker_dir=None):
+    raise RuntimeError('model file missing')
+
+
+def _started(marker_dir):
+    counts = {}
+    for name in os.listdir(marker_dir):
+        inp = name.rsplit('.', 1)[0]
+        counts[inp] = counts.get(inp, 0) + 1
+    return counts
+
+
+def test_dead_workers_fail_only_the_job_they_were_running(tmp_path):
+    inputs = []
+    for index in range(8):
+        # the job after an exit* is often handed to the worker that is just dying
+        inputs += [f'exit{index}', f'job{index:02d}']
+    inputs += ['crash0', 'job08', 'crash1', 'job09']
+    jobs = WorkerPool(2, pipeline_factory=_fake_pipeline, marker_dir=str(tmp_path)).run(inputs)
+    assert [job.input for job in jobs] == inputs
+    started = _started(str(tmp_path))
+    # no input is run twice, and no input fails without having been started
+    assert all(count == 1 for count in started.values())
+    failed = {job.input for job in jobs if job.error is not None}
+    assert failed <= set(started)
+    assert {'crash0', 'crash1'} <= failed
+    assert all(job.error.startswith('worker: process exited') for job in jobs if job.error is not None)
+    # everything that was not on a dying worker finished
+    assert set(inputs) - failed == {job.input for job in jobs if job.error is None}
+    assert all(job.input in started for job in jobs)
+
+
+def test_failed_worker_startup_fails_the_inputs(tmp_path):
+    jobs = WorkerPool(2, pipeline_factory=_failing_pipeline, marker_dir=str(tmp_path)).run(['a', 'b', 'c'])
+    assert [job.error for job in jobs] == ['worker: RuntimeError: model file missing'] * 3
+    assert os.listdir(str(tmp_path)) == []
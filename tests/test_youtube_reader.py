@@ -0,0 +1,135 @@
+import functools
+import http.server
+import os
+import shutil
+import subprocess
+import threading
+import time
+import wave
+import numpy as np
+import pytest
+
+# my module
+from modules.input.youtube_reader import YouTubeReader
+
+pytestmark = pytest.mark.skipif(shutil.which('yt-dlp') is None, reason='yt-dlp is not installed')
+
+SAMPLE_RATE = 16000
+FEED = """<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0"><channel><title>local</title><link>{base}/</link><description>test feed</description>
+{items}
+</channel></rss>
+"""
+ITEM = '<item><title>{name}</title><guid>{name}</guid><enclosure url="{base}/{name}" type="audio/wav" length="1"/></item>'
+
+
+def _write_wav(path: str, seconds: float, seed: int):
+    # tone bursts separated by silence, so an energy VAD finds segments
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    signal = 0.3 * np.sin(2 * np.pi * rng.uniform(150, 400) * t) * (np.sin(2 * np.pi * 0.25 * t) > 0)
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes((signal * 32767).astype('<i2').tobytes())
+
+
+class _MediaHandler(http.server.SimpleHTTPRequestHandler):
+    """
+    Static file handler that delays responses and counts requests served at the same time.
+    """
+    delay = 0.0
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.active += 1
+            server.peak = max(server.peak, server.active)
+        try:
+            time.sleep(self.delay)
+            super().do_GET()
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def media_server(tmp_path):
+    """
+    Local HTTP server standing in for the remote media host: three wav files and an
+    RSS feed (a playlist to yt-dlp) listing them.
+    :return: (base URL, served directory, server)
+    """
+    root = tmp_path / 'www'
+    root.mkdir()
+    names = [f'episode{index}.wav' for index in range(3)]
+    for index, name in enumerate(names):
+        _write_wav(str(root / name), 8, seed=index)
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0),
+                                             functools.partial(_MediaHandler, directory=str(root)))
+    server.lock, server.active, server.peak = threading.Lock(), 0, 0
+    base = f'http://127.0.0.1:{server.server_port}'
+    (root / 'feed.xml').write_text(FEED.format(base=base, items='\n'.join(ITEM.format(base=base, name=name)
+                                                                          for name in names)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield base, root, server
+    server.shutdown()
+    server.server_close()
+
+
+def test_download_fetches_the_served_file(cfg, media_server):
+    base, root, _ = media_server
+    path = YouTubeReader().download(f'{base}/episode0.wav')
+    assert os.path.dirname(path) == cfg.paths.temp_dir
+    with open(path, 'rb') as downloaded, open(root / 'episode0.wav', 'rb') as served:
+        assert downloaded.read() == served.read()
+
+
+def test_download_of_a_missing_file_fails(cfg, media_server):
+    base, _, _ = media_server
+    with pytest.raises(subprocess.CalledProcessError):
+        YouTubeReader().download(f'{base}/missing.wav')
+    assert os.listdir(cfg.paths.temp_dir) == []
+
+
+def test_expand_keeps_a_single_url(cfg, media_server):
+    base, _, _ = media_server
+    assert YouTubeReader().expand(f'{base}/episode1.wav') == [f'{base}/episode1.wav']
+
+
+def test_expand_lists_playlist_entries_in_order(cfg, media_server):
+    base, root, _ = media_server
+    reader = YouTubeReader()
+    urls = reader.expand(f'{base}/feed.xml')
+    assert len(urls) == 3
+    for index, url in enumerate(urls):
+        with open(reader.download(url), 'rb') as downloaded, open(root / f'episode{index}.wav', 'rb') as served:
+            assert downloaded.read() == served.read()
+
+
+@pytest.mark.skipif(shutil.which('ffmpeg') is None, reason='ffmpeg is not installed')
+@pytest.mark.parametrize('stream', [False, True])
+def test_runner_downloads_urls_concurrently(cfg, media_server, monkeypatch, stream):
+    from benchmarks.stubs import EnergySegmenter, StubASR
+    from modules.pipeline.pipeline import Pipeline
+    from modules.pipeline.runner import PipelineRunner
+    base, _, server = media_server
+    # slow responses make overlapping downloads observable
+    monkeypatch.setattr(_MediaHandler, 'delay', 0.5)
+    urls = YouTubeReader().expand(f'{base}/feed.xml')
+    pipeline = Pipeline(cfg, EnergySegmenter(cfg), StubASR(cfg), stream=stream, pipe_urls=stream,
+                        use_cache=False, log=lambda msg: None)
+    try:
+        jobs = PipelineRunner(pipeline, cfg.runner).run(urls)
+    finally:
+        pipeline.close()
+    assert [job.error for job in jobs] == [None] * len(urls)
+    assert all(job.segments and len(job.transcripts) == len(job.segments) for job in jobs)
+    if not stream and cfg.runner.acquire_workers > 1:
+        # downloads to temp_dir run in the acquire stage, runner.acquire_workers at a time
+        assert server.peak > 1